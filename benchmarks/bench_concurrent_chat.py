@@ -0,0 +1,78 @@
+# benchmarks/bench_concurrent_chat.py
+"""
+Benchmark: N request !chat đồng thời - đường sync (invoke) vs async (ainvoke).
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_concurrent_chat -n 8 --latency 1.5
+    python -m benchmarks.bench_concurrent_chat -n 4 --real   # dùng RAG engine thật (cần Ollama)
+
+Mặc định dùng LLM giả có độ trễ cố định để thấy rõ: đường sync chạy nối tiếp (~N x latency)
+và chặn heartbeat, còn đường async chạy chồng lên nhau (~1 x latency).
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from rag.rag_chain import build_rag_chain
+
+
+def build_fake_chain(latency: float):
+    llm = FakeListChatModel(responses=["Câu trả lời giả lập."], sleep=latency)
+    retriever = RunnableLambda(lambda q: [Document(page_content="Kiến thức nền giả lập.")])
+    return build_rag_chain(llm, retriever)
+
+
+async def _heartbeat(interval: float, lags: list, stop: asyncio.Event):
+    """Giả lập heartbeat của discord.py: đo độ trễ lớn nhất của event loop."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_mode(chain, n: int, use_async: bool):
+    async def one_chat(i):
+        query = f"Câu hỏi số {i}"
+        if use_async:
+            return await chain.ainvoke(query)
+        return chain.invoke(query)  # Cách cũ: gọi sync ngay trong coroutine
+
+    lags, stop = [], asyncio.Event()
+    hb = asyncio.create_task(_heartbeat(0.05, lags, stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_chat(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await hb
+    return elapsed, max(lags, default=0.0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=8, help="Số request !chat đồng thời")
+    parser.add_argument("--latency", type=float, default=1.0, help="Độ trễ LLM giả lập (giây)")
+    parser.add_argument("--real", action="store_true", help="Dùng RAG engine thật thay vì LLM giả")
+    args = parser.parse_args()
+
+    if args.real:
+        from rag.engine import get_rag_engine
+        chain = get_rag_engine().chain
+    else:
+        chain = build_fake_chain(args.latency)
+
+    print(f"{'mode':<8}{'n':>4}{'total (s)':>12}{'per req (s)':>14}{'max loop lag (s)':>19}")
+    for label, use_async in (("sync", False), ("async", True)):
+        elapsed, max_lag = await run_mode(chain, args.n, use_async)
+        print(f"{label:<8}{args.n:>4}{elapsed:>12.2f}{elapsed / args.n:>14.2f}{max_lag:>19.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,220 @@
+# benchmarks/bench_cv_layout_parser.py
+"""
+Benchmark: throughput và tỉ lệ parse đúng của process_cv_data trên bản PDF của cv_testset.
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_cv_layout_parser
+    python -m benchmarks.bench_cv_layout_parser --repeat 5 --save-dir /tmp/cv_pdf   # lưu PDF để xem
+
+Mỗi CV JSON được dựng thành PDF theo 3 kiểu trình bày (font, cỡ chữ, thứ tự công ty/chức danh khác
+nhau) bằng font TrueType có dấu tiếng Việt (mặc định DejaVuSans, đổi bằng --font/--bold-font).
+Kết quả parse được so với chính file JSON: "thành công" khi tên, chức danh, email, công ty, vị trí
+và kỹ năng đều khớp; kèm tỉ lệ đúng của từng trường.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import textwrap
+import time
+
+import fitz
+
+from rag.cv_parser import process_cv_data
+
+DEFAULT_FONT_DIRS = ["/usr/share/fonts/truetype/dejavu", "/Library/Fonts", "C:/Windows/Fonts"]
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 595, 842, 50
+
+STYLES = {
+    # Tiêu đề in hoa, đậm; công ty (đậm) trước, chức danh + thời gian sau
+    "vn_caps": {
+        "headings": {"education": "HỌC VẤN", "experience": "KINH NGHIỆM LÀM VIỆC", "skills": "KỸ NĂNG",
+                     "certifications": "CHỨNG CHỈ", "awards": "DANH HIỆU VÀ GIẢI THƯỞNG",
+                     "hobbies": "SỞ THÍCH", "activities": "HOẠT ĐỘNG"},
+        "heading_size": 13, "heading_bold": True, "role_first": False, "bullet": "•", "skills_inline": False,
+    },
+    # Tiêu đề tiếng Anh, chữ thường, cỡ lớn không đậm; chức danh | thời gian trước, công ty sau
+    "en_title": {
+        "headings": {"education": "Education", "experience": "Work Experience", "skills": "Skills",
+                     "certifications": "Certifications", "awards": "Awards", "hobbies": "Interests",
+                     "activities": "Activities"},
+        "heading_size": 15, "heading_bold": False, "role_first": True, "bullet": "-", "skills_inline": True,
+    },
+    # Tiêu đề chữ thường đậm cùng cỡ chữ nội dung, có icon; kỹ năng trên 1 dòng
+    "vn_plain": {
+        "headings": {"education": "Học vấn", "experience": "Kinh nghiệm làm việc", "skills": "Kỹ năng",
+                     "certifications": "Chứng chỉ", "awards": "Giải thưởng", "hobbies": "Sở thích",
+                     "activities": "Hoạt động"},
+        "heading_size": 11, "heading_bold": True, "role_first": False, "bullet": "▪", "skills_inline": True,
+    },
+}
+
+
+class _Writer:
+    """Ghi từng dòng lên PDF, tự xuống dòng / sang trang."""
+
+    def __init__(self, font: str, bold_font: str):
+        self.doc = fitz.open()
+        self.fonts = {False: ("cvregular", font), True: ("cvbold", bold_font)}
+        self.page = None
+        self.y = PAGE_HEIGHT
+
+    def line(self, text: str, size: float = 10, bold: bool = False, indent: float = 0, gap: float = 0):
+        self.y += gap
+        width = int((PAGE_WIDTH - 2 * MARGIN - indent) / (size * 0.55))
+        for i, part in enumerate(textwrap.wrap(text, width) or [""]):
+            if self.page is None or self.y + size > PAGE_HEIGHT - MARGIN:
+                self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+                self.y = MARGIN
+            self.y += size * 1.4
+            fontname, fontfile = self.fonts[bold]
+            # Dòng tràn (wrap) thụt vào thêm như văn bản thật sau dấu gạch đầu dòng
+            x = MARGIN + indent + (size if i and indent else 0)
+            self.page.insert_text((x, self.y), part, fontsize=size, fontname=fontname, fontfile=fontfile)
+
+    def tobytes(self) -> bytes:
+        data = self.doc.tobytes()
+        self.doc.close()
+        return data
+
+
+def render_pdf(cv: dict, style: dict, font: str, bold_font: str) -> bytes:
+    w = _Writer(font, bold_font)
+    info = cv["personal_info"]
+    w.line(info["name"], size=20, bold=True)
+    w.line(info["title"], size=12)
+    w.line(f"Email: {info['email']}")
+    w.line(f"Điện thoại: {info['phone']}")
+
+    def heading(key):
+        w.line(style["headings"][key], size=style["heading_size"], bold=style["heading_bold"], gap=10)
+
+    def bullet(text):
+        w.line(f"{style['bullet']} {text}", indent=12)
+
+    heading("education")
+    for edu in cv["education"]:
+        w.line(edu["school"], bold=True)
+        w.line(f"{edu['major']} {edu['time']}")
+
+    heading("experience")
+    for job in cv["experience"]:
+        role_line = f"{job['role']} | {job['duration'].strip('()')}" if style["role_first"] else f"{job['role']} {job['duration']}"
+        if style["role_first"]:
+            w.line(role_line, bold=True)
+            w.line(job["company"])
+        else:
+            w.line(job["company"], bold=True)
+            w.line(role_line)
+        for sentence in job["description"]:
+            bullet(sentence)
+
+    for key in ("skills", "certifications", "awards", "hobbies", "activities"):
+        items = cv.get(key) or []
+        if not items:
+            continue
+        heading(key)
+        if key == "skills" and style["skills_inline"]:
+            w.line(", ".join(items))
+        else:
+            for item in items:
+                bullet(item)
+    return w.tobytes()
+
+
+def _norm(value) -> str:
+    return " ".join(str(value or "").split()).strip(" .").lower()
+
+
+def _digits(value) -> str:
+    return re.sub(r"\D", "", str(value or ""))
+
+
+def score(expected: dict, parsed: dict) -> dict:
+    """Từng trường đúng/sai của CV đã parse so với JSON gốc."""
+    info, got = expected["personal_info"], parsed.get("personal_info", {})
+    job, got_job = expected["experience"][0], (parsed.get("experience") or [{}])[0]
+    edu, got_edu = expected["education"][0], (parsed.get("education") or [{}])[0]
+    return {
+        "name": _norm(got.get("name")) == _norm(info["name"]),
+        "title": _norm(got.get("title")) == _norm(info["title"]),
+        "email": _norm(got.get("email")) == _norm(info["email"]),
+        "phone": _digits(got.get("phone")) == _digits(info["phone"]),
+        "company": _norm(got_job.get("company")) == _norm(job["company"]),
+        "role": _norm(got_job.get("role")) == _norm(job["role"]),
+        "duration": _digits(got_job.get("duration")) == _digits(job["duration"]),
+        "description": [_norm(d) for d in got_job.get("description", [])] == [_norm(d) for d in job["description"]],
+        "school": _norm(got_edu.get("school")) == _norm(edu["school"]),
+        "major": _norm(got_edu.get("major")) == _norm(edu["major"]),
+        "skills": [_norm(s) for s in parsed.get("skills", [])] == [_norm(s) for s in expected["skills"]],
+        "certifications": [_norm(s) for s in parsed.get("certifications", [])] == [_norm(s) for s in expected["certifications"]],
+        "hobbies": [_norm(s) for s in parsed.get("hobbies", [])] == [_norm(s) for s in expected["hobbies"]],
+    }
+
+
+REQUIRED = ("name", "title", "email", "company", "role", "skills")
+
+
+def _find_font(name: str, dirs: list) -> str:
+    for directory in dirs:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    raise SystemExit(f"Không tìm thấy font {name}, truyền đường dẫn qua --font/--bold-font")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="cv_testset", help="Thư mục chứa CV test (JSON)")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần parse mỗi PDF khi đo throughput")
+    parser.add_argument("--font", help="Font TrueType thường (mặc định DejaVuSans.ttf)")
+    parser.add_argument("--bold-font", help="Font TrueType đậm (mặc định DejaVuSans-Bold.ttf)")
+    parser.add_argument("--save-dir", help="Lưu các PDF đã dựng vào thư mục này")
+    args = parser.parse_args()
+
+    font = args.font or _find_font("DejaVuSans.ttf", DEFAULT_FONT_DIRS)
+    bold_font = args.bold_font or _find_font("DejaVuSans-Bold.ttf", DEFAULT_FONT_DIRS)
+
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(args.dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            cv = json.load(f)
+        for style_name, style in STYLES.items():
+            pdf = render_pdf(cv, style, font, bold_font)
+            corpus.append((os.path.basename(path), style_name, cv, pdf))
+            if args.save_dir:
+                os.makedirs(args.save_dir, exist_ok=True)
+                with open(os.path.join(args.save_dir, f"{os.path.splitext(os.path.basename(path))[0]}_{style_name}.pdf"), "wb") as f:
+                    f.write(pdf)
+    if not corpus:
+        raise SystemExit(f"Không có CV nào trong {args.dir}")
+
+    field_hits, success, per_style = {}, 0, {name: [0, 0] for name in STYLES}
+    for name, style_name, cv, pdf in corpus:
+        parsed = process_cv_data(pdf)
+        fields = score(cv, parsed) if "error" not in parsed else {}
+        ok = bool(fields) and all(fields[key] for key in REQUIRED)
+        success += ok
+        per_style[style_name][0] += ok
+        per_style[style_name][1] += 1
+        for key, hit in fields.items():
+            field_hits[key] = field_hits.get(key, 0) + hit
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for _, _, _, pdf in corpus:
+            process_cv_data(pdf)
+    elapsed = (time.perf_counter() - start) / (args.repeat * len(corpus))
+
+    print(f"Corpus: {len(corpus)} PDF ({len(corpus) // len(STYLES)} CV x {len(STYLES)} kiểu trình bày)")
+    print(f"Parse thành công: {success}/{len(corpus)} ({success / len(corpus):.0%})")
+    for style_name, (ok, total) in per_style.items():
+        print(f"  {style_name:<9}: {ok}/{total}")
+    print("Đúng theo trường: " + ", ".join(f"{key} {hits / len(corpus):.0%}" for key, hits in field_hits.items()))
+    print(f"Throughput: {1 / elapsed:.0f} CV/s ({elapsed * 1000:.2f} ms/CV)")
+
+
+if __name__ == "__main__":
+    main()
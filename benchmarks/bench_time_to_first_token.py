@@ -0,0 +1,97 @@
+# benchmarks/bench_time_to_first_token.py
+"""
+Benchmark: thời gian tới token đầu tiên hiển thị trên Discord - send_long_message vs streaming.
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_time_to_first_token --tokens 400 --token-latency 0.02
+    python -m benchmarks.bench_time_to_first_token --real "Lương Data Analyst bao nhiêu?"   # cần Ollama
+
+Channel giả ghi lại thời điểm nội dung thật (không phải placeholder) xuất hiện lần đầu.
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from rag.rag_chain import build_rag_chain
+from utils.api_helper import STREAM_PLACEHOLDER, send_long_message, send_streaming_message
+
+
+class _PerCharFakeChatModel(FakeListChatModel):
+    """invoke tốn thời gian bằng stream (sleep mỗi ký tự) để so sánh công bằng."""
+
+    def _call(self, *args, **kwargs):
+        response = self.responses[0]
+        time.sleep((self.sleep or 0) * len(response))
+        return response
+
+
+class _FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        channel.record(content)
+
+    async def edit(self, content):
+        self.content = content
+        self.channel.record(content)
+
+    async def delete(self):
+        pass
+
+
+class _FakeChannel:
+    """Ghi lại thời điểm nội dung đầu tiên (khác placeholder) được gửi/edit."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_visible = None
+        self.requests = 0
+
+    def record(self, content):
+        self.requests += 1
+        if self.first_visible is None and content != STREAM_PLACEHOLDER:
+            self.first_visible = time.perf_counter() - self.start
+
+    async def send(self, content):
+        return _FakeMessage(self, content)
+
+
+async def measure(chain, query, streaming: bool):
+    channel = _FakeChannel()
+    if streaming:
+        await send_streaming_message(channel, chain.astream(query))
+    else:
+        await send_long_message(channel, await chain.ainvoke(query))
+    total = time.perf_counter() - channel.start
+    return channel.first_visible, total, channel.requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=400, help="Số token của câu trả lời giả lập")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Độ trễ mỗi token (giây)")
+    parser.add_argument("--real", metavar="QUERY", help="Dùng RAG engine thật với câu hỏi này")
+    args = parser.parse_args()
+
+    if args.real:
+        from rag.engine import get_rag_engine
+        chain, query = get_rag_engine().chain, args.real
+    else:
+        answer = "".join(f"từ{i} " for i in range(args.tokens))
+        llm = _PerCharFakeChatModel(responses=[answer], sleep=args.token_latency / 4)  # ~4 ký tự/token
+        retriever = RunnableLambda(lambda q: [Document(page_content="Kiến thức nền giả lập.")])
+        chain, query = build_rag_chain(llm, retriever), "Câu hỏi giả lập"
+
+    print(f"{'mode':<11}{'first visible (s)':>19}{'total (s)':>12}{'discord calls':>15}")
+    for label, streaming in (("send_long", False), ("streaming", True)):
+        first, total, calls = await measure(chain, query, streaming)
+        print(f"{label:<11}{first:>19.2f}{total:>12.2f}{calls:>15}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
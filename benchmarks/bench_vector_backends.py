@@ -0,0 +1,85 @@
+# benchmarks/bench_vector_backends.py
+"""
+Benchmark: truy vấn top-k trên Chroma vs NumpyVectorIndex (VECTOR_BACKEND=numpy).
+
+Chạy từ thư mục gốc:
+    python -m benchmarks.bench_vector_backends --chunks 2000 --queries 200
+    python -m benchmarks.bench_vector_backends --chunks 20000 --dim 1024 -k 5
+
+Dùng embedding giả (deterministic) cùng số chiều với mxbai-embed-large để chỉ đo phần tìm kiếm,
+không tính thời gian gọi model. Vector query được embed trước cho cả hai backend.
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.numpy_index import NumpyVectorIndex
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _measure(search, query_vectors):
+    timings = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        search(vector)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="Số chunk trong index")
+    parser.add_argument("--queries", type=int, default=200, help="Số truy vấn đo")
+    parser.add_argument("--dim", type=int, default=1024, help="Số chiều embedding")
+    parser.add_argument("-k", type=int, default=5, help="Số document trả về mỗi truy vấn")
+    args = parser.parse_args()
+
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    path = tempfile.mkdtemp(prefix="bench-vectors-")
+    try:
+        texts = [f"Đoạn kiến thức số {i} về kỹ năng và nghề nghiệp." for i in range(args.chunks)]
+        vectorstore = Chroma(
+            collection_name=f"bench-{uuid.uuid4().hex[:8]}", embedding_function=embeddings, persist_directory=path
+        )
+        for start in range(0, len(texts), 1000):
+            vectorstore.add_texts(texts[start:start + 1000])
+
+        start = time.perf_counter()
+        index = NumpyVectorIndex.from_vectorstore(vectorstore, path)
+        export_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        index = NumpyVectorIndex.from_vectorstore(vectorstore, path)  # Lần 2: mmap file .npy
+        load_ms = (time.perf_counter() - start) * 1000
+
+        query_vectors = [embeddings.embed_query(f"câu hỏi {i}") for i in range(args.queries)]
+        results = {
+            "chroma": _measure(lambda v: vectorstore.similarity_search_by_vector(v, k=args.k), query_vectors),
+            "numpy": _measure(lambda v: index.search(v, k=args.k), query_vectors),
+        }
+
+        print(f"{args.chunks} chunk x {args.dim} chiều, {args.queries} truy vấn, k={args.k}")
+        print(f"numpy: export từ Chroma {export_ms:.1f} ms, nạp lại (mmap) {load_ms:.1f} ms")
+        print(f"{'backend':<10}{'mean (ms)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}{'qps':>10}")
+        for name, timings in results.items():
+            mean = statistics.mean(timings)
+            print(
+                f"{name:<10}{mean:>12.3f}{_percentile(timings, 0.5):>12.3f}"
+                f"{_percentile(timings, 0.95):>12.3f}{1000 / mean:>10.0f}"
+            )
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
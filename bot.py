@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from utils.database import init_db
+from utils.database import init_db, close_db, get_chat_writer
 import asyncio
 import config
 import events
@@ -9,9 +9,12 @@ from commands import setup as setup_commands
 from events import on_ready
 from events import on_message
 from events import on_member_join
+from rag.engine import close_rag_engine
+from rag.model_manager import get_model_manager
+from rag.cv_worker_pool import get_cv_worker_pool
+from utils.http_clients import close_http_clients
 import logging
 
-init_db()
 logging.basicConfig(
     filename="logs/bot.log",
     level=logging.DEBUG,
@@ -45,9 +48,20 @@ async def on_member_join(member):
 
 
 async def main():
-    async with bot:
-        await setup_commands(bot)  # Đảm bảo async
-        await bot.start(config.DISCORD_TOKEN)
+    try:
+        await init_db()
+        get_chat_writer().start()  # Ghi chat history theo batch trong nền
+        get_cv_worker_pool().start()  # Spawn sẵn worker parse CV
+        async with bot:
+            await setup_commands(bot)  # Đảm bảo async
+            await bot.start(config.DISCORD_TOKEN)
+    finally:
+        # Dừng keep-alive, đóng RAG engine và các pool HTTP dùng chung khi bot tắt
+        get_model_manager().close()
+        await get_cv_worker_pool().aclose()
+        close_rag_engine()
+        await close_http_clients()
+        await close_db()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,65 +1,87 @@
 import discord
 from discord.ext import commands
-import aiohttp
 import json
-from config import OLLAMA_MODEL, PREFIX
-from langchain_community.llms import Ollama
+from config import PREFIX, STREAM_RESPONSES, ANSWER_CACHE_ENABLED, CV_MAX_BYTES
 
 # Imports cho RAG & CV
-from rag.rag_chain import get_rag_chain
-from rag.vectorstore import get_vectorstore
-from rag.cv_parser import process_cv_data
-# 💡 Cần format_experience_to_text
-from rag.analysis_logic import analyze_and_suggest_skills, format_experience_to_text
+from rag.engine import get_rag_engine
+from rag.answer_cache import get_answer_cache
+from rag.cv_worker_pool import get_cv_worker_pool, CVParseTimeout
+from rag.analysis_logic import aanalyze_and_suggest_skills, astream_analyze_and_suggest_skills
+from rag.cv_session_cache import get_cv_session_cache
+from rag.cv_result_cache import get_cv_result_cache
 # 💡 IMPORTS POSTGRESQL MỚI
-from utils.database import save_chat, save_cv_data, get_cv_data
-from utils.api_helper import send_long_message
+from utils.database import save_chat
+from utils.api_helper import send_long_message, send_streaming_message
+from utils.llm_scheduler import get_llm_scheduler, queue_notifier, QueueFullError, PRIORITY_CHAT, PRIORITY_CV
+from events.on_message import sanitize_input, check_rate_limit
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+SUGGESTIONS_HEADER = "**💡 Đề xuất cải thiện kỹ năng (Dựa trên Kiến thức nền):**\n"
 
 
 class AI(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Cho lệnh !chat
-        self.rag_chain = get_rag_chain()
-
-        # Cho lệnh !cv (Phân tích)
-        self.vectorstore = get_vectorstore()
-        self.llm = Ollama(model=OLLAMA_MODEL)
+        # Dùng chung RAG engine (1 LLM, 1 embedding client, 1 collection) cho cả !chat và !cv
+        self.engine = get_rag_engine()
+        self.scheduler = get_llm_scheduler()
+        self.cv_cache = get_cv_session_cache()
+        self.cv_pool = get_cv_worker_pool()
+        self.cv_results = get_cv_result_cache()
+
+    def _llm_slot(self, ctx, priority):
+        """Slot trong hàng đợi Ollama dùng chung với mention (báo vị trí nếu phải chờ)."""
+        return self.scheduler.slot(
+            ctx.author.id, ctx.guild.id if ctx.guild else None, priority, on_queued=queue_notifier(ctx)
+        )
 
     @commands.command(name='chat')
     async def chat(self, ctx, *, query: str):
+        # Cùng giới hạn tần suất với mention
+        if not check_rate_limit(ctx.author.id):
+            await ctx.send("Bạn đang gửi quá nhiều tin nhắn. Hãy chờ một chút rồi thử lại!")
+            return
+
         try:
-            cv_data = get_cv_data(ctx.author.id)
+            # Cache CV (LRU/TTL, đọc DB khi miss): context CV đã dựng sẵn từ lúc !cv -> chỉ tra dict
+            cv_state = await self.cv_cache.get(ctx.author.id)
             modified_query = query
-            if cv_data:
-                experience_text = format_experience_to_text(
-                    cv_data.get('experience', []))
-                skills_list = cv_data.get('skills', [])
-                # Đảm bảo skills là list
-                if skills_list and isinstance(skills_list[0], str):
-                    skills_text = f"Kỹ năng đã liệt kê: {
-                        ', '.join(skills_list)}"
-                else:
-                    skills_text = ""
-
-                cv_context = (
-                    "--- THÔNG TIN CV CỦA NGƯỜI DÙNG ---\n"
-                    f"Chức danh: {
-                        cv_data['personal_info'].get('title', 'N/A')}\n"
-                    f"{experience_text}\n{skills_text}\n"
-                    "----------------------------------\n"
-                    "LƯU Ý: Nếu câu hỏi của người dùng là kiểm tra kiến thức, hãy sử dụng thông tin CV trên để đặt câu hỏi về các kỹ năng đã liệt kê hoặc so sánh với kiến thức nền (knowledge base). Ví dụ: đặt câu hỏi về Next.js nếu họ liệt kê Next.js."
+            if cv_state:
+                modified_query = f"{cv_state.context} \n\nTRUY VẤN CỦA TÔI: {query}"
+
+            # Chỉ cache câu hỏi chung (không kèm CV) vì câu trả lời theo CV là riêng từng người
+            lookup = None
+            if ANSWER_CACHE_ENABLED and not cv_state:
+                lookup = await get_answer_cache().alookup(sanitize_input(query), self.engine)
+
+            if lookup and lookup.answer:
+                response = lookup.answer
+                await send_long_message(ctx, response)
+            else:
+                # Câu hỏi trùng đang chạy (cùng query + context + model) dùng chung 1 generation;
+                # chỉ generation thật mới lấy slot trong hàng đợi Ollama
+                # Khối CV đã nằm trong query -> trừ số token của nó khỏi ngân sách context retrieve
+                answer = self.engine.astream_answer(
+                    modified_query, slot=lambda: self._llm_slot(ctx, PRIORITY_CHAT),
+                    reserved_tokens=cv_state.tokens if cv_state else 0,
                 )
+                if STREAM_RESPONSES:
+                    # Hiện token ngay khi Ollama sinh ra (edit tin nhắn, tự sang tin mới khi quá 1900 ký tự)
+                    response = await send_streaming_message(ctx, answer)
+                else:
+                    # Gom toàn bộ câu trả lời rồi gửi qua nhiều tin nhắn nếu cần
+                    response = "".join([chunk async for chunk in answer])
+                    await send_long_message(ctx, response)
 
-                modified_query = f"{cv_context} \n\nTRUY VẤN CỦA TÔI: {query}"
-
-            response = self.rag_chain.invoke(modified_query)
-
-            # Gửi response có thể dài qua nhiều tin nhắn nếu cần
-            await send_long_message(ctx, response)
-
-            save_chat(ctx.author.id, query, response)
+            if lookup and not lookup.answer:
+                get_answer_cache().store(lookup, response)
+            await save_chat(ctx.author.id, query, response)
 
+        except QueueFullError as e:
+            await ctx.send(str(e))
         except Exception as e:
             await ctx.send(f"Lỗi RAG: {type(e).__name__}: {str(e)}")
 
@@ -69,24 +91,36 @@ class AI(commands.Cog):
             await ctx.send(f"Vui lòng gửi kèm **file CV (PDF)** sau lệnh `{PREFIX}cv`.")
             return
 
+        if not check_rate_limit(ctx.author.id):
+            await ctx.send("Bạn đang gửi quá nhiều tin nhắn. Hãy chờ một chút rồi thử lại!")
+            return
+
         attachment = ctx.message.attachments[0]
+        # Discord đã báo dung lượng trong metadata -> file quá lớn thì không tải về
+        if attachment.size > CV_MAX_BYTES:
+            await ctx.send(f"❌ File CV quá lớn ({attachment.size / 1024 / 1024:.1f} MB), tối đa {CV_MAX_BYTES / 1024 / 1024:.0f} MB.")
+            return
         await ctx.send(f"Đã nhận file **{attachment.filename}**. Đang tiến hành phân tích CV")
 
         try:
             # 1. Tải file từ Discord (Bất đồng bộ)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(attachment.url) as resp:
-                    pdf_content = await resp.read()
-
-            # 2. Xử lý OCR và Parsing JSON (Chạy trong thread pool)
-            cv_result = await self.bot.loop.run_in_executor(
-                None,
-                lambda: process_cv_data(pdf_content)
-            )
+            pdf_content = await attachment.read()
+
+            # 2. Xử lý OCR và Parsing JSON (Chạy trong process pool riêng, báo vị trí nếu phải chờ)
+            # File đã từng gửi (cùng sha256, cùng version parser) -> lấy lại kết quả, không parse lại
+            digest = self.cv_results.digest(pdf_content)
+            cv_result = await self.cv_results.get_parsed(digest)
+            if cv_result is None:
+                cv_result, timings = await self.cv_pool.parse(pdf_content, on_queued=queue_notifier(ctx))
+                if "error" not in cv_result:
+                    await self.cv_results.save_parsed(digest, cv_result)
+            else:
+                timings = {"cache": 0.0}
 
             print("\n--- KẾT QUẢ CV JSON ĐÃ PARSE (DEBUG) ---")
             print(json.dumps(cv_result, indent=4, ensure_ascii=False))
             print("---------------------------------------\n")
+            logger.debug("Thời gian parse CV (ms): " + ", ".join(f"{stage} {t * 1000:.0f}" for stage, t in timings.items()))
 
             if "error" in cv_result:
                 await ctx.send(f"❌ Lỗi Parsing CV: {cv_result['error']}")
@@ -94,26 +128,50 @@ class AI(commands.Cog):
 
             # 💡 BƯỚC MỚI: LƯU DỮ LIỆU CV VÀO POSTGRESQL
             job_title = cv_result['personal_info'].get('title', 'Unknown Role')
-            save_cv_data(ctx.author.id, cv_result, job_title)
-            await ctx.send("Dữ liệu CV của bạn đang được xử lí.Sau khi xử lí xong bạn có thể `!chat` để trò chuyện và kiểm tra kỹ năng dựa trên CV này.")
+            if await self.cv_cache.save(ctx.author.id, cv_result, job_title):
+                await ctx.send("Dữ liệu CV của bạn đang được xử lí.Sau khi xử lí xong bạn có thể `!chat` để trò chuyện và kiểm tra kỹ năng dựa trên CV này.")
+            else:
+                await ctx.send("⚠️ Không lưu được CV lúc này, `!chat` sẽ chưa dùng được CV này. Phần phân tích vẫn tiếp tục.")
+
+            # Phân tích đã sinh cho đúng file này với cùng prompt/model/knowledge base -> không gọi LLM
+            kb_version = self.engine.kb_version
+            suggestions = await self.cv_results.get_analysis(digest, kb_version)
+            if suggestions is not None:
+                await self._respond_to_cv_analysis(ctx, cv_result, suggestions)
+                return
 
-            # 3. Phân tích và Đề xuất Kỹ năng
-            self.vectorstore._embedding_function.embed_query("warmup query")
+            if STREAM_RESPONSES:
+                # 3+4. Gửi tóm tắt trước, sau đó stream phần đề xuất kỹ năng
+                await self._send_cv_summary(ctx, cv_result)
+                # Phân tích CV nặng -> ưu tiên thấp hơn chat trong hàng đợi Ollama
+                async with self._llm_slot(ctx, PRIORITY_CV):
+                    suggestions = await send_streaming_message(
+                        ctx, astream_analyze_and_suggest_skills(cv_result, self.engine), prefix=SUGGESTIONS_HEADER
+                    )
+                await self.cv_results.save_analysis(digest, kb_version, suggestions)
+                return
 
-            retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
-            suggestions = await self.bot.loop.run_in_executor(
-                None,
-                lambda: analyze_and_suggest_skills(
-                    cv_result, self.llm, retriever)
-            )
+            # 3. Phân tích và Đề xuất Kỹ năng
+            async with self._llm_slot(ctx, PRIORITY_CV):
+                suggestions = await aanalyze_and_suggest_skills(cv_result, self.engine)
+            await self.cv_results.save_analysis(digest, kb_version, suggestions)
 
             # 4. Tổng hợp và Trả lời
             await self._respond_to_cv_analysis(ctx, cv_result, suggestions)
 
+        except (QueueFullError, CVParseTimeout) as e:
+            await ctx.send(str(e))
         except Exception as e:
             await ctx.send(f"Đã xảy ra lỗi nghiêm trọng trong quá trình xử lý CV: ```{type(e).__name__}: {str(e)[:250]}...```")
 
     async def _respond_to_cv_analysis(self, ctx, cv_data: dict, suggestions: str):
+        # Gửi phần tóm tắt CV trước
+        await self._send_cv_summary(ctx, cv_data)
+
+        # Gửi phần đề xuất cải thiện kỹ năng
+        await send_long_message(ctx, SUGGESTIONS_HEADER + suggestions)
+
+    async def _send_cv_summary(self, ctx, cv_data: dict):
         info = cv_data.get("personal_info", {})
         experience = cv_data.get("experience", [])
         summary = (
@@ -127,13 +185,8 @@ class AI(commands.Cog):
             summary += f"**- Công việc gần nhất:** {experience[0].get('company', 'N/A')} ({
                 experience[0].get('role', 'N/A')}) - {experience[0].get('duration', 'N/A')}\n\n"
 
-        # Gửi phần tóm tắt CV trước
         await send_long_message(ctx, summary)
 
-        # Gửi phần đề xuất cải thiện kỹ năng
-        suggestions_with_header = "**💡 Đề xuất cải thiện kỹ năng (Dựa trên Kiến thức nền):**\n" + suggestions
-        await send_long_message(ctx, suggestions_with_header)
-
 
 async def setup(bot):
     await bot.add_cog(AI(bot))
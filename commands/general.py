@@ -3,6 +3,16 @@ from discord.ext import commands
 import config
 import asyncio
 from rag.rag_chain import get_rag_chain
+from rag.answer_cache import get_answer_cache
+from rag.engine import get_rag_engine
+from utils.llm_scheduler import get_llm_scheduler
+from rag.single_flight import get_single_flight
+from rag.context_builder import get_context_builder
+from rag.model_manager import get_model_manager
+from utils.database import get_chat_writer
+from rag.cv_session_cache import get_cv_session_cache
+from rag.cv_worker_pool import get_cv_worker_pool
+from rag.cv_result_cache import get_cv_result_cache
 
 class General(commands.Cog):
     def __init__(self, bot):
@@ -19,5 +29,97 @@ class General(commands.Cog):
         embed.add_field(name="Phiên bản", value="1.0", inline=True)
         embed.add_field(name="Lương Hải Lâm", value="Lem", inline=True)
         await ctx.send(embed=embed)
+
+    @commands.command(name='stats')
+    async def stats(self, ctx):
+        embed = discord.Embed(title="Thống kê Bot", color=0x0099ff)
+        cache = get_answer_cache().stats()
+        embed.add_field(
+            name="Answer cache",
+            value=f"{cache['hits']} hit / {cache['misses']} miss ({cache['hit_rate']:.0%}) - {cache['entries']} mục",
+            inline=False
+        )
+        queue = get_llm_scheduler().stats()
+        embed.add_field(
+            name="Hàng đợi LLM",
+            value=(
+                f"{queue['running']}/{queue['max_concurrency']} đang chạy, {queue['queued']} đang chờ "
+                f"(cao nhất {queue['peak_queued']}) - chờ TB {queue['avg_wait']:.1f}s, từ chối {queue['rejected']}"
+            ),
+            inline=False
+        )
+        flights = get_single_flight().stats()
+        embed.add_field(
+            name="Single-flight",
+            value=(
+                f"{flights['followers']} request trùng đã gộp vào {flights['leaders']} generation, "
+                f"{flights['retries']} lần chạy lại khi leader thất bại"
+            ),
+            inline=False
+        )
+        context = get_context_builder().stats()
+        embed.add_field(
+            name="Context",
+            value=f"{context['tokens_saved']} token tiết kiệm / {context['tokens_in']} token retrieve ({context['requests']} request)",
+            inline=False
+        )
+        models = get_model_manager().stats()
+        loads = ", ".join(f"{m} {t:.1f}s" for m, t in models["load_times"].items()) or "chưa nạp"
+        embed.add_field(
+            name="Ollama",
+            value=(
+                f"TTFT warm {models['warm_avg_ttft']:.2f}s ({models['warm_requests']}), "
+                f"cold {models['cold_avg_ttft']:.2f}s ({models['cold_requests']}) - nạp lúc khởi động: {loads}"
+            ),
+            inline=False
+        )
+        cv_cache = get_cv_session_cache().stats()
+        embed.add_field(
+            name="CV cache",
+            value=f"{cv_cache['hits']} hit / {cv_cache['misses']} miss ({cv_cache['hit_rate']:.0%}) - {cv_cache['entries']} user",
+            inline=False
+        )
+        pool = get_cv_worker_pool().stats()
+        embed.add_field(
+            name="CV parser",
+            value=(
+                f"{pool['busy']}/{pool['workers']} worker bận, {pool['queued']} CV chờ, {pool['jobs']} CV đã parse - "
+                f"TB chờ {pool['avg_queue'] * 1000:.0f}ms, đọc PDF {pool['avg_extract'] * 1000:.0f}ms, "
+                f"tách {pool['avg_split'] * 1000:.0f}ms, parse {pool['avg_parse'] * 1000:.0f}ms "
+                f"(timeout {pool['timeouts']}, thay worker {pool['recycled']})"
+            ),
+            inline=False
+        )
+        results = get_cv_result_cache().stats()
+        embed.add_field(
+            name="CV đã gửi lại",
+            value=(
+                f"parse {results['parse_hits']} hit / {results['parse_misses']} miss, "
+                f"phân tích {results['analysis_hits']} hit / {results['analysis_misses']} miss"
+            ),
+            inline=False
+        )
+        writes = get_chat_writer().stats()
+        embed.add_field(
+            name="Chat history",
+            value=(
+                f"{writes['written']} dòng / {writes['batches']} batch, {writes['queued']} đang chờ, "
+                f"thử lại {writes['retried']}, bỏ {writes['dropped']}"
+            ),
+            inline=False
+        )
+        embeddings = get_rag_engine().embeddings
+        if hasattr(embeddings, "stats"):
+            emb = embeddings.stats()
+            if "hits" in emb:
+                embed.add_field(name="Embedding cache", value=f"{emb['hits']} hit / {emb['misses']} miss", inline=False)
+            if "batches" in emb:
+                embed.add_field(
+                    name="Embedding batch",
+                    value=f"{emb['batched_queries']} query / {emb['batches']} batch (lớn nhất {emb['largest_batch']})",
+                    inline=False
+                )
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(General(bot))
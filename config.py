@@ -15,12 +15,91 @@ INTENTS.members = True
 # Ollama và RAG config
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3:8b")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 300))  # giây, read timeout cho 1 lần generation
+OLLAMA_KEEP_ALIVE = int(os.getenv("OLLAMA_KEEP_ALIVE", 1800))  # giây Ollama giữ model trong RAM sau mỗi lần dùng
+OLLAMA_KEEPALIVE_INTERVAL = float(os.getenv("OLLAMA_KEEPALIVE_INTERVAL", 240))  # giây giữa 2 lần ping keep_alive
+OLLAMA_WARM_WINDOW = float(os.getenv("OLLAMA_WARM_WINDOW", 3600))  # chỉ ping nếu có request trong khoảng này
+# HTTP client dùng chung tới Ollama
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", 8))  # số kết nối tối đa mỗi host
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", 60))  # giây giữ kết nối rảnh
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
 DB_USER = os.getenv("DB_USER")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
+DATABASE_URL = os.getenv("DATABASE_URL")  # ghi đè URL (vd: sqlite+aiosqlite:///./test.db)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # giây chờ lấy kết nối từ pool
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # giây, tạo lại kết nối cũ
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", 50))  # số dòng chat history mỗi lần bulk insert
+CHAT_WRITE_INTERVAL_MS = float(os.getenv("CHAT_WRITE_INTERVAL_MS", 500))  # chờ tối đa trước khi ghi batch chưa đầy
+CHAT_WRITE_QUEUE_MAX = int(os.getenv("CHAT_WRITE_QUEUE_MAX", 10000))
+CHAT_WRITE_RETRIES = int(os.getenv("CHAT_WRITE_RETRIES", 3))
+CHAT_PARTITION_MONTHS_AHEAD = int(os.getenv("CHAT_PARTITION_MONTHS_AHEAD", 2))  # partition tháng tạo trước
+CHAT_RETENTION_MONTHS = int(os.getenv("CHAT_RETENTION_MONTHS", 6))  # giữ trong bảng chính bấy nhiêu tháng
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "./archive/chat_history")
 VECTOR_STORE_PATH = "./rag/vectorstore"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()  # "chroma" hoặc "numpy" (index trong process)
+KNOWLEDGE_PATH = os.getenv("KNOWLEDGE_PATH", "data")  # Thư mục (hoặc file) txt/md/pdf/docx cho knowledge base
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", min(4, os.cpu_count() or 1)))  # process parse song song
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))  # số chunk mỗi lần embed + upsert
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", 2))  # Số snapshot index mới nhất luôn giữ lại
+INDEX_POLL_INTERVAL = float(os.getenv("INDEX_POLL_INTERVAL", 10))  # giây, bot kiểm tra CURRENT để hot-swap
 EMBEDDING_MODEL = "all-MiniLM-L6-v2" 
 WELCOME_CHANNEL_ID = int(
     os.getenv("WELCOME_CHANNEL_ID", 0)
 )
+
+# Streaming câu trả lời vào Discord (edit tin nhắn theo từng đợt token)
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.0))  # giây, tránh rate limit edit
+
+# Semantic answer cache (câu hỏi gần giống nhau -> dùng lại câu trả lời)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))  # cosine similarity
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 256))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 3600))  # giây
+
+# Cache CV của từng user (kèm context dựng sẵn cho !chat)
+CV_CACHE_MAX_ENTRIES = int(os.getenv("CV_CACHE_MAX_ENTRIES", 1024))
+CV_CACHE_TTL = int(os.getenv("CV_CACHE_TTL", 1800))  # giây
+
+# Cache kết quả !cv theo sha256 của file PDF (bảng cv_result_cache)
+CV_RESULT_CACHE_ENABLED = os.getenv("CV_RESULT_CACHE_ENABLED", "true").lower() == "true"
+
+# Giới hạn file CV (kiểm tra trước khi tải và khi đọc PDF)
+CV_MAX_BYTES = int(os.getenv("CV_MAX_BYTES", 5 * 1024 * 1024))
+CV_MAX_PAGES = int(os.getenv("CV_MAX_PAGES", 10))
+CV_EXTRACT_TIME_BUDGET = float(os.getenv("CV_EXTRACT_TIME_BUDGET", 10))  # giây cho bước đọc text
+
+# Process pool parse CV PDF (tách khỏi process của bot)
+CV_WORKERS = int(os.getenv("CV_WORKERS", 2))
+CV_WORKER_MAX_JOBS = int(os.getenv("CV_WORKER_MAX_JOBS", 50))  # thay worker sau bấy nhiêu CV
+CV_WORKER_MAX_MEMORY_MB = float(os.getenv("CV_WORKER_MAX_MEMORY_MB", 1024))  # hoặc khi peak RSS (MB) vượt mức này
+CV_PARSE_TIMEOUT = float(os.getenv("CV_PARSE_TIMEOUT", 30))  # giây, quá hạn thì kill worker
+
+# Bộ chuẩn kỹ năng cho skill matcher của !cv (kỹ năng liệt kê nhưng không có bằng chứng)
+SKILL_TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH", "resources/skill_standards.txt")
+
+# Cache embedding trên đĩa (key = model + sha256 của text)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./rag/embedding_cache.sqlite3")
+
+# Hàng đợi LLM dùng chung (mention, !chat, !cv)
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 2))  # số request chạy cùng lúc tới Ollama
+LLM_MAX_QUEUED_PER_USER = int(os.getenv("LLM_MAX_QUEUED_PER_USER", 3))
+LLM_PRIORITY_AGING = float(os.getenv("LLM_PRIORITY_AGING", 30))  # giây chờ để job tăng 1 bậc ưu tiên
+
+# Context cho prompt: ngân sách token cho phần knowledge base, cân bằng liên quan/đa dạng (MMR)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1200))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", 0.7))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "")  # tên tokenizer HuggingFace; trống = ước lượng
+
+# Gộp các request giống hệt nhau đang chạy cùng lúc thành 1 generation
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Micro-batch embedding query: gom các query đồng thời thành 1 lời gọi embed_documents
+EMBED_BATCH_ENABLED = os.getenv("EMBED_BATCH_ENABLED", "true").lower() == "true"
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", 16))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", 5))
@@ -1,7 +1,11 @@
 import config
 from utils.logger import setup_logger
-from rag.rag_chain import get_rag_chain
+from rag.engine import get_rag_engine
+from rag.answer_cache import get_answer_cache
 from utils.database import save_chat
+from utils.api_helper import send_long_message, send_streaming_message
+from utils.llm_scheduler import get_llm_scheduler, queue_notifier, QueueFullError, PRIORITY_CHAT
+from functools import partial
 import re
 import time
 
@@ -33,16 +37,29 @@ def sanitize_input(text):
     text = re.sub(r'\s+', ' ', text.strip())
     return text[:500]  # Limit query length
 
-async def get_rag_response(query):
+async def get_rag_response(query, slot=None):
     """Get RAG response with error handling"""
     try:
-        rag_chain = get_rag_chain()  # Create fresh chain per request
-        response = rag_chain.invoke({"query": query})["result"]
-        return response
+        # Shared engine - no new LLM/embeddings/Chroma client per request
+        # Identical concurrent questions share one generation (single-flight)
+        return "".join([chunk async for chunk in get_rag_engine().astream_answer(query, slot)])
+    except QueueFullError:
+        raise
     except Exception as e:
         logger.error(f"RAG processing failed: {e}")
         raise RuntimeError("Xin lỗi, tôi không thể xử lý câu hỏi này lúc này.")
 
+async def stream_rag_response(query, slot=None):
+    """Stream RAG response tokens with error handling"""
+    try:
+        async for chunk in get_rag_engine().astream_answer(query, slot):
+            yield chunk
+    except QueueFullError:
+        raise
+    except Exception as e:
+        logger.error(f"RAG streaming failed: {e}")
+        raise RuntimeError("Xin lỗi, tôi không thể xử lý câu hỏi này lúc này.")
+
 async def on_message(message, bot):
     if message.author == bot.user:
         return
@@ -64,15 +81,36 @@ async def on_message(message, bot):
 
         try:
             logger.info(f"Processing RAG query from {message.author}: {query}")
-            response = await get_rag_response(query)
-
-            # Handle response length
-            max_length = 1900  # Discord limit is 2000, leave room for formatting
-            if len(response) > max_length:
-                response = response[:max_length] + "..."
 
-            await message.channel.send(response)
-            save_chat(message.author.id, query, response)
+            # Near-duplicate questions are answered from the semantic cache
+            lookup = None
+            if config.ANSWER_CACHE_ENABLED:
+                lookup = await get_answer_cache().alookup(query, get_rag_engine())
+
+            if lookup and lookup.answer:
+                response = lookup.answer
+                await send_long_message(message.channel, response)
+            else:
+                # Shared Ollama queue (bounded concurrency, fair per user/guild) for mentions, !chat and !cv
+                slot = partial(
+                    get_llm_scheduler().slot, message.author.id, message.guild.id if message.guild else None,
+                    PRIORITY_CHAT, on_queued=queue_notifier(message.channel)
+                )
+                if config.STREAM_RESPONSES:
+                    # Show tokens as they arrive, rolling over to new messages past 1900 chars
+                    response = await send_streaming_message(message.channel, stream_rag_response(query, slot))
+                else:
+                    response = await get_rag_response(query, slot)
+
+                    # Handle response length at send time only: the cache and chat history keep the full answer
+                    max_length = 1900  # Discord limit is 2000, leave room for formatting
+                    reply = response[:max_length] + "..." if len(response) > max_length else response
+
+                    await message.channel.send(reply)
+
+            if lookup and not lookup.answer:
+                get_answer_cache().store(lookup, response)
+            await save_chat(message.author.id, query, response)
 
         except RuntimeError as e:
             # User-friendly error message
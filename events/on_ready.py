@@ -1,8 +1,10 @@
+import asyncio
 import discord
 from utils.logger import setup_logger
-from rag.data_loader import load_data
-from rag.vectorstore import get_vectorstore
+from rag.engine import get_rag_engine
+from rag.vectorstore import update_vectorstore
 from utils.api_helper import test_ollama_connection
+from rag.model_manager import get_model_manager
 import config
 
 logger = setup_logger()
@@ -11,17 +13,25 @@ async def on_ready(bot):
     logger.info(f'Bot {bot.user} đã sẵn sàng!')
     print(f'Bot {bot.user} đã sẵn sàng!')
     
-    # Kiểm tra Ollama
-    if test_ollama_connection():
-        print("Ollama kết nối thành công.")
+    # Kiểm tra Ollama (chỉ list model, không pull)
+    ok, status = await test_ollama_connection()
+    print(status)
+    if ok:
+        # Nạp song song model chat + embedding và giữ chúng trong RAM khi còn traffic
+        get_model_manager().start()
     else:
-        print("Lỗi kết nối Ollama!")
+        logger.error(status)
     
-    # Init RAG
-    try:
-        get_vectorstore()  # Kiểm tra
+    # Init RAG engine dùng chung (1 LLM, 1 embedding client, 1 collection)
+    # Các bước đồng bộ (mở Chroma, build index) chạy trong thread để không chặn event loop
+    engine = await asyncio.to_thread(get_rag_engine)
+    existing = await asyncio.to_thread(engine.vectorstore.get, limit=1)
+    if existing["ids"]:
         print("Vector store RAG đã sẵn sàng.")
-    except Exception:
-        docs = load_data()
-        get_vectorstore(docs=docs)
+    else:
+        await asyncio.to_thread(update_vectorstore)
+        await asyncio.to_thread(engine.reload)
         print("Đã tạo vector store RAG mới.")
+
+    # Theo dõi CURRENT để hot-swap khi update_vectorstore.py build snapshot mới
+    engine.start_watcher()
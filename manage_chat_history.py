@@ -0,0 +1,50 @@
+# manage_chat_history.py
+# Export / retention cho bảng chat_history (chạy tay hoặc qua cron, vd: mỗi đầu tháng)
+#   python manage_chat_history.py export --user 123 --since 2024-01-01 -o user_123.jsonl.gz
+#   python manage_chat_history.py retention --months 6
+from datetime import datetime
+import argparse
+import asyncio
+import sys
+
+from utils.database import archive_chat_history, close_db, ensure_chat_partitions, export_chat_history
+from utils.logger import setup_logger
+import config
+
+
+async def run(args):
+    try:
+        if args.command == "export":
+            count = await export_chat_history(args.output, user_id=args.user, since=args.since, until=args.until)
+            print(f"Đã export {count} dòng chat history vào {args.output}")
+        else:
+            archived = await archive_chat_history(months=args.months, archive_dir=args.archive_dir)
+            # Tạo trước partition cho các tháng tới để insert không rơi vào partition default
+            await ensure_chat_partitions()
+            total = sum(count for _, count in archived)
+            print(f"Retention: đã lưu trữ {total} dòng trong {len(archived)} file")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    logger = setup_logger()
+    parser = argparse.ArgumentParser(description="Quản lý bảng chat_history")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Xuất chat history ra JSON Lines (stream, không nạp cả bảng)")
+    export.add_argument("--user", type=int, help="Chỉ xuất của 1 user")
+    export.add_argument("--since", type=datetime.fromisoformat, help="Từ thời điểm (ISO, UTC)")
+    export.add_argument("--until", type=datetime.fromisoformat, help="Đến trước thời điểm (ISO, UTC)")
+    export.add_argument("-o", "--output", default="chat_history.jsonl.gz", help="File đích (.gz để nén)")
+
+    retention = sub.add_parser("retention", help="Lưu trữ và xóa các tháng cũ khỏi bảng chính")
+    retention.add_argument("--months", type=int, default=config.CHAT_RETENTION_MONTHS,
+                           help="Số tháng gần nhất được giữ lại")
+    retention.add_argument("--archive-dir", default=config.CHAT_ARCHIVE_DIR)
+
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except Exception as e:
+        logger.error(f"Lỗi khi xử lý chat history: {str(e)}")
+        sys.exit(1)
@@ -2,3 +2,4 @@ from .rag_chain import *
 from .embeddings import *
 from .vectorstore import *
 from .data_loader import *
+from .engine import *
@@ -5,11 +5,12 @@ import re
 from typing import List, Dict, Any
 
 from langchain_core.prompts import ChatPromptTemplate
-# 💡 Đảm bảo import BaseRetriever để tương thích
-from langchain_core.retrievers import BaseRetriever
-from langchain_community.llms import Ollama
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnablePassthrough
+from rag.engine import RAGEngine, get_rag_engine
+from rag.rag_chain import format_docs
+from rag.model_manager import get_model_manager
+from rag.skill_matcher import get_skill_matcher
 
 # --- HÀM TIỆN ÍCH: CHUYỂN ĐỔI LIST/DICT SANG STRING ---
 
@@ -44,7 +45,7 @@ QUY TẮC SẮT – KHÔNG ĐƯỢC VI PHẠM DÙ CHỈ 1 LẦN:
    - experience[].role + experience[].company 
    - skills[]
 2. Chỉ được nói ứng viên thuộc ngành nào khi thấy từ khóa thực sự xuất hiện trong 3 trường trên.
-3. Nếu thấy "Python", "NextJs", "React", "AWS", "Nodejs", "GraphQL"... trong skills NHƯNG không có mô tả dự án/kinh nghiệm → PHẢI nói: "XÓA NGAY DÒNG NÀY KHỎI CV – không có kinh nghiệm thật sẽ bị loại ngay vòng gửi xe".
+3. Phần "Kiểm tra kỹ năng" bên dưới đã được hệ thống đối chiếu sẵn, chính xác – KHÔNG tự suy luận lại. Với MỖI kỹ năng trong dòng "KHÔNG có bằng chứng" → PHẢI nói: "XÓA NGAY DÒNG NÀY KHỎI CV – không có kinh nghiệm thật sẽ bị loại ngay vòng gửi xe". Không được bảo xóa kỹ năng ở dòng "CÓ bằng chứng".
 4. Tuyệt đối cấm các câu chung chung kiểu "Có kinh nghiệm làm việc trong lĩnh vực...".
 5. Không bao giờ đề xuất chuyển sang Tech Sales/SaaS/PM nếu CV gốc là sales nội thất/kế toán/HR...
 6. Chỉ được đề xuất tối đa 5 kỹ năng thực tế, phổ biến nhất Việt Nam 2025–2026 cho đúng ngành đó.
@@ -52,6 +53,8 @@ QUY TẮC SẮT – KHÔNG ĐƯỢC VI PHẠM DÙ CHỈ 1 LẦN:
 
 DỮ LIỆU DUY NHẤT ĐƯỢC DÙNG:
 CV gốc: {cv_summary}
+Kiểm tra kỹ năng:
+{skill_facts}
 Knowledge base: {context}
 Ngành thực tế (dựa đúng vào CV): {job_title}
 
@@ -80,15 +83,16 @@ TRẢ LỜI CHÍNH XÁC ĐỊNH DẠNG SAU (copy y nguyên cấu trúc, chỉ th
 <|eot_id|><|start_header_id|>user<|end_header_id|>
 
 CV JSON gốc: {cv_summary}
+Kiểm tra kỹ năng:
+{skill_facts}
 Ngành thực tế: {job_title}
 Context từ knowledge: {context}
 
 Phân tích đi!<|eot_id|><|start_header_id|>assistant<|end_header_id|>"""
 
 
-def analyze_and_suggest_skills(cv_data: dict, llm: Ollama, retriever: BaseRetriever) -> str:
-
-    # 1. Chuẩn bị đầu vào
+def _prepare_analysis_input(cv_data: dict):
+    """Chuẩn bị (cv_summary, kiểm tra kỹ năng, job_title, truy vấn retriever) từ CV JSON."""
     cv_summary_parts = []
 
     # Chuẩn bị Kinh nghiệm
@@ -102,6 +106,8 @@ def analyze_and_suggest_skills(cv_data: dict, llm: Ollama, retriever: BaseRetrie
                                 ', '.join(cv_data['skills'])}")
 
     cv_summary_str = "\n".join(cv_summary_parts)
+    # Kỹ năng liệt kê nhưng không có bằng chứng: tính sẵn bằng skill matcher, LLM chỉ việc dùng
+    skill_facts = get_skill_matcher().analyze(cv_data).to_prompt()
     job_title = cv_data['personal_info'].get('title', 'Unknown Role')
 
     # Làm sạch và giới hạn độ dài chuỗi truy vấn
@@ -111,28 +117,61 @@ def analyze_and_suggest_skills(cv_data: dict, llm: Ollama, retriever: BaseRetrie
     if not clean_job_title:
         clean_job_title = "Technical skills recommendation for professional role"
 
-    # 2. THỰC HIỆN TRUY VẤN TRỰC TIẾP (DIRECT RETRIEVAL)
-
-    # Gọi retriever.get_relevant_documents() (phương thức đồng bộ)
-    # Lỗi AttributeError được khắc phục bằng cách đảm bảo retriever được định kiểu đúng.
-    retrieved_docs: List[Document] = retriever.invoke(clean_job_title)
-
-    # Format context
-    context = "\n\n".join(doc.page_content for doc in retrieved_docs)
+    return cv_summary_str, skill_facts, job_title, clean_job_title
 
-    # 3. Tạo Input và Gọi LLM
 
+def _build_analysis_messages(retrieved_docs: List[Document], cv_summary_str: str, skill_facts: str, job_title: str):
+    """Format context và tạo messages cho LLM từ prompt phân tích."""
+    context = format_docs(retrieved_docs)
     prompt = ChatPromptTemplate.from_template(RAG_ANALYSIS_PROMPT)
-
-    # BƯỚC 3.1: Tạo Input Messages
-    llm_input_messages = prompt.format_messages(
+    return prompt.format_messages(
         context=context,
         cv_summary=cv_summary_str,
+        skill_facts=skill_facts,
         job_title=job_title
     )
 
-    # BƯỚC 3.2: Gọi LLM trực tiếp
-    response = llm.invoke(llm_input_messages)
 
-    # Trả về nội dung (content) của phản hồi LLM
-    return response
+def analyze_and_suggest_skills(cv_data: dict, engine: RAGEngine = None) -> str:
+    # Dùng LLM và retriever của RAG engine chung (không tạo client riêng cho !cv)
+    engine = engine or get_rag_engine()
+
+    # 1. Chuẩn bị đầu vào
+    cv_summary_str, skill_facts, job_title, clean_job_title = _prepare_analysis_input(cv_data)
+
+    # 2. THỰC HIỆN TRUY VẤN TRỰC TIẾP (DIRECT RETRIEVAL)
+    with engine.acquire() as index:
+        retrieved_docs: List[Document] = index.retriever.invoke(clean_job_title)
+
+    # 3. Tạo Input và Gọi LLM
+    llm_input_messages = _build_analysis_messages(retrieved_docs, cv_summary_str, skill_facts, job_title)
+    response = engine.llm.invoke(llm_input_messages)
+
+    # Trả về nội dung (content) của phản hồi LLM (ChatOllama trả về AIMessage)
+    return response.content
+
+
+async def aanalyze_and_suggest_skills(cv_data: dict, engine: RAGEngine = None) -> str:
+    """Phiên bản async của analyze_and_suggest_skills (dùng trong cog, không chặn event loop)."""
+    engine = engine or get_rag_engine()
+
+    cv_summary_str, skill_facts, job_title, clean_job_title = _prepare_analysis_input(cv_data)
+    with engine.acquire() as index:
+        retrieved_docs: List[Document] = await index.retriever.ainvoke(clean_job_title)
+
+    llm_input_messages = _build_analysis_messages(retrieved_docs, cv_summary_str, skill_facts, job_title)
+    response = await engine.llm.ainvoke(llm_input_messages)
+    return response.content
+
+
+async def astream_analyze_and_suggest_skills(cv_data: dict, engine: RAGEngine = None):
+    """Giống aanalyze_and_suggest_skills nhưng yield từng token (dùng cho streaming vào Discord)."""
+    engine = engine or get_rag_engine()
+
+    cv_summary_str, skill_facts, job_title, clean_job_title = _prepare_analysis_input(cv_data)
+    with engine.acquire() as index:
+        retrieved_docs: List[Document] = await index.retriever.ainvoke(clean_job_title)
+
+    llm_input_messages = _build_analysis_messages(retrieved_docs, cv_summary_str, skill_facts, job_title)
+    async for chunk in get_model_manager().timed(engine.llm.astream(llm_input_messages)):
+        yield chunk.content
@@ -0,0 +1,141 @@
+# rag/answer_cache.py (Semantic cache câu trả lời đặt trước RAG chain)
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+@dataclass
+class _CacheEntry:
+    query: str
+    vector: np.ndarray  # đã chuẩn hóa L2
+    answer: str
+    created_at: float
+
+
+@dataclass
+class CacheLookup:
+    """Kết quả tra cache; giữ lại vector/kb_version để store() không phải embed lại."""
+    query: str
+    vector: np.ndarray
+    kb_version: str
+    answer: str = None
+
+
+def normalize_query(query: str) -> str:
+    """Chuẩn hóa câu hỏi (đã qua sanitize_input) trước khi embed làm key cache."""
+    return " ".join(query.lower().split())
+
+
+class SemanticAnswerCache:
+    """
+    Cache câu trả lời theo độ tương đồng embedding của câu hỏi.
+    - Hit khi cosine similarity >= threshold.
+    - Loại bỏ theo LRU (max_entries) và TTL.
+    - Gắn với kb_version của RAG engine: reindex -> toàn bộ cache bị xóa.
+    """
+
+    def __init__(self, threshold=None, max_entries=None, ttl=None):
+        self.threshold = config.ANSWER_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = config.ANSWER_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = config.ANSWER_CACHE_TTL if ttl is None else ttl
+        self.kb_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    async def alookup(self, query: str, engine) -> CacheLookup:
+        """Embed câu hỏi bằng embedding client của engine và tra cache (answer=None nếu miss)."""
+        kb_version = engine.kb_version
+        vector = await engine.embeddings.aembed_query(normalize_query(query))
+        vector = self._normalize(vector)
+        answer = self.lookup_vector(vector, kb_version)
+        return CacheLookup(query, vector, kb_version, answer)
+
+    def lookup_vector(self, vector: np.ndarray, kb_version: str):
+        with self._lock:
+            self._check_version(kb_version)
+            self._evict_expired()
+
+            best_id, best_score = None, -1.0
+            if self._entries:
+                ids = list(self._entries.keys())
+                matrix = np.stack([self._entries[i].vector for i in ids])
+                scores = matrix @ vector
+                idx = int(np.argmax(scores))
+                best_id, best_score = ids[idx], float(scores[idx])
+
+            if best_id is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                entry = self._entries[best_id]
+                logger.info(f"Answer cache HIT ({best_score:.3f}): '{entry.query[:60]}'")
+                return entry.answer
+
+            self.misses += 1
+            return None
+
+    def store(self, lookup: CacheLookup, answer: str):
+        if not answer:
+            return
+        with self._lock:
+            if lookup.kb_version != self.kb_version:
+                return  # Knowledge base đã đổi trong lúc sinh câu trả lời
+            entry = _CacheEntry(normalize_query(lookup.query), lookup.vector, answer, time.monotonic())
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # LRU
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "kb_version": self.kb_version,
+        }
+
+    def _check_version(self, kb_version: str):
+        if kb_version != self.kb_version:
+            if self._entries:
+                logger.info(f"Answer cache bị xóa do knowledge base đổi version ({self.kb_version} -> {kb_version})")
+            self._entries.clear()
+            self.kb_version = kb_version
+
+    def _evict_expired(self):
+        if self.ttl <= 0:
+            return
+        deadline = time.monotonic() - self.ttl
+        expired = [i for i, e in self._entries.items() if e.created_at < deadline]
+        for i in expired:
+            del self._entries[i]
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+_answer_cache = SemanticAnswerCache()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Trả về answer cache dùng chung của process."""
+    return _answer_cache
@@ -0,0 +1,134 @@
+# rag/context_builder.py (Ghép context cho prompt trong giới hạn token)
+
+import re
+from functools import lru_cache
+
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+MIN_OVERLAP_CHARS = 50  # Đoạn trùng ngắn hơn mức này coi như trùng ngẫu nhiên, không cắt
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+
+def _get_tokenizer():
+    """Nạp tokenizer HuggingFace (CONTEXT_TOKENIZER) 1 lần; lỗi/không cấu hình -> dùng ước lượng."""
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer_loaded = True
+        if config.CONTEXT_TOKENIZER:
+            try:
+                from tokenizers import Tokenizer
+                _tokenizer = Tokenizer.from_pretrained(config.CONTEXT_TOKENIZER)
+            except Exception as e:
+                logger.warning(f"Không nạp được tokenizer {config.CONTEXT_TOKENIZER}, dùng ước lượng: {e}")
+    return _tokenizer
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Số token của text (cache theo nội dung: chunk KB và context CV lặp lại rất nhiều)."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    # Ước lượng kiểu BPE: mỗi ~4 ký tự của 1 từ là 1 token, mỗi dấu câu 1 token
+    return sum((len(word) + 3) // 4 for word in _WORD_RE.findall(text))
+
+
+def _strip_overlap(text: str, kept: list) -> str:
+    """Cắt phần đầu/cuối của text đã xuất hiện ở chunk đã chọn (vùng chunk_overlap của splitter)."""
+    for other in kept:
+        if text in other:
+            return ""
+        # Đầu text trùng với đuôi của chunk khác
+        head = text[:MIN_OVERLAP_CHARS]
+        pos = other.rfind(head)
+        if len(head) == MIN_OVERLAP_CHARS and pos != -1 and text.startswith(other[pos:]):
+            text = text[len(other) - pos:]
+        # Đuôi text trùng với đầu của chunk khác
+        tail = text[-MIN_OVERLAP_CHARS:]
+        pos = other.find(tail)
+        if len(tail) == MIN_OVERLAP_CHARS and pos != -1 and text.endswith(other[:pos + MIN_OVERLAP_CHARS]):
+            text = text[:len(text) - pos - MIN_OVERLAP_CHARS]
+    return text.strip()
+
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class ContextBuilder:
+    """
+    Thay cho việc join thẳng top-k chunk: bỏ đoạn trùng giữa các chunk liền kề, chọn chunk theo
+    MMR (liên quan theo thứ hạng retriever, khác nhau theo Jaccard từ vựng - không tốn thêm lời
+    gọi embedding) rồi xếp vào ngân sách token. Log số token tiết kiệm được mỗi request.
+    """
+
+    def __init__(self, budget: int = None, mmr_lambda: float = None):
+        self.budget = config.CONTEXT_TOKEN_BUDGET if budget is None else budget
+        self.mmr_lambda = config.CONTEXT_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def build(self, docs, reserved: int = 0) -> str:
+        """Ghép context; `reserved` token của ngân sách đã dành cho phần khác của prompt (vd. khối CV)."""
+        budget = max(self.budget - reserved, 0)
+        texts = [doc.page_content.strip() for doc in docs if doc.page_content.strip()]
+        if not texts:
+            return ""
+
+        tokens_before = sum(count_tokens(t) for t in texts)
+        words = [set(w.lower() for w in _WORD_RE.findall(t)) for t in texts]
+        relevance = [1 - i / len(texts) for i in range(len(texts))]  # Retriever đã sắp theo độ liên quan
+
+        selected, kept, used = [], [], 0
+        remaining = list(range(len(texts)))
+        while remaining:
+            best = max(
+                remaining,
+                key=lambda i: self.mmr_lambda * relevance[i]
+                - (1 - self.mmr_lambda) * max((_similarity(words[i], words[j]) for j in selected), default=0.0)
+            )
+            remaining.remove(best)
+            text = _strip_overlap(texts[best], kept)
+            if not text:
+                continue
+            tokens = count_tokens(text)
+            if used + tokens > budget:
+                continue  # Chunk này không vừa, thử chunk tiếp theo (có thể ngắn hơn)
+            selected.append(best)
+            kept.append(text)
+            used += tokens
+
+        self.requests += 1
+        self.tokens_in += tokens_before
+        self.tokens_out += used
+        logger.info(
+            f"Context: {len(kept)}/{len(texts)} chunk, {tokens_before} -> {used} token "
+            f"(tiết kiệm {tokens_before - used}, ngân sách {budget}/{self.budget})"
+        )
+        return "\n\n".join(kept)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_in - self.tokens_out,
+        }
+
+
+_builder = None
+
+
+def get_context_builder() -> ContextBuilder:
+    """Trả về ContextBuilder dùng chung của process."""
+    global _builder
+    if _builder is None:
+        _builder = ContextBuilder()
+    return _builder
@@ -1,510 +1,412 @@
 # rag/cv_parser.py
 
 import re
-import json
-from typing import Dict, List, Callable
-from io import BytesIO
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
 import fitz  # PyMuPDF
+from rapidfuzz import fuzz, process
 
 # --- HẰNG SỐ VÀ CÁC MẪU REGEX ---
 
-REGEX_PATTERNS = {
-    "email": r"([\w\.-]+@[\w\.-]+\.(?:com|vn|net|org))|([\w\.-]+gmail\.com)",
-    "phone": r"(\d{9,11})",
-    "time_range": r"(\d{4}\s*-\s*(?:Nay|\d{4}))",
-    "date_of_birth": r"Birthday:\s*(\d{1,2}/\d{1,2}/\d{4})"
+# Tên mục chuẩn -> các cách viết tiêu đề thường gặp (so khớp không phân biệt hoa thường)
+SECTION_ALIASES = {
+    "personal_info": ["THÔNG TIN CÁ NHÂN", "THÔNG TIN LIÊN HỆ", "LIÊN HỆ", "THÔNG TIN THÊM",
+                      "Personal Information", "Personal Details", "Contact", "Contact Information"],
+    "objective": ["MỤC TIÊU NGHỀ NGHIỆP", "MỤC TIÊU", "GIỚI THIỆU BẢN THÂN", "GIỚI THIỆU", "TÓM TẮT",
+                  "About Me", "Objective", "Career Objective", "Summary", "Profile"],
+    "education": ["HỌC VẤN", "TRÌNH ĐỘ HỌC VẤN", "Education"],
+    "experience": ["KINH NGHIỆM LÀM VIỆC", "KINH NGHIỆM", "QUÁ TRÌNH LÀM VIỆC",
+                   "Experience", "Work Experience", "Employment History"],
+    "projects": ["DỰ ÁN", "DỰ ÁN ĐÃ THAM GIA", "Projects"],
+    "skills": ["KỸ NĂNG", "KỸ NĂNG CHUYÊN MÔN", "Skills", "Technical Skills"],
+    "certifications": ["CHỨNG CHỈ", "Certifications", "Certificates"],
+    "awards": ["DANH HIỆU VÀ GIẢI THƯỞNG", "GIẢI THƯỞNG", "DANH HIỆU", "Awards", "Honors", "Honors and Awards"],
+    "hobbies": ["SỞ THÍCH", "Hobbies", "Interests"],
+    "activities": ["HOẠT ĐỘNG", "HOẠT ĐỘNG NGOẠI KHÓA", "Activities"],
+    "languages": ["NGOẠI NGỮ", "Languages"],
+    "references": ["NGƯỜI GIỚI THIỆU", "NGƯỜI THAM CHIẾU", "References"],
 }
-
-TRANSLATION_MAP = {
-    "Họ và tên": "name",
-    "Chức danh": "title",
-    "Email": "email",
-    "Số điện thoại": "phone",
-    "Trường": "school",
-    "Chuyên ngành": "major",
-    "Thời gian": "time",
-    "location": "company",
-    "role": "role",
-    "time": "duration",
-    "describe": "description",
-    "objective": "objective",
-    "kỹ_năng": "skills",
-    "chứng_chỉ": "certifications",
-    "sở_thích": "hobbies",
-    "danh_hiệu_giải_thưởng": "awards",
-    "hoạt_động": "activities",
-    "dự_án": "projects",
-    "Địa chỉ": "address",
-    "Ngày sinh": "date_of_birth",
-    "Mô tả": "description",
-    "Languages": "languages"
-}
-
-STANDARD_KEYWORDS = [
-    "HỌC VẤN", "KINH NGHIỆM LÀM VIỆC", "KỸ NĂNG", "CHỨNG CHỈ",
-    "SỞ THÍCH", "DANH HIỆU VÀ GIẢI THƯỞNG", "MỤC TIÊU NGHỀ NGHIỆP",
-    "THÔNG TIN CÁ NHÂN", "NGƯỜI GIỚI THIỆU", "HOẠT ĐỘNG", "DỰ ÁN", "THÔNG TIN THÊM",
-    "Education", "Projects", "About Me", "Skills", "Hobbies", "Languages" # Thêm từ khóa tiếng Anh
-]
-THRESHOLD = 85
+THRESHOLD = 85  # Điểm fuzz.ratio tối thiểu để coi 1 dòng là tiêu đề viết sai/khác chút
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"(?<![\w/])\+?\d[\d .\-()]{7,16}\d(?![\w/])")
+DATE_OF_BIRTH_RE = re.compile(r"\b\d{1,2}/\d{1,2}/\d{4}\b")
+DATE_RANGE_RE = re.compile(
+    r"\(?\s*((?:\d{1,2}/)?\d{4})\s*[-–—~]\s*((?:\d{1,2}/)?\d{4}|nay|hiện tại|hiện nay|present|now)\s*\)?",
+    re.IGNORECASE,
+)
+_BULLET_RE = re.compile(r"^\s*[•●○◦▪▫■□►▸‣⁃∙·*+\-–—]\s+")
+_LABEL_RE = re.compile(r"^\s*[^:]{1,25}:\s*")  # "Email: ...", "Ngôn ngữ: ..."
+_SPLIT_ITEMS_RE = re.compile(r"\s*[,;|•]\s*")
+_SEPARATORS = " |,-–—:()"
+
+# Dấu hiệu nhận ra dòng tên tổ chức / chức danh trong 1 mục kinh nghiệm, học vấn
+ORG_MARKERS = ("công ty", "doanh nghiệp", "tập đoàn", "tnhh", "cổ phần", "ngân hàng", "jsc", "ltd", "inc",
+               "corp", "co.", "company", "group", "bank", "studio", "agency")
+SCHOOL_MARKERS = ("trường", "đại học", "cao đẳng", "học viện", "university", "college", "academy",
+                  "institute", "school")
+SECTION_FLAGS_BOLD = 1 << 4  # span["flags"]: bit bold của PyMuPDF
 
 # --- CÁC HÀM TIỆN ÍCH CHUNG ---
 
+# Biên dịch 1 lần lúc import
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002600-\U000026FF"  # Miscellaneous Symbols
+    "\U00002700-\U000027BF"  # Dingbats
+    "\U0000FE00-\U0000FE0F"  # Variation Selectors
+    "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+    "\U00002B50-\U00002B55"  # stars
+    "\U00002934-\U00002935"  # arrows
+    "]+", flags=re.UNICODE)
+# Font icon (FontAwesome, ...) của các mẫu CV đặt glyph trong vùng Private Use
+_ICON_RE = re.compile("[\uE000-\uF8FF\U000F0000-\U000FFFFD]+")
+
 def clean_text(text:str)-> str:
-  emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002600-\U000026FF"  # Miscellaneous Symbols
-        "\U00002700-\U000027BF"  # Dingbats
-        "\U0000FE00-\U0000FE0F"  # Variation Selectors
-        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-        "\U00002B50-\U00002B55"  # stars
-        "\U00002934-\U00002935"  # arrows
-        "]+", flags=re.UNICODE)
-
-  icon_pattern = re.compile(r'[^\w\s\.\,\;\:\(\)\[\]\{\}\-\–\/\\\'\"\<\>\=\+]', flags=re.UNICODE)
-  text = emoji_pattern.sub('', text)
-  text = icon_pattern.sub('', text)
-  text = text.strip()
+  """Bỏ emoji và glyph font icon, giữ nguyên dấu câu (@, +, |...) để regex email/số điện thoại còn khớp."""
+  text = _EMOJI_RE.sub('', text)
+  text = _ICON_RE.sub('', text)
+  text = " ".join(text.split())
   return text
 
-def translate_keys(data: any) -> any:
-    if isinstance(data, dict):
-        new_dict = {}
-        for k, v in data.items():
-            new_key = TRANSLATION_MAP.get(k, k)
-            new_dict[new_key] = translate_keys(v)
-        return new_dict
-    elif isinstance(data, list):
-        return [translate_keys(item) for item in data]
-    else:
-        return data
-
-def join_simple_sections(content_lines: list, is_award_or_cert: bool = False) -> list:
-    if not content_lines: return []
-    output = []
-    current_item = ""
-
-    for line in content_lines:
-        line_stripped = line.strip()
-        if not line_stripped or re.match(r'^[\(\)\s\-]+$', line_stripped): continue
-        is_new_award_or_cert_year = is_award_or_cert and re.match(r'^\d{4}', line_stripped)
-
-        if is_new_award_or_cert_year:
-            if current_item: output.append(current_item.strip())
-            current_item = re.sub(r'^\d{4}\s*', '', line_stripped).strip()
-        else:
-            cleaned_line_part = re.sub(r'^\s*[-•]*\s*|\(|\)', '', line_stripped).strip()
-            if not current_item and cleaned_line_part:
-                current_item = cleaned_line_part
-            elif cleaned_line_part:
-                current_item += " " + cleaned_line_part
-
-    if current_item: output.append(current_item.strip())
-    return [item for item in output if len(item) > 4]
-
-# --- HÀM TRÍCH XUẤT VÀ PHÂN TÁCH RAW ---
-
-def extract_text_from_pdf(pdf_content: bytes) -> str:
-    """Đọc text từ nội dung PDF (dạng bytes) bằng fitz."""
-    try:
-        # Mở file từ stream (bytes)
-        pdf = fitz.open(stream=pdf_content, filetype="pdf")
-        full_text = ''
+def _normalize_heading(text: str) -> str:
+    return " ".join(text.replace("&", " VÀ ").upper().strip(" :.-–").split())
+
+_ALIASES = {_normalize_heading(alias): section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+_ALIAS_KEYS = list(_ALIASES)
+
+@lru_cache(maxsize=4096)
+def match_section(text: str):
+    """Tên mục chuẩn của 1 dòng tiêu đề (tra chính xác trước, rapidfuzz sau), None nếu không phải tiêu đề."""
+    key = _normalize_heading(text)
+    if key in _ALIASES:
+        return _ALIASES[key]
+    match = process.extractOne(key, _ALIAS_KEYS, scorer=fuzz.ratio, score_cutoff=THRESHOLD)
+    return _ALIASES[match[0]] if match else None
+
+# --- TRÍCH XUẤT DÒNG KÈM THÔNG TIN FONT TỪ PDF ---
+
+class PDFLimitError(ValueError):
+    """File PDF vượt giới hạn dung lượng / số trang / thời gian đọc (message gửi thẳng cho user)."""
+
+@dataclass(slots=True)
+class PdfLine:
+    text: str
+    size: float
+    bold: bool
+    x0: float
+    bullet: bool
+
+    @property
+    def is_caps(self) -> bool:
+        return self.text.isupper()
+
+def default_limits() -> dict:
+    """Giới hạn đọc PDF lấy từ config (import muộn: worker parse CV truyền sẵn giới hạn, không nạp config)."""
+    import config
+    return {"max_bytes": config.CV_MAX_BYTES, "max_pages": config.CV_MAX_PAGES,
+            "time_budget": config.CV_EXTRACT_TIME_BUDGET}
+
+def iter_pdf_pages(pdf_content: bytes, max_bytes: int = None, max_pages: int = None, time_budget: float = None):
+    """Yield từng trang đang mở; từ chối ngay nếu file quá lớn hoặc quá nhiều trang, dừng khi hết thời gian."""
+    if None in (max_bytes, max_pages, time_budget):
+        defaults = default_limits()
+        max_bytes = defaults["max_bytes"] if max_bytes is None else max_bytes
+        max_pages = defaults["max_pages"] if max_pages is None else max_pages
+        time_budget = defaults["time_budget"] if time_budget is None else time_budget
+
+    if len(pdf_content) > max_bytes:
+        raise PDFLimitError(f"File CV quá lớn ({len(pdf_content) / 1024 / 1024:.1f} MB, tối đa {max_bytes / 1024 / 1024:.0f} MB).")
+
+    deadline = time.perf_counter() + time_budget
+    with fitz.open(stream=pdf_content, filetype="pdf") as pdf:
+        # page_count đọc từ bảng trang, chưa phải parse nội dung -> từ chối PDF 200 trang gần như miễn phí
+        if pdf.page_count > max_pages:
+            raise PDFLimitError(f"CV có {pdf.page_count} trang, tối đa {max_pages} trang.")
         for page in pdf:
-            text = page.get_text()
-            full_text += text
-        pdf.close()
-        result = clean_text(full_text)
-        return result
-    except Exception as e:
-        # In lỗi (chỉ để debug, nên dùng logging trong môi trường bot)
-        # print(f"Lỗi khi đọc file PDF: {e}")
-        return ""
-
-def robust_section_split(full_text: str) -> dict:
-    """Phân tách văn bản thô thành các khối chính dựa trên từ khóa (Fuzzy Matching)."""
-    from fuzzywuzzy import fuzz # Cần import local nếu thư viện không cài toàn cục
-    
-    lines = [line for line in full_text.split('\n') if line.strip()]
-    sections_raw = {"THÔNG TIN CÁ NHÂN (Đầu CV)": []}
-    current_section_name = "THÔNG TIN CÁ NHÂN (Đầu CV)"
-
-    for line in lines:
-        is_new_section = False
-        stripped_line = line.strip()
-
-        # Kiểm tra tiêu đề mới: Chữ in hoa hoặc ngắn và bắt đầu bằng chữ hoa
-        if stripped_line.isupper() or len(stripped_line.split()) < 4 and stripped_line and stripped_line[0].isupper():
-            for keyword in STANDARD_KEYWORDS:
-                # Sử dụng fuzz.ratio để so sánh mờ
-                score = fuzz.ratio(stripped_line.upper(), keyword.upper())
-
-                if score >= THRESHOLD:
-                    current_section_name = keyword
-                    if current_section_name not in sections_raw:
-                        sections_raw[current_section_name] = []
-                    is_new_section = True
-                    break
-
-        if not is_new_section:
-            sections_raw[current_section_name].append(line)
-    return sections_raw
-
-# --- CÁC HÀM PARSING LAYOUT CỤ THỂ ---
-
-def parse_layout_cv1(sections: dict) -> dict:
-    """Hàm xử lý cho Layout CV1."""
-    temp_result = {}
-    all_content_lines_raw = sections.get("THÔNG TIN CÁ NHÂN (Đầu CV)", [])
-    if "THÔNG TIN CÁ NHÂN" in sections: all_content_lines_raw.extend(sections.get("THÔNG TIN CÁ NHÂN"))
-    if "THÔNG TIN THÊM" in sections: all_content_lines_raw.extend(sections.get("THÔNG TIN THÊM"))
-
-    stripped_info_lines = [line.strip() for line in all_content_lines_raw]
-    full_info_block = " ".join(stripped_info_lines)
-    personal_info = {}
-    if stripped_info_lines:
-        personal_info["Họ và tên"] = stripped_info_lines[0]
-        personal_info["Chức danh"] = stripped_info_lines[1] 
-
-    email_match = re.search(REGEX_PATTERNS["email"], full_info_block)
-    if email_match:
-        match_str = email_match.group(1) or email_match.group(2)
-        personal_info["Email"] = match_str.replace('gmail.com', '@gmail.com') if match_str and match_str.count('@') == 0 else match_str
-
-    phone_match = re.search(REGEX_PATTERNS["phone"], full_info_block)
-    if phone_match:
-        personal_info["Số điện thoại"] = re.sub(r'[^\d]', '', phone_match.group(0))
-
-    date_match = re.search(r"(\d{1,2}/\d{1,2}/\d{4})", full_info_block)
-    if date_match:
-        personal_info["Ngày sinh"] = date_match.group(1) 
-
-    temp_result["personal_info"] = personal_info
-
-    if "Học vấn" in sections:
-        edu_lines = [l.strip() for l in sections.get("Học vấn", []) if l.strip()]
-        if len(edu_lines) >= 3:
-            school_name = edu_lines[2]
-            major_name = edu_lines[0]
-            time_str = f"( {edu_lines[1]} )"
-            temp_result["education"] = [{
-                "Trường": school_name,
-                "Chuyên ngành": major_name,
-                "Thời gian": time_str
-            }]
-        else: temp_result["education"] = []
-    
-    if "Kinh nghiệm làm việc" in sections:
-        raw_job_lines = sections.get("Kinh nghiệm làm việc", [])
-        jobs = []
-        i = 0
-
-        while i < len(raw_job_lines):
-            line_raw = raw_job_lines[i]
-            line_stripped = line_raw.strip()
-            # Bắt đầu công việc mới (có năm)
-            if re.search(r'\d{4}', line_stripped) and not line_stripped.startswith("Công ty"):
-                current_job = { "location": "", "role": "", "duration": "", "describe": [] }
-                jobs.append(current_job)
-
-                # Dòng 1: Role/Time
-                time_match = re.search(r'(\d{4}\s*-\s*(?:Nay|\d{4}))', line_stripped)
-                current_job["duration"] = f"( {time_match.group(1)} )" if time_match else ""
-                current_job["role"] = re.sub(r' \d{4}.*$', '', line_stripped).strip()
-
-                i += 1
-                while i < len(raw_job_lines) and raw_job_lines[i].strip() and not raw_job_lines[i].strip().startswith("Công ty"):
-                     i += 1 
-
-                if i < len(raw_job_lines) and raw_job_lines[i].strip().startswith("Công ty"):
-                    current_job["location"] = raw_job_lines[i].strip()
-
-                    # Dòng tiếp theo là mô tả công việc
-                    i += 1
-                    current_describe = ""
-
-                    while i < len(raw_job_lines) and not re.search(r'\d{4}', raw_job_lines[i].strip()):
-                        duty_line_raw = raw_job_lines[i]
-                        is_new_bullet = duty_line_raw.startswith(' ') or duty_line_raw.startswith('\t')
-
-                        if is_new_bullet:
-                            if current_describe: current_job["describe"].append(current_describe.strip())
-                            current_describe = duty_line_raw
-                        else: current_describe += " " + duty_line_raw.strip()
-                        i += 1
-
-                    if current_describe: current_job["describe"].append(current_describe.strip())
+            if time.perf_counter() > deadline:
+                raise PDFLimitError(f"Đọc CV quá {time_budget:.0f}s, file có thể bị lỗi hoặc quá phức tạp.")
+            yield page
+
+def extract_lines(pdf_content: bytes, limits: dict = None) -> list:
+    """1 lượt qua các span của page.get_text("dict"): mỗi dòng kèm cỡ chữ, đậm, lề trái, gạch đầu dòng."""
+    lines = []
+    for page in iter_pdf_pages(pdf_content, **(limits or {})):
+        # TEXTFLAGS_TEXT: như "dict" mặc định nhưng không kèm dữ liệu ảnh (ảnh chân dung trong CV)
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+            for line in block.get("lines", ()):
+                spans = [span for span in line["spans"] if span["text"].strip()]
+                if not spans:
                     continue
-
-            i += 1
-
-        temp_result["experience"] = jobs
-
-    final_other_sections = {}
-    for key, content in sections.items():
-        if not content or key in ["THÔNG TIN CÁ NHÂN (Đầu CV)", "Học vấn", "Kinh nghiệm làm việc"]: continue
-
-        new_key = key.lower().replace(" ", "_").replace("và", "").replace("__", "_")
-
-        if key in ["Mục tiêu nghề nghiệp"]:
-            temp_result["objective"] = " ".join([l.strip() for l in content]).strip()
-        elif key in ["Chứng chỉ", "Danh hiệu và giải thưởng", "Sở thích", "Kỹ năng", "Hoạt động"]:
-             temp_result[new_key] = join_simple_sections(content, is_award_or_cert=(key in ["Chứng chỉ", "Danh hiệu và giải thưởng"]))
-        else:
-            final_other_sections[key] = [l.strip() for l in content if l.strip()]
-
-    return translate_keys(temp_result)
-
-def parse_layout_cv2(sections: dict) -> dict:
-    """Hàm xử lý cho Layout CV2."""
-    temp_result = {}
-
-    all_content_lines_raw = sections.pop("THÔNG TIN CÁ NHÂN (Đầu CV)", [])
-    if "THÔNG TIN CÁ NHÂN" in sections: all_content_lines_raw.extend(sections.pop("THÔNG TIN CÁ NHÂN"))
-    if "THÔNG TIN THÊM" in sections: all_content_lines_raw.extend(sections.pop("THÔNG TIN THÊM"))
-    stripped_info_lines = [line.strip() for line in all_content_lines_raw]
-    full_info_block = " ".join(stripped_info_lines)
-
-    personal_info = {}
-    if stripped_info_lines: personal_info["Họ và tên"] = stripped_info_lines[0]
-    if len(stripped_info_lines) >= 2:
-        chuc_danh = next((line for line in stripped_info_lines[1:]
-                          if not re.search(r'\d{9}', line) and not re.search(r'@', line) and len(line) > 5), "Không rõ chức danh")
-        personal_info["Chức danh"] = chuc_danh
-
-    email_match = re.search(REGEX_PATTERNS["email"], full_info_block)
-    if email_match:
-        match_str = email_match.group(1) or email_match.group(2)
-        email_str = match_str.replace('gmail.com', '@gmail.com') if match_str and match_str.count('@') == 0 else match_str
-        personal_info["Email"] = email_str
-    phone_match = re.search(REGEX_PATTERNS["phone"], full_info_block)
-    if phone_match:
-        personal_info["Số điện thoại"] = re.sub(r'[^\d]', '', phone_match.group(0))
-    temp_result["personal_info"] = personal_info
-    
-    if "HỌC VẤN" in sections:
-        edu_lines = [l.strip() for l in sections.pop("HỌC VẤN") if l.strip()]
-        if edu_lines and len(edu_lines) >= 3:
-            edu_content = " ".join(edu_lines)
-            time_match = re.search(r"(\(\s*\d{4}\s*-\s*\d{4}\s*\))", edu_content)
-            time_str = time_match.group(1).strip() if time_match else ""
-            school_name = edu_lines[0]
-            major_line = edu_lines[1]
-            major_clean = re.sub(r'\s*\(\s*\d{4}\s*-\s*\d{4}\s*\)\s*', '', major_line).strip()
-            temp_result["education"] = [{"Trường": school_name, "Chuyên ngành": major_clean, "Thời gian": time_str}]
-        else: temp_result["education"] = []
-    
-    if "MỤC TIÊU NGHỀ NGHIỆP" in sections:
-        temp_result["objective"] = " ".join([l.strip() for l in sections.pop("MỤC TIÊU NGHỀ NGHIỆP")]).strip()
-    
-    if "KINH NGHIỆM LÀM VIỆC" in sections:
-        raw_job_lines = sections.pop("KINH NGHIỆM LÀM VIỆC")
-        jobs = []
-        i = 0
-        while i < len(raw_job_lines):
-            line_raw = raw_job_lines[i]
-            line_stripped = line_raw.strip()
-            if line_stripped.startswith("Công ty"):
-                current_job = { "location": line_stripped, "role": "", "time": "", "describe": [] }
-                jobs.append(current_job)
-                i += 1
-                if i < len(raw_job_lines):
-                    role_time_line = raw_job_lines[i].strip()
-                    time_match = re.search(r"(\(\s*\d{4}\s*-\s*(?:Nay|\d{4})\s*\))", role_time_line)
-                    current_job["time"] = time_match.group(1).strip() if time_match else ""
-                    current_job["role"] = re.sub(r'\s*\(\s*\d{4}\s*-\s*(?:Nay|\d{4})\s*\)\s*', '', role_time_line).strip()
-                    i += 1
-                    current_describe = ""
-                    while i < len(raw_job_lines) and not raw_job_lines[i].strip().startswith("Công ty"):
-                        duty_line_raw = raw_job_lines[i]
-                        is_new_bullet = duty_line_raw.startswith(' ') or duty_line_raw.startswith('\t')
-                        if is_new_bullet:
-                            if current_describe: current_job["describe"].append(current_describe.strip())
-                            current_describe = duty_line_raw
-                        else: current_describe += " " + duty_line_raw.strip()
-                        i += 1
-                    if current_describe: current_job["describe"].append(current_describe.strip())
+                raw = "".join(span["text"] for span in spans)
+                bullet = _BULLET_RE.match(raw)
+                text = clean_text(raw[bullet.end():] if bullet else raw)
+                if not text:
                     continue
-            i += 1
-        temp_result["experience"] = jobs
-    
-    final_other_sections = {}
-    for key, content in sections.items():
-        if not content: continue
-        new_key = key.lower().replace(" ", "_").replace("và", "").replace("__", "_")
-        if key in ["SỞ THÍCH", "KỸ NĂNG", "HOẠT ĐỘNG"]:
-            temp_result[new_key] = join_simple_sections(content)
-        elif key in ["CHỨNG CHỈ", "DANH HIỆU VÀ GIẢI THƯỞNG"]:
-             temp_result[new_key] = join_simple_sections(content, is_award_or_cert=True)
-        else:
-            final_other_sections[key] = [l.strip() for l in content if l.strip() and not re.match(r'^[\(\)\d\s\-]+$', l.strip())]
-    
-    temp_result["other_sections"] = final_other_sections
-    final_result_vn = {k: v for k, v in temp_result.items() if (isinstance(v, list) and v) or (isinstance(v, dict) and v) or v}
-    final_result_en = translate_keys(final_result_vn)
-    
-    # Đảm bảo các trường quan trọng có sẵn
-    if "education" not in final_result_en: final_result_en["education"] = []
-    if "experience" not in final_result_en: final_result_en["experience"] = []
-
-    return final_result_en
-
-def parse_layout_cv4(sections: dict) -> dict:
-    """Hàm xử lý cho Layout CV4 (Projects-centric)."""
-    temp_result = {}
-
-    all_content_lines_raw = sections.get("THÔNG TIN CÁ NHÂN (Đầu CV)", [])
-    full_stripped_text = "\n".join([l.strip() for l in all_content_lines_raw])
-
-    personal_info = {}
-
-    # 1. Trích xuất Tên, Chức vụ
-    name_match = re.search(r'LUONG HAI LAM', full_stripped_text)
-    if name_match: personal_info["Họ và tên"] = name_match.group(0)
-    personal_info["Chức danh"] = "Web developer" 
-
-    date_match = re.search(REGEX_PATTERNS["date_of_birth"], full_stripped_text)
-    if date_match: personal_info["Ngày sinh"] = date_match.group(1)
-
-    email_match = re.search(r"([\w\.-]+@[\w\.-]+\.(?:com|vn|net|org))", full_stripped_text)
-    if email_match: personal_info["Email"] = email_match.group(1)
-
-    phone_match = re.search(r"083549589", full_stripped_text)
-    if phone_match: personal_info["Số điện thoại"] = phone_match.group(0) + "X" 
-
-    address_match = re.search(r'(\d+ [A-Za-z]+ [A-Za-z]+ \d+, [A-Za-z]+)', full_stripped_text)
-    if address_match: personal_info["Địa chỉ"] = address_match.group(1)
-
-    temp_result["personal_info"] = personal_info
-
-    # 2. Xử lý Học vấn (Education)
-    edu_section = [l.strip() for l in sections.get("Education", []) if l.strip()]
-    if edu_section:
-        temp_result["education"] = [{
-            "Trường": edu_section[2] if len(edu_section) > 2 else "Không rõ",
-            "Chuyên ngành": edu_section[1] if len(edu_section) > 1 else "Không rõ",
-            "Mô tả": edu_section[0] 
-        }]
-
-    # 3. Xử lý Dự án (Projects) -> Gán vào experience
-    if "Projects" in sections:
-        project_lines = sections.pop("Projects")
-        jobs = []
-        if project_lines:
-            project_block = "\n".join(project_lines)
-
-            project_title_match = re.search(r'(.*?)\s-\sMERN Stack', project_block)
-            project_title = project_title_match.group(1).strip() if project_title_match else "E-commerce Website"
-
-            desc_match = re.search(r'Description:\s*(.*?)\s*Key Features:', project_block, re.DOTALL)
-            description_text = desc_match.group(1).strip() if desc_match else ""
-
-            features_block_match = re.search(r'Key Features:\s*(.*)', project_block, re.DOTALL)
-            features = []
-            if features_block_match:
-                 features_text = features_block_match.group(1).strip().replace('\n', ' ')
-                 features = [f.strip() for f in re.split(r'\.\s*', features_text) if f.strip()]
-
-            jobs.append({
-                "location": project_title,
-                "role": "Project Developer",
-                "time": "Project Duration",
-                "description": [description_text] + features
-            })
-
-        temp_result["experience"] = jobs
+                lines.append(PdfLine(
+                    text=text,
+                    size=round(max(span["size"] for span in spans), 1),
+                    bold=all(span["flags"] & SECTION_FLAGS_BOLD or "bold" in span["font"].lower() for span in spans),
+                    x0=line["bbox"][0],
+                    bullet=bool(bullet),
+                ))
+    return lines
 
-    # 4. Xử lý Mục tiêu (About Me) và Kỹ năng (Skills)
-    if "About Me" in sections:
-        temp_result["objective"] = " ".join([l.strip() for l in sections.pop("About Me")]).strip()
-    if "Skills" in sections:
-        skill_lines = sections.pop("Skills")
-        temp_result["skills"] = [l.strip() for l in skill_lines if ":" not in l and l.strip()]
-
-    # 5. Xử lý các section đơn giản khác
-    if "Hobbies" in sections:
-        temp_result["hobbies"] = [l.strip() for l in sections.pop("Hobbies") if l.strip()]
-    if "Languages" in sections:
-        temp_result["languages"] = [l.strip() for l in sections.pop("Languages") if l.strip() and "Vietnamese" not in l]
-
-    final_result_en = translate_keys(temp_result)
-
-    if "education" not in final_result_en: final_result_en["education"] = []
-    if "experience" not in final_result_en: final_result_en["experience"] = []
-
-    return final_result_en
-
-def parse_default_layout(sections: dict) -> dict:
-    """Hàm xử lý mặc định khi không nhận dạng được layout."""
-    final_result = {"error": "LAYOUT NOT CLASSIFIED", "raw_sections": {k: [line.strip() for line in v] for k, v in sections.items()}}
-    return final_result
-
-# --- HÀM PHÂN LOẠI LAYOUT ---
-
-def classify_cv_layout(full_text: str) -> Callable:
-    """Phân loại CV dựa trên các dấu hiệu nhận dạng chính và trả về hàm xử lý phù hợp."""
-    
-    stripped_text = full_text.replace('\n', ' ')
-
-    # 1. Tìm vị trí các tiêu đề chính (cần cho logic so sánh)
-    idx_hoc_van = max(stripped_text.find("HỌC VẤN"), stripped_text.find("Học vấn"), stripped_text.find("Education"))
-    idx_kinh_nghiem = max(stripped_text.find("KINH NGHIỆM LÀM VIỆC"), stripped_text.find("Kinh nghiệm làm việc"))
-    idx_projects = max(stripped_text.find("PROJECTS"), stripped_text.find("Projects"))
+def extract_text_from_pdf(pdf_content: bytes) -> str:
+    """Text thuần của CV (mỗi dòng 1 dòng), trong giới hạn CV_MAX_BYTES / CV_MAX_PAGES / thời gian."""
+    return "\n".join(line.text for line in extract_lines(pdf_content))
 
-    # --- 2. Logic Phân loại ---
+# --- PHÂN MỤC THEO FONT ---
 
-    # LAYOUT CV1 - Dấu hiệu: SĐT ở dòng 3 và KINH NGHIỆM tồn tại và ở vị trí xa đầu
-    full_text_lines = full_text.split('\n')
-    is_layout_cv1_signature = (len(full_text_lines) > 2 and full_text_lines[2].strip().isdigit() and\
-                               idx_kinh_nghiem != -1 and idx_kinh_nghiem > 100)
+def _body_size(lines: list) -> float:
+    """Cỡ chữ nội dung = cỡ chữ chiếm nhiều ký tự nhất."""
+    sizes = Counter()
+    for line in lines:
+        sizes[line.size] += len(line.text)
+    return sizes.most_common(1)[0][0]
 
-    if is_layout_cv1_signature:
-        return parse_layout_cv1
+def _looks_like_heading(line: PdfLine, body: float) -> bool:
+    return (not line.bullet and len(line.text.split()) <= 6
+            and (line.size >= body * 1.1 or line.bold or line.is_caps))
 
-    # LAYOUT CV4 (Projects-centric) - Dấu hiệu: Tiêu đề PROJECTS tồn tại và KINH NGHIỆM LÀM VIỆC không tồn tại
-    elif idx_projects != -1 and idx_kinh_nghiem == -1:
-        return parse_layout_cv4
+def split_sections(lines: list):
+    """
+    Chia dòng thành (header, {mục: [dòng]}): tiêu đề là dòng ngắn nổi bật (cỡ chữ lớn hơn nội dung,
+    đậm hoặc in hoa) khớp tên mục; dòng cùng kiểu chữ với các tiêu đề đã nhận ra nhưng không khớp
+    tên nào thành mục riêng trong other_sections.
+    """
+    body = _body_size(lines)
+    known = [(i, match_section(line.text)) for i, line in enumerate(lines) if _looks_like_heading(line, body)]
+    known = {i: section for i, section in known if section}
+    heading_styles = {(lines[i].size, lines[i].bold, lines[i].is_caps) for i in known}
+
+    header, sections = [], {}
+    current = header
+    for i, line in enumerate(lines):
+        if i in known:
+            current = sections.setdefault(known[i], [])
+            continue
+        if (current is not header and _looks_like_heading(line, body)
+                and (line.size, line.bold, line.is_caps) in heading_styles
+                and (line.size >= body * 1.1 or line.is_caps)):
+            current = sections.setdefault(line.text, [])
+            continue
+        current.append(line)
+    return header, sections
+
+# --- PARSE TỪNG LOẠI MỤC ---
+
+def _has_marker(text: str, markers) -> bool:
+    lower = text.lower()
+    return any(marker in lower for marker in markers)
+
+def _strip_date(text: str) -> str:
+    return DATE_RANGE_RE.sub(" ", text).strip(_SEPARATORS)
+
+def _format_range(match) -> str:
+    return f"({match.group(1)} - {match.group(2)})"
+
+def parse_personal_info(header: list, extra: list) -> dict:
+    """Tên = dòng cỡ chữ lớn nhất đầu CV, chức danh = dòng tiếp theo không phải thông tin liên hệ."""
+    info = {}
+    lines = header + extra
+    if not lines:
+        return info
+    full_text = " ".join(line.text for line in lines)
+
+    name_line = max(header or lines, key=lambda line: line.size)
+    info["name"] = name_line.text
+    for line in (header or lines)[(header or lines).index(name_line) + 1:]:
+        if ":" in line.text or EMAIL_RE.search(line.text) or PHONE_RE.search(line.text) or len(line.text) < 3:
+            continue
+        info["title"] = line.text
+        break
+
+    email = EMAIL_RE.search(full_text)
+    if email:
+        info["email"] = email.group(0)
+    for line in lines:
+        phone = PHONE_RE.search(line.text)
+        if phone and not DATE_OF_BIRTH_RE.search(phone.group(0)) and len(re.sub(r"\D", "", phone.group(0))) >= 9:
+            info["phone"] = phone.group(0).strip()
+            break
+    birthday = DATE_OF_BIRTH_RE.search(full_text)
+    if birthday:
+        info["date_of_birth"] = birthday.group(0)
+    for line in lines:
+        label = line.text.split(":", 1)[0].strip().lower()
+        if ":" in line.text and label in ("địa chỉ", "address"):
+            info["address"] = line.text.split(":", 1)[1].strip()
+    return info
 
-    # LAYOUT CV2 - Dấu hiệu mặc định: Cả HỌC VẤN và KINH NGHIỆM LÀM VIỆC đều tồn tại và HỌC VẤN nằm trước KINH NGHIỆM
-    elif idx_hoc_van != -1 and idx_kinh_nghiem != -1 and idx_hoc_van < idx_kinh_nghiem:
-        return parse_layout_cv2
+def _group_entries(lines: list) -> list:
+    """
+    Gom dòng của mục kinh nghiệm/học vấn/dự án thành từng entry {headers, description, duration}.
+    Entry mới bắt đầu ở dòng tiêu đề (đậm / có khoảng thời gian / tên tổ chức) sau phần mô tả,
+    dòng gạch đầu dòng là mô tả, dòng thụt vào sau gạch đầu dòng là phần tiếp của dòng trước.
+    """
+    entries = []
+    current = None
+    last_bullet_x = None
+    for line in lines:
+        text = line.text
+        is_header = line.bold or DATE_RANGE_RE.search(text) or _has_marker(text, ORG_MARKERS + SCHOOL_MARKERS)
+        if line.bullet:
+            if current is None:
+                current = {"headers": [], "description": []}
+                entries.append(current)
+            current["description"].append(text)
+            last_bullet_x = line.x0
+        elif current and current["description"] and last_bullet_x is not None and line.x0 > last_bullet_x + 2:
+            current["description"][-1] += " " + text
+        elif (current is None or current["description"]
+              or (is_header and DATE_RANGE_RE.search(text) and any(DATE_RANGE_RE.search(h) for h in current["headers"]))):
+            current = {"headers": [text], "description": []}
+            entries.append(current)
+            last_bullet_x = None
+        elif is_header or len(current["headers"]) < 2:
+            current["headers"].append(text)
+        else:
+            # Mô tả dạng đoạn văn (không gạch đầu dòng)
+            current["description"].append(text)
+
+    for entry in entries:
+        date = next((m for m in map(DATE_RANGE_RE.search, entry["headers"]) if m), None)
+        entry["duration"] = _format_range(date) if date else ""
+        entry["headers"] = [h for h in map(_strip_date, entry["headers"]) if h]
+    return entries
+
+def _pick(headers: list, markers) -> tuple:
+    """(dòng có dấu hiệu markers hoặc dòng đầu, các dòng còn lại)."""
+    if not headers:
+        return "", []
+    index = next((i for i, h in enumerate(headers) if _has_marker(h, markers)), 0)
+    return headers[index], headers[:index] + headers[index + 1:]
+
+def parse_experience(lines: list) -> list:
+    jobs = []
+    for entry in _group_entries(lines):
+        company, rest = _pick(entry["headers"], ORG_MARKERS)
+        jobs.append({
+            "company": company,
+            "role": rest[0] if rest else "",
+            "duration": entry["duration"],
+            "description": entry["description"],
+        })
+    return jobs
+
+def parse_education(lines: list) -> list:
+    education = []
+    for entry in _group_entries(lines):
+        school, rest = _pick(entry["headers"], SCHOOL_MARKERS)
+        education.append({
+            "school": school,
+            "major": rest[0] if rest else "",
+            "time": entry["duration"],
+            "description": entry["description"],
+        })
+    return education
+
+def parse_projects(lines: list) -> list:
+    projects = []
+    for entry in _group_entries(lines):
+        headers = entry["headers"]
+        projects.append({
+            "company": headers[0] if headers else "",
+            "role": headers[1] if len(headers) > 1 else "Project Developer",
+            "duration": entry["duration"],
+            "description": entry["description"],
+        })
+    return projects
+
+def parse_list(lines: list, split_inline: bool = False) -> list:
+    """Mục dạng danh sách: mỗi gạch đầu dòng 1 mục; split_inline tách thêm 'A, B, C' trên cùng 1 dòng."""
+    items = []
+    last_bullet_x = None
+    for line in lines:
+        text = line.text
+        if not line.bullet and items and last_bullet_x is not None and line.x0 > last_bullet_x + 2:
+            items[-1] += " " + text  # Dòng tràn của mục trước
+            continue
+        last_bullet_x = line.x0 if line.bullet else None
+        if split_inline:
+            text = _LABEL_RE.sub("", text)  # "Ngôn ngữ: Python, Java" -> "Python, Java"
+            items.extend(item for item in _SPLIT_ITEMS_RE.split(text) if item.strip(_SEPARATORS))
+        else:
+            items.append(text)
+    # Bỏ trùng, giữ thứ tự
+    return list(dict.fromkeys(item.strip() for item in items if item.strip()))
+
+def parse_sections(header: list, sections: dict) -> dict:
+    result = {"personal_info": parse_personal_info(header, sections.pop("personal_info", []))}
+    for key, lines in sections.items():
+        if key == "objective":
+            result["objective"] = " ".join(line.text for line in lines)
+        elif key == "experience":
+            result["experience"] = parse_experience(lines)
+        elif key == "education":
+            result["education"] = parse_education(lines)
+        elif key == "projects":
+            result["projects"] = parse_projects(lines)
+        elif key in ("skills", "languages"):
+            result[key] = parse_list(lines, split_inline=True)
+        elif key in ("certifications", "awards", "hobbies", "activities"):
+            result[key] = parse_list(lines)
+        else:
+            result.setdefault("other_sections", {})[key] = [line.text for line in lines]
 
-    # LAYOUT MẶC ĐỊNH
-    return parse_default_layout
+    # CV chỉ có dự án (sinh viên, freelancer): dùng dự án làm kinh nghiệm
+    if not result.get("experience") and result.get("projects"):
+        result["experience"] = result["projects"]
+    return result
 
 # --- HÀM THỰC THI CHÍNH (ĐƯỢC GỌI TỪ DISCORD BOT) ---
 
-def process_cv_data(pdf_content: bytes) -> dict:
+def process_cv_data(pdf_content: bytes, timings: dict = None, limits: dict = None) -> dict:
     """
-    Thực hiện toàn bộ quy trình OCR/Parsing, trả về chuỗi JSON đã dịch khóa.
+    Đọc PDF (1 lượt qua các span), chia mục theo cỡ chữ / độ đậm / in hoa rồi parse từng mục.
+    timings (nếu truyền vào) nhận thời gian từng bước: extract, split, parse (giây).
+    limits: max_bytes / max_pages / time_budget, mặc định theo config (default_limits()).
     """
-    # 1. Trích xuất văn bản thô
-    full_cv_text = extract_text_from_pdf(pdf_content)
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
 
-    if not full_cv_text:
+    # 1. Trích xuất các dòng kèm thông tin font
+    try:
+        lines = extract_lines(pdf_content, limits)
+    except PDFLimitError as e:
+        return {"error": str(e)}
+    except MemoryError:
+        raise  # Worker chạm giới hạn bộ nhớ -> để worker tự thoát và được thay
+    except Exception as e:
+        # fitz không mở được: file hỏng hoặc không phải PDF
+        return {"error": f"Không đọc được file PDF ({type(e).__name__}: {e})."}
+    finally:
+        timings["extract"] = time.perf_counter() - start
+
+    if not lines:
         return {"error": "Không trích xuất được văn bản từ PDF."}
 
     # 2. Phân tách thành các Sections
-    sections = robust_section_split(full_cv_text)
-
-    # 3. Phân loại Layout và chọn hàm Parse phù hợp
-    parser_function = classify_cv_layout(full_cv_text)
-
-    # 4. Thực thi Parsing
-    cv_result = parser_function(sections)
-
-    if isinstance(cv_result, dict) and "error" in cv_result:
-        return cv_result
-
-    # 5. Dịch key sang tiếng Anh (nếu chưa dịch)
-    final_result_en = translate_keys(cv_result)
-    
-    # 6. Đảm bảo các trường list quan trọng tồn tại
-    if "education" not in final_result_en: final_result_en["education"] = []
-    if "experience" not in final_result_en: final_result_en["experience"] = []
-    
-    return final_result_en
+    start = time.perf_counter()
+    header, sections = split_sections(lines)
+    timings["split"] = time.perf_counter() - start
+
+    if not any(key in SECTION_ALIASES for key in sections):
+        return {"error": "Không nhận ra mục nào của CV (Học vấn, Kinh nghiệm, Kỹ năng...)."}
+
+    # 3. Parse từng mục
+    start = time.perf_counter()
+    cv_result = parse_sections(header, sections)
+    timings["parse"] = time.perf_counter() - start
+
+    # 4. Đảm bảo các trường list quan trọng tồn tại
+    cv_result.setdefault("education", [])
+    cv_result.setdefault("experience", [])
+    return cv_result
@@ -0,0 +1,108 @@
+# rag/cv_result_cache.py (Cache kết quả !cv theo nội dung file PDF)
+
+import hashlib
+
+from rag import cv_parser
+from rag.analysis_logic import RAG_ANALYSIS_PROMPT
+from rag.skill_matcher import get_skill_matcher
+from utils.database import get_cv_result, save_cv_result, purge_cv_results
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+def _sha256(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _source_version(module) -> str:
+    """Version = hash mã nguồn của module: sửa parser là cache cũ tự hết hiệu lực, không cần nhớ bump."""
+    with open(module.__file__, "rb") as f:
+        return _sha256(f.read())[:16]
+
+
+PARSER_VERSION = _source_version(cv_parser)
+PROMPT_VERSION = _sha256(RAG_ANALYSIS_PROMPT)[:16]
+
+
+class CVResultCache:
+    """
+    Cache trong Postgres (bảng cv_result_cache) cho !cv, key = sha256 của file PDF + version:
+    - parse: JSON đã parse, theo PARSER_VERSION
+    - analysis: phần đề xuất kỹ năng của LLM, theo parser + prompt + chuẩn kỹ năng + model + version knowledge base
+    Upload lại đúng file cũ không phải parse lại cũng không gọi LLM. Đổi version thì key đổi,
+    các dòng của version cũ bị xóa ở lần dùng đầu tiên sau khi đổi.
+    """
+
+    def __init__(self):
+        self.hits = {"parse": 0, "analysis": 0}
+        self.misses = {"parse": 0, "analysis": 0}
+        self._purged = {}  # kind -> version đã dọn
+
+    @staticmethod
+    def digest(pdf_content: bytes) -> str:
+        return _sha256(pdf_content)
+
+    @staticmethod
+    def _version(kind: str, kb_version: str = None) -> str:
+        if kind == "parse":
+            return PARSER_VERSION
+        taxonomy = get_skill_matcher().version
+        return _sha256(f"{PARSER_VERSION}|{PROMPT_VERSION}|{taxonomy}|{config.OLLAMA_MODEL}|{kb_version}")[:32]
+
+    async def _get(self, kind: str, digest: str, version: str):
+        if not config.CV_RESULT_CACHE_ENABLED:
+            return None
+        if self._purged.get(kind) != version:
+            removed = await purge_cv_results(kind, version)
+            if removed is not None:  # Dọn lỗi thì lần sau thử lại
+                self._purged[kind] = version
+            if removed:
+                logger.info(f"Đã xóa {removed} kết quả {kind} CV của version cũ")
+        content = await get_cv_result(_sha256(f"{kind}|{digest}|{version}"))
+        if content is None:
+            self.misses[kind] += 1
+        else:
+            self.hits[kind] += 1
+        return content
+
+    async def _save(self, kind: str, digest: str, version: str, content):
+        if config.CV_RESULT_CACHE_ENABLED:
+            await save_cv_result(_sha256(f"{kind}|{digest}|{version}"), kind, version, content)
+
+    async def get_parsed(self, digest: str):
+        """CV JSON đã parse của file này (None nếu chưa có)."""
+        return await self._get("parse", digest, self._version("parse"))
+
+    async def save_parsed(self, digest: str, cv_data: dict):
+        await self._save("parse", digest, self._version("parse"), cv_data)
+
+    async def get_analysis(self, digest: str, kb_version: str):
+        """Phần phân tích/đề xuất kỹ năng đã sinh cho file này (None nếu chưa có)."""
+        content = await self._get("analysis", digest, self._version("analysis", kb_version))
+        return content["analysis"] if content else None
+
+    async def save_analysis(self, digest: str, kb_version: str, analysis: str):
+        await self._save("analysis", digest, self._version("analysis", kb_version), {"analysis": analysis})
+
+    def stats(self) -> dict:
+        return {
+            "parse_hits": self.hits["parse"],
+            "parse_misses": self.misses["parse"],
+            "analysis_hits": self.hits["analysis"],
+            "analysis_misses": self.misses["analysis"],
+        }
+
+
+_cache = None
+
+
+def get_cv_result_cache() -> CVResultCache:
+    """Trả về cache kết quả CV dùng chung của process."""
+    global _cache
+    if _cache is None:
+        _cache = CVResultCache()
+    return _cache
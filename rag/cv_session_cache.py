@@ -0,0 +1,113 @@
+# rag/cv_session_cache.py (Cache CV của từng user, kèm context dựng sẵn cho !chat)
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from rag.analysis_logic import format_experience_to_text
+from rag.context_builder import count_tokens
+from utils.database import get_cv_data, save_cv_data
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+@dataclass
+class CVState:
+    """CV đã parse của 1 user cùng khối context đưa vào prompt !chat (tính 1 lần khi lưu/đọc DB)."""
+    cv_data: dict
+    context: str
+    tokens: int
+
+
+def build_cv_context(cv_data: dict) -> str:
+    """Khối thông tin CV đặt trước câu hỏi của người dùng trong !chat."""
+    experience_text = format_experience_to_text(cv_data.get('experience', []))
+    skills_list = cv_data.get('skills', [])
+    # Đảm bảo skills là list
+    if skills_list and isinstance(skills_list[0], str):
+        skills_text = "Kỹ năng đã liệt kê: " + ", ".join(skills_list)
+    else:
+        skills_text = ""
+
+    return (
+        "--- THÔNG TIN CV CỦA NGƯỜI DÙNG ---\n"
+        f"Chức danh: {cv_data['personal_info'].get('title', 'N/A')}\n"
+        f"{experience_text}\n{skills_text}\n"
+        "----------------------------------\n"
+        "LƯU Ý: Nếu câu hỏi của người dùng là kiểm tra kiến thức, hãy sử dụng thông tin CV trên để đặt câu hỏi về các kỹ năng đã liệt kê hoặc so sánh với kiến thức nền (knowledge base). Ví dụ: đặt câu hỏi về Next.js nếu họ liệt kê Next.js."
+    )
+
+
+class CVSessionCache:
+    """
+    LRU + TTL trước bảng cv_sessions: !chat chỉ tra dict thay vì query Postgres và dựng lại context.
+    save() ghi xuống DB rồi cập nhật cache (write-through). User chưa có CV cũng được cache (None).
+    Chỉ cache kết quả đọc/ghi DB thành công: lỗi DB không để lại entry sai trong cache.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or config.CV_CACHE_MAX_ENTRIES
+        self.ttl = config.CV_CACHE_TTL if ttl is None else ttl
+        self._entries = OrderedDict()  # user_id -> (CVState | None, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int):
+        """Trả về CVState của user (None nếu chưa gửi CV), đọc DB khi cache miss."""
+        entry = self._entries.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        try:
+            cv_data = await get_cv_data(user_id)
+        except Exception as e:
+            # Không cache None khi DB lỗi, nếu không user có CV sẽ bị coi là chưa có đến hết TTL
+            logger.error(f"Không đọc được CV của user {user_id}: {e}")
+            return None
+        return self._put(user_id, cv_data)
+
+    async def save(self, user_id: int, cv_data: dict, job_title: str):
+        """Lưu CV xuống DB và dựng sẵn context cho các lần !chat sau. None nếu lưu DB lỗi."""
+        if not await save_cv_data(user_id, cv_data, job_title):
+            self.invalidate(user_id)  # Lần !chat sau đọc lại DB thay vì dùng CV chưa lưu được
+            return None
+        return self._put(user_id, cv_data)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def _put(self, user_id: int, cv_data: dict):
+        state = None
+        if cv_data:
+            context = build_cv_context(cv_data)
+            state = CVState(cv_data=cv_data, context=context, tokens=count_tokens(context))
+            logger.info(f"Đã dựng context CV cho user {user_id}: {state.tokens} token")
+        self._entries[user_id] = (state, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return state
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+_cv_cache = None
+
+
+def get_cv_session_cache() -> CVSessionCache:
+    """Trả về cache CV dùng chung của process."""
+    global _cv_cache
+    if _cv_cache is None:
+        _cv_cache = CVSessionCache()
+    return _cv_cache
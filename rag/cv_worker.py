@@ -0,0 +1,62 @@
+# rag/cv_worker.py (Process con parse CV PDF, chạy dạng script: python rag/cv_worker.py <fd> <max_memory_mb>)
+#
+# Chạy bằng đường dẫn file chứ không import qua package "rag": thư mục rag/ thành sys.path[0] nên
+# chỉ nạp cv_parser (PyMuPDF + RapidFuzz), không kéo theo rag/__init__ (engine, Chroma, LangChain),
+# config hay bot.py như multiprocessing spawn.
+
+import sys
+from multiprocessing.connection import Connection
+
+try:
+    import resource  # Chỉ có trên Unix; Windows bỏ qua giới hạn bộ nhớ
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    # Linux trả về KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def limit_memory(max_memory_mb: float):
+    """Giới hạn address space của chính process này: PDF quá nặng gây MemoryError thay vì làm phình RAM."""
+    if resource is None or not max_memory_mb:
+        return
+    limit = int(max_memory_mb * 1024 * 1024)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass  # Hard limit của hệ thống thấp hơn hoặc nền tảng không hỗ trợ
+
+
+def serve(conn, max_memory_mb: float = 0):
+    """Vòng lặp: nhận (bytes PDF, limits), trả (kết quả, timings, peak RSS MB, sắp thoát). None = dừng."""
+    from cv_parser import process_cv_data
+
+    limit_memory(max_memory_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break  # Bot đã đóng kết nối
+        if job is None:
+            break
+        pdf_content, limits = job
+        timings = {}
+        try:
+            result = process_cv_data(pdf_content, timings, limits)
+        except MemoryError:
+            # Bộ nhớ của process không còn đáng tin -> trả lỗi rồi thoát, pool sẽ thay worker mới
+            del pdf_content
+            conn.send(({"error": f"CV quá phức tạp, vượt giới hạn bộ nhớ {max_memory_mb:.0f} MB."}, timings, peak_rss_mb(), True))
+            break
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        conn.send((result, timings, peak_rss_mb(), False))
+    conn.close()
+
+
+if __name__ == "__main__":
+    serve(Connection(int(sys.argv[1])), float(sys.argv[2]) if len(sys.argv) > 2 else 0)
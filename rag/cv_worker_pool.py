@@ -0,0 +1,252 @@
+# rag/cv_worker_pool.py (Process pool riêng cho việc parse CV PDF)
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import Connection
+
+from rag.cv_parser import default_limits
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+STAGES = ("queue", "extract", "split", "parse", "total")
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cv_worker.py")
+
+
+class CVParseTimeout(TimeoutError):
+    """Parse CV quá CV_PARSE_TIMEOUT giây, worker đã bị kill (message thân thiện, gửi thẳng cho user)."""
+
+
+class _Worker:
+    """
+    1 process rag/cv_worker.py nối với bot bằng socketpair. Chạy dạng script (không qua multiprocessing
+    spawn) nên process con chỉ nạp cv_parser: khởi động ~0.15s thay vì import lại bot.py và cả package rag.
+    """
+
+    def __init__(self, max_memory_mb: float = 0):
+        parent_sock, child_sock = socket.socketpair()
+        with child_sock:
+            self.process = subprocess.Popen(
+                [sys.executable, WORKER_SCRIPT, str(child_sock.fileno()), str(max_memory_mb or 0)],
+                pass_fds=(child_sock.fileno(),), stdin=subprocess.DEVNULL,
+            )
+        self.conn = Connection(parent_sock.detach())
+        self.jobs = 0
+        self.rss_mb = 0.0
+        self.exiting = False  # Process con báo sẽ thoát (vừa chạm giới hạn bộ nhớ)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, pdf_content: bytes, timeout: float, limits: dict):
+        """Chạy trong thread (to_thread): gửi job rồi chờ kết quả tối đa timeout giây."""
+        self.conn.send((pdf_content, limits))
+        if not self.conn.poll(timeout):
+            raise CVParseTimeout(f"Phân tích CV quá {timeout:.0f}s, file có thể quá lớn hoặc bị lỗi.")
+        result, timings, self.rss_mb, self.exiting = self.conn.recv()
+        self.jobs += 1
+        return result, timings
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.wait(timeout=2)
+        except (OSError, EOFError, subprocess.TimeoutExpired):
+            pass
+        self.kill()
+
+    def kill(self):
+        if self.is_alive():
+            self.process.kill()
+            self.process.wait()
+        self.conn.close()
+
+
+class CVWorkerPool:
+    """
+    Parse CV (PyMuPDF + regex) trong các process riêng thay vì thread pool mặc định của event loop:
+    không tranh GIL với bot, và RAM phình ra vì 1 PDF lớn được trả lại khi worker bị thay.
+    max_memory_mb là giới hạn cứng trong process con (RLIMIT_AS): vượt thì job trả lỗi và worker
+    tự thoát. Worker còn được thay sau max_jobs job hoặc khi peak RSS vượt max_memory_mb; job quá
+    timeout bị kill. Dừng/tạo process (wait, Popen) đều chạy trong thread để không chặn event loop.
+    """
+
+    def __init__(self, size: int = None, max_jobs: int = None, max_memory_mb: float = None, timeout: float = None):
+        self.size = size or config.CV_WORKERS
+        self.max_jobs = config.CV_WORKER_MAX_JOBS if max_jobs is None else max_jobs
+        self.max_memory_mb = config.CV_WORKER_MAX_MEMORY_MB if max_memory_mb is None else max_memory_mb
+        self.timeout = timeout or config.CV_PARSE_TIMEOUT
+        self.limits = default_limits()  # Gửi kèm từng job: process con không phải import config
+        self._idle = deque()
+        self._workers = 0
+        self._waiters = deque()
+        self._tasks = set()  # Task thay worker chạy nền, giữ tham chiếu để không bị GC
+        self.jobs = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self._stage_totals = dict.fromkeys(STAGES, 0.0)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def start(self):
+        """Tạo sẵn worker (gọi lúc bot khởi động để !cv đầu tiên không phải chờ spawn)."""
+        while self._workers < self.size:
+            self._idle.append(_Worker(self.max_memory_mb))
+            self._workers += 1
+
+    async def parse(self, pdf_content: bytes, on_queued=None):
+        """
+        Parse CV trong 1 worker. Trả về (cv_result, timings) với timings theo STAGES (giây).
+        on_queued(position) được await 1 lần nếu mọi worker đều bận.
+        """
+        enqueued_at = time.perf_counter()
+        worker = await self._acquire(on_queued)
+        timings = {"queue": time.perf_counter() - enqueued_at}
+        healthy = False
+        try:
+            result, stage_timings = await asyncio.to_thread(worker.run, pdf_content, self.timeout, self.limits)
+            healthy = True
+        except CVParseTimeout:
+            self.timeouts += 1
+            logger.error(f"Parse CV quá {self.timeout}s, kill worker pid={worker.pid}")
+            raise
+        finally:
+            # Worker bị timeout/hỏng/bị hủy giữa chừng có thể còn job dở -> thay bằng worker mới
+            self._release(worker, healthy)
+
+        timings.update(stage_timings)
+        timings["total"] = time.perf_counter() - enqueued_at
+        self.jobs += 1
+        for stage in STAGES:
+            self._stage_totals[stage] += timings.get(stage, 0.0)
+        logger.info("Parse CV: " + ", ".join(f"{stage} {timings.get(stage, 0.0) * 1000:.0f}ms" for stage in STAGES))
+        return result, timings
+
+    async def _acquire(self, on_queued) -> _Worker:
+        if not self._waiters:
+            if self._idle:
+                return self._idle.popleft()
+            if self._workers < self.size:
+                self._workers += 1
+                spawn = asyncio.ensure_future(self._spawn())
+                try:
+                    return await asyncio.shield(spawn)
+                except asyncio.CancelledError:
+                    spawn.add_done_callback(self._adopt)  # Request bị hủy: worker vừa tạo vẫn vào pool
+                    raise
+                except Exception:
+                    self._workers -= 1
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        logger.info(f"CV pool: {len(self._waiters)} CV đang chờ, {self._workers} worker đều bận")
+        try:
+            if on_queued:
+                await on_queued(len(self._waiters))
+            return await future
+        except BaseException:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            elif future.done() and not future.cancelled():
+                self._idle.append(future.result())  # Đã được cấp worker nhưng request bị hủy
+                self._dispatch()
+            raise
+
+    def _release(self, worker: _Worker, healthy: bool):
+        if not healthy or worker.exiting or not worker.is_alive():
+            # Timeout, lỗi giữa chừng hoặc worker tự thoát sau MemoryError
+            self._replace(worker.kill)
+        elif worker.jobs >= self.max_jobs or (self.max_memory_mb and worker.rss_mb > self.max_memory_mb):
+            logger.info(f"Thay worker CV pid={worker.pid} ({worker.jobs} job, {worker.rss_mb:.0f} MB)")
+            self._replace(worker.stop)
+        else:
+            self._idle.append(worker)
+            self._dispatch()
+
+    async def _spawn(self) -> _Worker:
+        return await asyncio.to_thread(_Worker, self.max_memory_mb)
+
+    def _replace(self, shutdown):
+        """Thay worker trong task nền: request hiện tại trả kết quả ngay, không chờ process cũ thoát."""
+        self.recycled += 1
+        task = asyncio.ensure_future(self._respawn(shutdown))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _respawn(self, shutdown):
+        try:
+            await asyncio.to_thread(shutdown)
+            worker = await self._spawn()
+        except Exception as e:
+            logger.error(f"Không tạo lại được worker CV: {e}")
+            self._workers -= 1
+            if self._workers == 0:
+                # Không còn worker nào sẽ được trả về -> báo lỗi cho các CV đang chờ thay vì treo
+                while self._waiters:
+                    future = self._waiters.popleft()
+                    if not future.done():
+                        future.set_exception(RuntimeError("Không khởi động được worker parse CV."))
+            return
+        self._idle.append(worker)
+        self._dispatch()
+
+    def _adopt(self, spawn: asyncio.Future):
+        if spawn.cancelled() or spawn.exception() is not None:
+            self._workers -= 1
+            return
+        self._idle.append(spawn.result())
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._idle and self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(self._idle.popleft())
+
+    def stats(self) -> dict:
+        stats = {
+            "workers": self._workers,
+            "busy": self._workers - len(self._idle),
+            "queued": len(self._waiters),
+            "jobs": self.jobs,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+        }
+        for stage in STAGES:
+            stats[f"avg_{stage}"] = self._stage_totals[stage] / self.jobs if self.jobs else 0.0
+        return stats
+
+    def close(self):
+        while self._idle:
+            self._idle.popleft().stop()
+        self._workers = 0
+
+    async def aclose(self):
+        """Chờ các worker đang được thay rồi dừng toàn bộ (gọi trong event loop khi bot tắt)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self.close)
+
+
+_pool = None
+
+
+def get_cv_worker_pool() -> CVWorkerPool:
+    """Trả về pool parse CV dùng chung của process."""
+    global _pool
+    if _pool is None:
+        _pool = CVWorkerPool()
+    return _pool
@@ -1,9 +1,109 @@
-from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import CharacterTextSplitter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 import os
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf", ".docx")
+
+# --- PIPELINE: discover -> parse (process pool) -> chunk -> batch ---
+# Mọi bước đều là generator nên bộ nhớ chỉ giữ vài file/batch cùng lúc, không phụ thuộc kích thước corpus.
+
+
+def discover_sources(path=None):
+    """Yield các file txt/md/pdf/docx trong thư mục (đệ quy) hoặc chính file được chỉ định."""
+    path = path or config.KNOWLEDGE_PATH
+    if os.path.isfile(path):
+        yield path
+        return
+    # Bộ chuẩn kỹ năng là dữ liệu cấu hình của skill matcher, không phải kiến thức cho RAG
+    excluded = {os.path.abspath(config.SKILL_TAXONOMY_PATH)}
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            if name.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.abspath(source) not in excluded:
+                yield source
+
+
+def parse_source(path: str) -> list:
+    """Đọc 1 file thành Documents (chạy trong worker process). PDF tách theo trang."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        import fitz  # PyMuPDF
+        with fitz.open(path) as pdf:
+            return [
+                Document(page_content=text, metadata={"source": path, "page": i})
+                for i, page in enumerate(pdf)
+                if (text := page.get_text()).strip()
+            ]
+    if ext == ".docx":
+        import docx2txt
+        text = docx2txt.process(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    return [Document(page_content=text, metadata={"source": path})] if text.strip() else []
+
+
+def _skip_unreadable(path: str, error: Exception):
+    logger.warning(f"Bỏ qua file không đọc được {path}: {type(error).__name__}: {error}")
+
+
+def iter_documents(paths, workers=None):
+    """
+    Parse song song trong process pool, chỉ giữ tối đa 2*workers file đang xử lý.
+    File hỏng / không đọc được bị bỏ qua (ghi warning), không làm dừng cả lần ingest.
+    """
+    workers = config.INGEST_WORKERS if workers is None else workers
+    if workers <= 1:
+        for path in paths:
+            try:
+                docs = parse_source(path)
+            except Exception as e:
+                _skip_unreadable(path, e)
+                continue
+            yield from docs
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}  # future -> path
+
+        def finished(done):
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    docs = future.result()
+                except Exception as e:
+                    _skip_unreadable(path, e)
+                    continue
+                yield from docs
+
+        for path in paths:
+            pending[pool.submit(parse_source, path)] = path
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+
+
+def iter_chunks(documents, chunk_size=1000, chunk_overlap=200):
+    text_splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for doc in documents:
+        yield from text_splitter.split_documents([doc])
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 def load_data(file_path='data/knowledge.txt'):
-    loader = TextLoader(file_path)
-    documents = loader.load()
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    return text_splitter.split_documents(documents)
+    return list(iter_chunks(iter_documents(discover_sources(file_path), workers=1)))
@@ -1,21 +1,244 @@
 # rag/embeddings.py (Đã chỉnh sửa để khắc phục lỗi Ollama API)
 
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from utils.http_clients import ollama_client_kwargs
 import config
 
 # Đảm bảo bạn đã chạy 'ollama pull nomic-embed-text'
-OLLAMA_EMBEDDING_MODEL = "mxbai-embed-large:latest" 
+OLLAMA_EMBEDDING_MODEL = "mxbai-embed-large:latest"
 
-def get_embeddings():
+
+class CachedEmbeddings(Embeddings):
+    """
+    Bọc embedding client bằng cache SQLite trên đĩa, key = (tên model, sha256 của text).
+    Rebuild vector store và các câu hỏi lặp lại sẽ không gọi lại model cho text đã thấy.
+    Mỗi thread dùng connection riêng; đường async đọc/ghi cache qua asyncio.to_thread để không chặn event loop.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, path: str = None):
+        self.base = base
+        self.model_name = model_name
+        self.path = path or config.EMBEDDING_CACHE_PATH
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Bảo vệ bộ đếm và danh sách connection
+        self._local = threading.local()
+        self._conns = []
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connection của thread hiện tại (tạo lần đầu); WAL cho phép các thread đọc song song."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _get_many(self, hashes: list) -> dict:
+        found = {}
+        conn = self._conn()
+        # SQLite giới hạn số tham số mỗi câu lệnh -> tra theo lô
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *batch]
+            ).fetchall()
+            for text_hash, blob in rows:
+                found[text_hash] = array("f", blob).tolist()
+        return found
+
+    def _put_many(self, items: list) -> list:
+        """Lưu vectors (float32) và trả lại đúng giá trị đã lưu để kết quả hit/miss giống hệt nhau."""
+        packed = [(h, array("f", v)) for h, v in items]
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+            [(self.model_name, h, v.tobytes()) for h, v in packed]
+        )
+        conn.commit()
+        return [(h, v.tolist()) for h, v in packed]
+
+    def _split(self, texts: list):
+        """Trả về (hashes, vectors đã cache theo hash, các text chưa có trong cache - không trùng)."""
+        hashes = [self._hash(t) for t in texts]
+        cached = self._get_many(list(set(hashes)))
+        missing = {}
+        for text, h in zip(texts, hashes):
+            if h not in cached and h not in missing:
+                missing[h] = text
+        self._count(len(texts) - len(missing), len(missing))
+        return hashes, cached, missing
+
+    def _count(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _lookup(self, text: str):
+        """(hash, vector đã cache | None) cho 1 query."""
+        h = self._hash(text)
+        vector = self._get_many([h]).get(h)
+        self._count(int(vector is not None), int(vector is None))
+        return h, vector
+
+    def embed_documents(self, texts: list) -> list:
+        hashes, cached, missing = self._split(texts)
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            cached.update(self._put_many(list(zip(missing.keys(), vectors))))
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list:
+        h, vector = self._lookup(text)
+        if vector is not None:
+            return vector
+        return self._put_many([(h, self.base.embed_query(text))])[0][1]
+
+    async def aembed_documents(self, texts: list) -> list:
+        hashes, cached, missing = await asyncio.to_thread(self._split, texts)
+        if missing:
+            vectors = await self.base.aembed_documents(list(missing.values()))
+            cached.update(await asyncio.to_thread(self._put_many, list(zip(missing.keys(), vectors))))
+        return [cached[h] for h in hashes]
+
+    async def aembed_query(self, text: str) -> list:
+        h, vector = await asyncio.to_thread(self._lookup, text)
+        if vector is not None:
+            return vector
+        vector = await self.base.aembed_query(text)
+        return (await asyncio.to_thread(self._put_many, [(h, vector)]))[0][1]
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+class QueryBatcher(Embeddings):
+    """
+    Gom các aembed_query đồng thời (chờ tối đa max_wait giây hoặc đủ max_batch text)
+    thành MỘT lời gọi aembed_documents, rồi trả kết quả về đúng từng request đang chờ.
+    Các lời gọi sync (update_vectorstore, to_thread) đi thẳng xuống client bên dưới.
+    """
+
+    def __init__(self, base: Embeddings, max_batch: int = None, max_wait: float = None):
+        self.base = base
+        self.max_batch = config.EMBED_BATCH_MAX_SIZE if max_batch is None else max_batch
+        self.max_wait = config.EMBED_BATCH_MAX_WAIT_MS / 1000 if max_wait is None else max_wait
+        self.batches = 0
+        self.batched_queries = 0
+        self.largest_batch = 0
+        self._pending = []  # [(text, future)]
+        self._timer = None
+        self._tasks = set()  # Giữ tham chiếu để task flush không bị GC giữa chừng
+
+    def embed_documents(self, texts: list) -> list:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self.base.embed_query(text)
+
+    async def aembed_documents(self, texts: list) -> list:
+        return await self.base.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list:
+        if self.max_batch <= 1:
+            return await self.base.aembed_query(text)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: list):
+        texts = list(dict.fromkeys(text for text, _ in batch))  # Bỏ trùng, giữ thứ tự
+        self.batches += 1
+        self.batched_queries += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            vectors = dict(zip(texts, await self.base.aembed_documents(texts)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in batch:
+            if not future.done():  # Request có thể đã bị hủy trong lúc chờ
+                future.set_result(vectors[text])
+
+    def stats(self) -> dict:
+        stats = self.base.stats() if hasattr(self.base, "stats") else {}
+        stats.update(batches=self.batches, batched_queries=self.batched_queries, largest_batch=self.largest_batch)
+        return stats
+
+    def close(self):
+        if hasattr(self.base, "close"):
+            self.base.close()
+
+
+def _get_base_embeddings():
     try:
         # Cố gắng sử dụng mô hình Ollama Embedding được chỉ định
         return OllamaEmbeddings(
-            model=OLLAMA_EMBEDDING_MODEL, 
+            model=OLLAMA_EMBEDDING_MODEL,
             base_url=config.OLLAMA_HOST,
-            client_kwargs={"timeout": 300}
-        )
+            keep_alive=config.OLLAMA_KEEP_ALIVE,
+            **ollama_client_kwargs()
+        ), OLLAMA_EMBEDDING_MODEL
     except Exception as e:
         # Fallback nếu Ollama không chạy hoặc model không tìm thấy
         # Log lỗi (tùy chọn)
-        return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+        return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL), config.EMBEDDING_MODEL
+
+
+def get_embeddings():
+    embeddings, model_name = _get_base_embeddings()
+    if config.EMBEDDING_CACHE_ENABLED:
+        embeddings = CachedEmbeddings(embeddings, model_name)
+    if config.EMBED_BATCH_ENABLED:
+        # Batcher nằm ngoài cache: query đã cache trả về ngay trong batch, chỉ phần miss mới gọi model
+        embeddings = QueryBatcher(embeddings)
+    return embeddings
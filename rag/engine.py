@@ -0,0 +1,224 @@
+# rag/engine.py (RAG engine dùng chung cho toàn bộ bot)
+
+import asyncio
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+from langchain_ollama import ChatOllama
+from rag.embeddings import get_embeddings
+from rag.vectorstore import (
+    get_vectorstore, close_vectorstore, get_kb_version, get_snapshot_path, acquire_lease, release_lease,
+    gc_snapshots, ChromaVectorSearch
+)
+from rag.rag_chain import build_rag_chain, build_answer_chain, format_docs
+from rag.single_flight import get_single_flight, flight_key
+from rag.model_manager import get_model_manager
+from rag.numpy_index import NumpyVectorIndex, VectorSearchRetriever
+from utils.http_clients import ollama_client_kwargs
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+class IndexHandle:
+    """Một snapshot index đã mở (vectorstore + retriever + chain) và số request đang dùng nó."""
+
+    def __init__(self, version: str, path: str):
+        self.version = version
+        self.path = path
+        self.vectorstore = None
+        self.retriever = None
+        self.chain = None
+        self.refs = 0
+        self.retired = False
+        self.lease_owner = f"{os.getpid()}-{id(self)}"
+
+
+class RAGEngine:
+    """
+    Sở hữu MỘT LLM client, MỘT embedding client và MỘT collection Chroma đã mở.
+    on_message, cog AI và analysis_logic đều dùng chung object này thay vì tự tạo chain mới.
+    Khi CURRENT trỏ sang snapshot mới, engine hot-swap index; request đang chạy vẫn dùng
+    snapshot cũ (qua acquire()) cho tới khi xong, sau đó lease cũ mới được nhả để GC.
+    """
+
+    def __init__(self):
+        self.llm = None
+        self.embeddings = None
+        self.answer_chain = None
+        self._handle = None
+        self._watch_task = None
+        self._lock = threading.RLock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._handle is not None
+
+    # Truy cập nhanh snapshot hiện tại (request dài nên dùng acquire())
+    @property
+    def vectorstore(self):
+        return self._handle.vectorstore if self._handle else None
+
+    @property
+    def retriever(self):
+        return self._handle.retriever if self._handle else None
+
+    @property
+    def chain(self):
+        return self._handle.chain if self._handle else None
+
+    @property
+    def kb_version(self):
+        return self._handle.version if self._handle else None
+
+    def init(self):
+        """Khởi tạo các client (chỉ chạy 1 lần, gọi lại nhiều lần vẫn an toàn)."""
+        with self._lock:
+            if self.is_ready:
+                return self
+            self.llm = ChatOllama(
+                model=config.OLLAMA_MODEL,
+                base_url=config.OLLAMA_HOST,
+                num_thread=4,
+                keep_alive=config.OLLAMA_KEEP_ALIVE,
+                **ollama_client_kwargs()
+            )
+            self.embeddings = get_embeddings()
+            self.answer_chain = build_answer_chain(self.llm)
+            self._handle = self._open_index()
+            logger.info(f"RAG engine đã khởi tạo (index {self.kb_version}).")
+            return self
+
+    def reload(self):
+        """Mở snapshot hiện tại (sau khi update_vectorstore), giữ nguyên LLM và embedding client."""
+        with self._lock:
+            if self.llm is None:
+                return self.init()
+            old = self._handle
+            self._handle = self._open_index()
+            self._retire(old)
+            logger.info(f"RAG engine đã hot-swap index {old.version if old else None} -> {self.kb_version}.")
+            return self
+
+    def maybe_reload(self) -> bool:
+        """Reload nếu CURRENT đã trỏ sang snapshot khác. Trả về True nếu đã swap."""
+        if not self.is_ready or get_kb_version() == self.kb_version:
+            return False
+        self.reload()
+        gc_snapshots()
+        return True
+
+    @contextmanager
+    def acquire(self):
+        """Giữ snapshot hiện tại trong suốt một request (không bị GC dù có hot-swap giữa chừng)."""
+        with self._lock:
+            handle = self._handle
+            handle.refs += 1
+        try:
+            yield handle
+        finally:
+            with self._lock:
+                handle.refs -= 1
+                if handle.retired and handle.refs == 0:
+                    self._close_handle(handle)
+
+    async def astream_answer(self, query: str, slot=None, reserved_tokens: int = 0):
+        """
+        Retrieve rồi stream câu trả lời. Các request đồng thời có cùng query + context + model
+        dùng chung MỘT generation (single-flight). slot() là context manager async giữ chỗ
+        trong hàng đợi LLM, chỉ request chạy generation thật mới lấy slot. reserved_tokens là phần
+        ngân sách context đã dùng cho khối ghép sẵn trong query (context CV của !chat).
+        """
+        with self.acquire() as index:
+            context = format_docs(await index.retriever.ainvoke(query), reserved_tokens)
+        inputs = {"context": context, "question": query}
+
+        async def generate():
+            async with (slot() if slot else nullcontext()):
+                # timed(): đo time-to-first-token, tách request cold/warm cho !stats
+                async for chunk in get_model_manager().timed(self.answer_chain.astream(inputs)):
+                    yield chunk
+
+        if config.SINGLE_FLIGHT_ENABLED:
+            chunks = get_single_flight().astream(flight_key(query, context, config.OLLAMA_MODEL), generate)
+        else:
+            chunks = generate()
+        async for chunk in chunks:
+            yield chunk
+
+    def start_watcher(self, interval: float = None):
+        """Chạy task nền kiểm tra CURRENT định kỳ để hot-swap index (gọi trong event loop)."""
+        if self._watch_task and not self._watch_task.done():
+            return
+        interval = config.INDEX_POLL_INTERVAL if interval is None else interval
+        self._watch_task = asyncio.get_running_loop().create_task(self._watch_index(interval))
+
+    async def _watch_index(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.maybe_reload)
+            except Exception as e:
+                logger.error(f"Hot-swap vector store thất bại: {e}")
+
+    def close(self):
+        """Giải phóng toàn bộ client, lần dùng tiếp theo phải gọi init() lại."""
+        with self._lock:
+            if self._watch_task:
+                self._watch_task.cancel()
+                self._watch_task = None
+            self._retire(self._handle)
+            self._handle = None
+            if hasattr(self.embeddings, "close"):
+                self.embeddings.close()  # Đóng kết nối SQLite của embedding cache
+            self.llm = None
+            self.embeddings = None
+            self.answer_chain = None
+            logger.info("RAG engine đã đóng.")
+
+    def _open_index(self) -> IndexHandle:
+        version = get_kb_version()
+        handle = IndexHandle(version, get_snapshot_path(version))
+        acquire_lease(handle.path, handle.lease_owner)
+        handle.vectorstore = get_vectorstore(embeddings=self.embeddings, path=handle.path)
+        if config.VECTOR_BACKEND == "numpy":
+            # Corpus nhỏ: top-k bằng 1 phép nhân ma trận trên mảng float32 (mmap), không qua Chroma
+            index = NumpyVectorIndex.from_vectorstore(handle.vectorstore, handle.path)
+        else:
+            index = ChromaVectorSearch(handle.vectorstore)
+        # Query luôn được embed bằng aembed_query để các request đồng thời gom chung 1 batch
+        # Tăng k lên 4-5 thường cho kết quả tốt hơn k=1
+        handle.retriever = VectorSearchRetriever(index=index, embeddings=self.embeddings, k=5)
+        handle.chain = build_rag_chain(self.llm, handle.retriever)
+        return handle
+
+    def _retire(self, handle: IndexHandle):
+        if handle is None:
+            return
+        handle.retired = True
+        if handle.refs == 0:
+            self._close_handle(handle)
+
+    @staticmethod
+    def _close_handle(handle: IndexHandle):
+        """Đóng client Chroma của snapshot đã thôi dùng rồi mới nhả lease (GC không xóa thư mục đang mở)."""
+        close_vectorstore(handle.vectorstore)
+        handle.vectorstore = handle.retriever = handle.chain = None
+        release_lease(handle.path, handle.lease_owner)
+
+
+_engine = RAGEngine()
+
+
+def get_rag_engine() -> RAGEngine:
+    """Trả về RAG engine dùng chung của process (tự init nếu chưa)."""
+    if not _engine.is_ready:
+        _engine.init()
+    return _engine
+
+
+def close_rag_engine():
+    """Đóng RAG engine dùng chung (gọi khi bot tắt)."""
+    _engine.close()
@@ -0,0 +1,137 @@
+# rag/model_manager.py (Warm-up và giữ model Ollama trong RAM)
+
+import asyncio
+import time
+
+import ollama
+
+from rag.embeddings import OLLAMA_EMBEDDING_MODEL
+from utils.http_clients import get_ollama_client
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+class OllamaModelManager:
+    """
+    Vòng đời model Ollama của bot:
+    - lúc khởi động: kiểm tra Ollama có chạy không (list, KHÔNG pull) rồi nạp song song model chat + embedding
+    - khi còn traffic (trong OLLAMA_WARM_WINDOW giây): ping keep_alive định kỳ để model không bị unload
+    - đo time-to-first-token và tách riêng request "cold" (model có thể đã bị unload) với "warm"
+    """
+
+    def __init__(self, chat_model: str = None, embed_model: str = None):
+        self.chat_model = chat_model or config.OLLAMA_MODEL
+        self.embed_model = embed_model or OLLAMA_EMBEDDING_MODEL
+        self.keep_alive = config.OLLAMA_KEEP_ALIVE
+        self.reachable = None
+        self.load_times = {}  # model -> giây nạp lúc warm-up
+        self._task = None
+        self._last_used = {}  # model -> time.monotonic() lần cuối model chắc chắn còn trong RAM
+        self._last_request = time.monotonic()
+        self._latency = {"cold": [0, 0.0], "warm": [0, 0.0]}  # [số request, tổng TTFT]
+
+    @property
+    def client(self) -> ollama.AsyncClient:
+        return get_ollama_client()
+
+    async def check(self):
+        """Kiểm tra Ollama có phản hồi không. Trả về (ok, message)."""
+        try:
+            await self.client.list()
+            self.reachable = True
+            return True, f"Ollama tại {config.OLLAMA_HOST} đang chạy."
+        except Exception as e:
+            self.reachable = False
+            return False, f"Không kết nối được Ollama tại {config.OLLAMA_HOST}: {e}"
+
+    async def _load(self, model: str, embedding: bool) -> float:
+        start = time.perf_counter()
+        if embedding:
+            await self.client.embed(model=model, input="warm-up", keep_alive=self.keep_alive)
+        else:
+            # prompt rỗng: Ollama chỉ nạp model vào RAM, không sinh token
+            await self.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+        self.mark_used(model)
+        return time.perf_counter() - start
+
+    async def warm_up(self):
+        """Nạp song song model chat và embedding, ghi lại thời gian nạp (cold load) của từng model."""
+        models = ((self.chat_model, False), (self.embed_model, True))
+        results = await asyncio.gather(*(self._load(m, emb) for m, emb in models), return_exceptions=True)
+        for (model, _), result in zip(models, results):
+            if isinstance(result, Exception):
+                logger.error(f"Warm-up model {model} thất bại: {result}")
+            else:
+                self.load_times[model] = result
+                logger.info(f"Đã nạp model {model} trong {result:.2f}s")
+
+    def start(self):
+        """Chạy warm-up + vòng keep-alive trong nền (gọi trong event loop)."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        await self.warm_up()
+        while True:
+            await asyncio.sleep(config.OLLAMA_KEEPALIVE_INTERVAL)
+            if time.monotonic() - self._last_request > config.OLLAMA_WARM_WINDOW:
+                continue  # Không ai dùng bot một lúc -> để Ollama tự unload, trả RAM cho máy
+            try:
+                await asyncio.gather(self._load(self.chat_model, False), self._load(self.embed_model, True))
+            except Exception as e:
+                logger.error(f"Ping keep_alive Ollama thất bại: {e}")
+
+    def mark_used(self, model: str):
+        self._last_used[model] = time.monotonic()
+
+    def is_resident(self, model: str) -> bool:
+        """Model còn trong RAM không (ước lượng theo lần dùng cuối và keep_alive)."""
+        last = self._last_used.get(model)
+        return last is not None and time.monotonic() - last < self.keep_alive
+
+    async def timed(self, chunks, model: str = None):
+        """Bọc stream token: đo time-to-first-token, phân loại cold/warm, đánh dấu model vừa được dùng."""
+        model = model or self.chat_model
+        bucket = "warm" if self.is_resident(model) else "cold"
+        self._last_request = time.monotonic()
+        start = time.perf_counter()
+        first = True
+        try:
+            async for chunk in chunks:
+                if first:
+                    first = False
+                    self._latency[bucket][0] += 1
+                    self._latency[bucket][1] += time.perf_counter() - start
+                yield chunk
+        finally:
+            self.mark_used(model)
+
+    def stats(self) -> dict:
+        (cold_count, cold_total), (warm_count, warm_total) = self._latency["cold"], self._latency["warm"]
+        return {
+            "reachable": self.reachable,
+            "load_times": dict(self.load_times),
+            "cold_requests": cold_count,
+            "cold_avg_ttft": cold_total / cold_count if cold_count else 0.0,
+            "warm_requests": warm_count,
+            "warm_avg_ttft": warm_total / warm_count if warm_count else 0.0,
+        }
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+_manager = None
+
+
+def get_model_manager() -> OllamaModelManager:
+    """Trả về model manager dùng chung của process."""
+    global _manager
+    if _manager is None:
+        _manager = OllamaModelManager()
+    return _manager
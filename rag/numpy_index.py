@@ -0,0 +1,107 @@
+# rag/numpy_index.py (Index vector trong process bằng NumPy cho knowledge base nhỏ)
+
+import asyncio
+import json
+import os
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+VECTORS_FILE = "numpy_vectors.npy"
+DOCS_FILE = "numpy_docs.json"
+
+
+class NumpyVectorIndex:
+    """
+    Giữ embedding đã chuẩn hóa L2 trong một mảng float32 liên tục (memory-mapped từ snapshot).
+    Top-k = một phép nhân ma trận-vector + argpartition, không qua client/SQLite/HNSW của Chroma.
+    """
+
+    def __init__(self, vectors: np.ndarray, documents: List[Document]):
+        self.vectors = vectors
+        self.documents = documents
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, snapshot_path: str = None) -> "NumpyVectorIndex":
+        """Nạp từ file .npy trong snapshot (mmap), nếu chưa có thì export từ collection Chroma."""
+        if snapshot_path:
+            vectors_path = os.path.join(snapshot_path, VECTORS_FILE)
+            docs_path = os.path.join(snapshot_path, DOCS_FILE)
+            if os.path.exists(vectors_path) and os.path.exists(docs_path):
+                with open(docs_path, encoding="utf-8") as f:
+                    docs = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in json.load(f)]
+                return cls(np.load(vectors_path, mmap_mode="r"), docs)
+
+        data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        docs = [
+            Document(page_content=text, metadata=meta or {})
+            for text, meta in zip(data["documents"], data["metadatas"])
+        ]
+        if not docs:
+            # Collection rỗng (mới cài): chưa biết số chiều -> index rỗng, không ghi .npy vào snapshot
+            return cls(np.empty((0, 0), dtype=np.float32), docs)
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(docs), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.ascontiguousarray(vectors / np.where(norms == 0, 1, norms))
+
+        if snapshot_path:
+            cls._save(vectors, docs, snapshot_path)
+        return cls(vectors, docs)
+
+    @staticmethod
+    def _save(vectors: np.ndarray, docs: List[Document], snapshot_path: str):
+        # Ghi file tạm rồi os.replace để process khác không đọc phải file dở dang
+        tmp_vectors = os.path.join(snapshot_path, VECTORS_FILE + ".tmp")
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, vectors)
+        tmp_docs = os.path.join(snapshot_path, DOCS_FILE + ".tmp")
+        with open(tmp_docs, "w", encoding="utf-8") as f:
+            json.dump([{"page_content": d.page_content, "metadata": d.metadata} for d in docs], f, ensure_ascii=False)
+        os.replace(tmp_docs, os.path.join(snapshot_path, DOCS_FILE))
+        os.replace(tmp_vectors, os.path.join(snapshot_path, VECTORS_FILE))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query_vector, k: int = 5) -> List[Document]:
+        if not self.documents:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.documents[i] for i in top]
+
+
+class VectorSearchRetriever(BaseRetriever):
+    """
+    Retriever tự embed query (qua aembed_query nên đi qua micro-batcher) rồi tìm theo vector.
+    index là NumpyVectorIndex hoặc ChromaVectorSearch - bất cứ thứ gì có search(vector, k).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: Any
+    embeddings: Embeddings
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.index.search(self.embeddings.embed_query(query), self.k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        # Chroma query chạm SQLite/HNSW -> chạy ngoài event loop như as_retriever() trước đây
+        return await asyncio.to_thread(self.index.search, vector, self.k)
@@ -1,46 +1,48 @@
 # rag/rag_chain.py (Phiên bản LCEL)
 
-from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 # Import các components LCEL
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from rag.vectorstore import get_vectorstore
-import config
+from rag.context_builder import get_context_builder
 
-def get_rag_chain():
-    llm = ChatOllama(model=config.OLLAMA_MODEL, base_url=config.OLLAMA_HOST, client_kwargs={"timeout": 300}, num_thread=4)
-    vectorstore = get_vectorstore() 
-    # Tăng k lên 4-5 thường cho kết quả tốt hơn k=1
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5}) 
-    
-    # Định nghĩa Prompt
-    RAG_PROMPT = (
-        "Sử dụng thông tin sau để trả lời câu hỏi một cách ngắn gọn. Nếu không biết, nói 'Tôi không biết.'"
-        "\n\n"
-        "Context: {context}" # Khóa context khớp với đầu vào của chain
-        "\n\n"
-        "Question: {question}" # Khóa question khớp với đầu vào của chain
-    )
+# Định nghĩa Prompt
+RAG_PROMPT = (
+    "Sử dụng thông tin sau để trả lời câu hỏi một cách ngắn gọn. Nếu không biết, nói 'Tôi không biết.'"
+    "\n\n"
+    "Context: {context}" # Khóa context khớp với đầu vào của chain
+    "\n\n"
+    "Question: {question}" # Khóa question khớp với đầu vào của chain
+)
+
+
+# Hàm định dạng documents: bỏ đoạn trùng, chọn đa dạng (MMR) và giới hạn theo CONTEXT_TOKEN_BUDGET
+def format_docs(docs, reserved: int = 0):
+    return get_context_builder().build(docs, reserved)
 
+
+def build_answer_chain(llm):
+    """Phần sinh câu trả lời: nhận {"context", "question"} đã chuẩn bị sẵn, trả về chuỗi."""
     prompt = ChatPromptTemplate.from_template(RAG_PROMPT)
+    return prompt | llm | StrOutputParser()
 
-    # Hàm định dạng documents
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
 
+def build_rag_chain(llm, retriever):
+    """Ghép chain LCEL từ LLM và retriever có sẵn (không tạo client mới)."""
     # Xây dựng Chain LCEL
     rag_chain = (
         # 1. Truy xuất: Lấy chuỗi input (question) và truyền vào retriever
-        {"context": RunnablePassthrough() | retriever | format_docs, 
+        {"context": RunnablePassthrough() | retriever | format_docs,
          "question": RunnablePassthrough()}
-        # 2. Tạo Prompt: Gửi context và question đã chuẩn bị
-        | prompt
-        # 3. Gọi LLM
-        | llm
-        # 4. Trích xuất Output
-        | StrOutputParser()
+        # 2-4. Tạo Prompt -> gọi LLM -> trích xuất Output
+        | build_answer_chain(llm)
     )
     # Lưu ý: Chain này trả về một CHUỖI, không phải dict {'answer': ...}
 
     return rag_chain
+
+
+def get_rag_chain():
+    """Trả về chain của RAG engine dùng chung (không build lại mỗi lần gọi)."""
+    from rag.engine import get_rag_engine  # import muộn để tránh vòng lặp import
+    return get_rag_engine().chain
@@ -0,0 +1,130 @@
+# rag/single_flight.py (Gộp các request giống hệt nhau đang chạy cùng lúc)
+
+import asyncio
+import hashlib
+
+from utils.llm_scheduler import QueueFullError
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Lỗi chỉ thuộc về request của leader (không vào được hàng đợi / chờ slot quá lâu), không phải lỗi generation
+LEADER_ERRORS = (QueueFullError, asyncio.TimeoutError)
+
+
+def flight_key(query: str, context: str, model: str) -> str:
+    """Key = câu hỏi đã chuẩn hóa + hash context đã retrieve + model (cùng key -> cùng prompt)."""
+    normalized = " ".join(query.lower().split())
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model}\0{normalized}\0{context_hash}".encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cancelled = False
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task = None
+
+
+class SingleFlight:
+    """
+    Request đầu tiên với 1 key (leader) chạy generation trong task riêng; các request trùng key
+    đến trong lúc đó (follower) chỉ đọc lại các chunk đã sinh và chờ chunk mới -> 1 lần gọi LLM.
+    Task riêng giúp follower vẫn nhận đủ câu trả lời dù request của leader bị hủy.
+    Follower chỉ nhận lỗi của chính generation: nếu leader bị từ chối/hết giờ chờ slot (leader_errors)
+    hoặc generation bị hủy trước khi sinh chunk nào, follower tự chạy lại với factory của mình.
+    """
+
+    def __init__(self, leader_errors: tuple = LEADER_ERRORS):
+        self.leader_errors = leader_errors
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+        self.retries = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def astream(self, key: str, factory):
+        """Yield chunk của generation chung cho key. factory() trả về async iterator (chỉ gọi ở leader)."""
+        while True:
+            flight, leader = self._join(key, factory)
+            index = 0
+            flight.subscribers += 1
+            try:
+                while True:
+                    async with flight.changed:
+                        await flight.changed.wait_for(lambda: index < len(flight.chunks) or flight.done)
+                        pending = flight.chunks[index:]
+                        finished = flight.done
+                    for chunk in pending:
+                        yield chunk
+                    index += len(pending)
+                    if finished:
+                        break
+            finally:
+                flight.subscribers -= 1
+                if flight.subscribers == 0 and not flight.done:
+                    flight.task.cancel()  # Không còn ai nghe (request bị hủy) -> nhả slot LLM
+
+            if flight.error is None and not flight.cancelled:
+                return
+            if not leader and index == 0 and (flight.cancelled or isinstance(flight.error, self.leader_errors)):
+                # Lỗi của riêng leader: follower tự làm leader (lấy slot của chính mình) thay vì nhận lỗi đó
+                self.retries += 1
+                logger.info(f"Single-flight: leader thất bại trước khi sinh chunk, follower chạy lại ({key[:12]})")
+                continue
+            if flight.cancelled:
+                raise RuntimeError("Generation dùng chung đã bị hủy giữa chừng")
+            raise flight.error
+
+    def _join(self, key: str, factory) -> tuple:
+        """(flight, là leader?): vào generation đang chạy cho key, hoặc tạo mới với factory này."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.followers += 1
+            logger.info(f"Single-flight: gộp request trùng vào generation đang chạy ({key[:12]})")
+            return flight, False
+        flight = self._flights[key] = _Flight()
+        flight.task = asyncio.ensure_future(self._run(key, flight, factory))
+        self.leaders += 1
+        return flight, True
+
+    async def _run(self, key: str, flight: _Flight, factory):
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            flight.cancelled = True
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            # Bỏ key ngay khi xong: request đến sau sẽ dùng answer cache hoặc chạy generation mới
+            self._flights.pop(key, None)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders, "followers": self.followers, "retries": self.retries, "in_flight": self.in_flight
+        }
+
+
+_single_flight = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Trả về SingleFlight dùng chung của process."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
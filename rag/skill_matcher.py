@@ -0,0 +1,217 @@
+# rag/skill_matcher.py (Nhận diện kỹ năng trong CV bằng Aho-Corasick trên bộ chuẩn kỹ năng)
+
+import hashlib
+import re
+from collections import deque
+from dataclasses import dataclass, field
+
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+SHORT_PATTERN_LEN = 3  # "AI", "ML", "Go", "js": khớp đúng cách viết (hoặc in hoa) để không dính từ thường
+SHORT_PATTERN_JOINERS = "&.-"  # "R&D", "TS.", "Go-getter": với chữ viết tắt ngắn, các ký tự này nối liền từ
+AMBIGUOUS_MARK = "~"
+
+# Ngữ cảnh kỹ thuật cho cách viết thông dụng (đánh dấu ~): đứng sau từ gợi ý, hoặc là 1 mục trong danh sách
+_TECH_CUE_RE = re.compile(r"(?:bằng|ngôn ngữ|lập trình|sử dụng|dùng|framework|thư viện|using|with)\s*$", re.IGNORECASE)
+_LIST_EDGE = ",;/|()[]+:\n"
+_LIST_WORD_RE = re.compile(r"(?:^|\s)(?:và|and)$", re.IGNORECASE)
+
+
+def load_taxonomy(path: str) -> tuple:
+    """Đọc skill_standards.txt -> ({cách viết: tên chuẩn}, {tên chuẩn: nhóm}, {cách viết cần ngữ cảnh})."""
+    aliases, groups, ambiguous = {}, {}, set()
+    group = ""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                group = line[1:-1].strip()
+                continue
+            # Tách ở ": " (không phải ":") để giữ được tên như "C#", "CI/CD"
+            head, _, rest = line.partition(": ")
+            name = head.strip().lstrip(AMBIGUOUS_MARK).strip()
+            groups[name] = group
+            for alias in [head, *rest.split(",")]:
+                alias = alias.strip()
+                if alias.startswith(AMBIGUOUS_MARK):
+                    alias = alias[1:].strip()
+                    ambiguous.add(alias)
+                if alias:
+                    aliases.setdefault(alias, name)
+    return aliases, groups, ambiguous
+
+
+@dataclass
+class SkillReport:
+    """Kết quả đối chiếu kỹ năng liệt kê với kinh nghiệm / dự án (tên theo cách viết trong CV)."""
+    listed: list = field(default_factory=list)
+    supported: list = field(default_factory=list)
+    unsupported: list = field(default_factory=list)
+    unlisted: list = field(default_factory=list)  # Dùng trong kinh nghiệm nhưng chưa ghi ở mục Kỹ năng
+
+    def to_prompt(self) -> str:
+        """Khối "sự thật đã kiểm tra" đưa vào prompt phân tích CV."""
+        def names(items):
+            return ", ".join(items) if items else "không có"
+        return (
+            f"- Kỹ năng liệt kê CÓ bằng chứng trong kinh nghiệm/dự án: {names(self.supported)}\n"
+            f"- Kỹ năng liệt kê KHÔNG có bằng chứng trong kinh nghiệm/dự án: {names(self.unsupported)}\n"
+            f"- Kỹ năng đã dùng trong kinh nghiệm nhưng chưa ghi ở mục Kỹ năng: {names(self.unlisted)}"
+        )
+
+
+class SkillMatcher:
+    """
+    Automaton Aho-Corasick trên mọi cách viết của bộ chuẩn kỹ năng: quét text 1 lượt, thời gian
+    tuyến tính theo độ dài text, không phụ thuộc số kỹ năng. Chỉ nhận khớp trọn từ (ML không khớp
+    trong HTML, Java không khớp trong JavaScript); khớp chồng nhau lấy khớp dài nhất bên trái.
+    Cách viết trong `ambiguous` (từ thông dụng như Go, node) chỉ được nhận trong ngữ cảnh kỹ thuật.
+    """
+
+    def __init__(self, aliases: dict, groups: dict = None, version: str = "", ambiguous=()):
+        self.groups = groups or {}
+        self.version = version
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # node -> [(độ dài, tên chuẩn, các cách viết đúng hoa thường | None, cần ngữ cảnh)]
+        for alias, name in aliases.items():
+            self._add(alias, name, alias in ambiguous)
+        self._build()
+
+    @classmethod
+    def from_file(cls, path: str = None):
+        path = path or config.SKILL_TAXONOMY_PATH
+        with open(path, "rb") as f:
+            version = hashlib.sha256(f.read()).hexdigest()[:16]
+        aliases, groups, ambiguous = load_taxonomy(path)
+        logger.info(f"Đã nạp {len(groups)} kỹ năng ({len(aliases)} cách viết) từ {path}")
+        return cls(aliases, groups, version, ambiguous)
+
+    def _add(self, alias: str, name: str, ambiguous: bool = False):
+        node = 0
+        for ch in alias.lower():
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        exact = {alias, alias.upper()} if len(alias) <= SHORT_PATTERN_LEN and alias.isalpha() else None
+        self._out[node].append((len(alias), name, exact, ambiguous))
+
+    def _build(self):
+        """Tính fail link theo BFS và gộp output của các hậu tố."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> list:
+        """Các khớp (start, end, tên chuẩn) không chồng nhau, theo thứ tự xuất hiện."""
+        lower = text.lower()
+        if len(lower) != len(text):  # Ký tự hiếm đổi độ dài khi lower() -> giữ nguyên để offset khớp
+            lower = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+        matches = []
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for end, ch in enumerate(lower, 1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, name, exact, ambiguous in out[node]:
+                start = end - length
+                if not self._is_word(text, start, end, exact is not None):
+                    continue
+                if exact is not None and text[start:end] not in exact:
+                    continue
+                matches.append((start, end, name, ambiguous))
+
+        # Leftmost-longest: "React Native" thắng "React", "Node.js" thắng "Node"
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        result, last_end = [], 0
+        for start, end, name, ambiguous in matches:
+            if start < last_end:
+                continue
+            last_end = end  # Khớp bị loại vì thiếu ngữ cảnh vẫn "chiếm" đoạn text đó
+            if ambiguous and not self._in_tech_context(text, start, end):
+                continue
+            result.append((start, end, name))
+        return result
+
+    @staticmethod
+    def _is_word(text: str, start: int, end: int, short: bool) -> bool:
+        """Trọn từ: ký tự liền trước/sau không phải chữ/số (với chữ viết tắt ngắn: cả & . - cũng không được)."""
+        before = text[start - 1] if start > 0 else ""
+        after = text[end] if end < len(text) else ""
+        for ch in (before, after):
+            if ch and (ch.isalnum() or (short and ch in SHORT_PATTERN_JOINERS)):
+                return False
+        return True
+
+    @staticmethod
+    def _in_tech_context(text: str, start: int, end: int) -> bool:
+        """
+        Ngữ cảnh kỹ thuật cho từ thông dụng: đứng sau "bằng", "lập trình", "using"... hoặc là 1 mục
+        trong danh sách (hai bên là đầu/cuối dòng, dấu phẩy, /, ngoặc, "và"): "Node, React" nhận
+        Node.js, "Go to market" hay "mỗi node trong cluster" thì không.
+        """
+        left = text[:start].rstrip(" \t")
+        right = text[end:].lstrip(" \t")
+        if _TECH_CUE_RE.search(left):
+            return True
+        left_edge = not left or left[-1] in _LIST_EDGE or _LIST_WORD_RE.search(left)
+        right_edge = not right or right[0] in _LIST_EDGE or re.match(r"(?:và|and)\b", right, re.IGNORECASE)
+        return bool(left_edge and right_edge)
+
+    def analyze(self, cv_data: dict) -> SkillReport:
+        """
+        Quét 1 lượt text ghép từ mục Kỹ năng + mô tả kinh nghiệm + dự án, rồi chia khớp theo vùng:
+        kỹ năng liệt kê không xuất hiện ở kinh nghiệm/dự án là "chưa có bằng chứng".
+        """
+        skills = cv_data.get("skills") or []
+        listed_text = " ; ".join(s for s in skills if isinstance(s, str))
+        # Bằng chứng = mô tả công việc đã làm; chức danh kiểu "Chuyên viên Python" một mình không tính.
+        # Dự án thì tính cả tên/dòng tiêu đề vì hay ghi luôn tech stack ("Web bán hàng (Next.js, Node.js)")
+        evidence_parts = []
+        for job in cv_data.get("experience") or []:
+            evidence_parts.extend(job.get("description", []) or [])
+        for project in cv_data.get("projects") or []:
+            evidence_parts.extend([project.get("company", ""), project.get("role", "")])
+            evidence_parts.extend(project.get("description", []) or [])
+        text = listed_text + "\n" + "\n".join(p for p in evidence_parts if isinstance(p, str))
+
+        listed, evidence = {}, {}
+        for start, end, name in self.find(text):
+            target = listed if start < len(listed_text) else evidence
+            target.setdefault(name, text[start:end])
+
+        return SkillReport(
+            listed=list(listed.values()),
+            supported=[surface for name, surface in listed.items() if name in evidence],
+            unsupported=[surface for name, surface in listed.items() if name not in evidence],
+            unlisted=[surface for name, surface in evidence.items() if name not in listed],
+        )
+
+
+_matcher = None
+
+
+def get_skill_matcher() -> SkillMatcher:
+    """Trả về matcher dùng chung (nạp SKILL_TAXONOMY_PATH lần đầu khi được gọi)."""
+    global _matcher
+    if _matcher is None:
+        _matcher = SkillMatcher.from_file()
+    return _matcher
@@ -1,41 +1,326 @@
 # rag/vectorstore.py (CODE ĐÃ SỬA LỖI VÀ TỐI ƯU)
 
+from chromadb.api.shared_system_client import SharedSystemClient
 from langchain_chroma import Chroma
 from rag.embeddings import get_embeddings # Giữ import này
 import config
+import hashlib
+import json
 import os
 import shutil
-from .data_loader import load_data 
+import time
+import uuid
+from .data_loader import discover_sources, iter_documents, iter_chunks, batched
+from .numpy_index import VECTORS_FILE, DOCS_FILE
 # 🛑 XÓA DÒNG NÀY: from langchain_ollama import OllamaEmbeddings 
 from langchain_core.documents import Document
 
-def get_vectorstore():
+# Bố cục thư mục:
+#   rag/vectorstore/CURRENT                 -> tên snapshot đang dùng (đổi bằng os.replace, atomic)
+#   rag/vectorstore/snapshots/<version>/    -> mỗi lần build ra 1 thư mục Chroma mới
+#   rag/vectorstore/snapshots/<v>/.leases/  -> process nào đang mở snapshot (chặn GC)
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+SNAPSHOTS_DIR = "snapshots"
+LEASES_DIR = ".leases"
+LEGACY_VERSION = "legacy"  # Index cũ nằm thẳng trong VECTOR_STORE_PATH (trước khi có snapshot)
+
+
+def _snapshots_root() -> str:
+    return os.path.join(config.VECTOR_STORE_PATH, SNAPSHOTS_DIR)
+
+
+def get_kb_version() -> str:
+    """Phiên bản knowledge base hiện tại = tên snapshot trong CURRENT (đổi mỗi lần reindex có thay đổi)."""
+    try:
+        with open(os.path.join(config.VECTOR_STORE_PATH, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        if os.path.exists(os.path.join(config.VECTOR_STORE_PATH, "chroma.sqlite3")):
+            return LEGACY_VERSION
+        return "unknown"
+
+
+def get_snapshot_path(version: str = None) -> str:
+    version = version or get_kb_version()
+    if version in (LEGACY_VERSION, "unknown"):
+        return config.VECTOR_STORE_PATH
+    return os.path.join(_snapshots_root(), version)
+
+
+def _flip_current(version: str):
+    """Trỏ CURRENT sang snapshot mới một cách atomic (ghi file tạm rồi os.replace)."""
+    tmp_path = os.path.join(config.VECTOR_STORE_PATH, CURRENT_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(config.VECTOR_STORE_PATH, CURRENT_FILE))
+
+
+def get_vectorstore(embeddings=None, path: str = None):
     # Hàm này OK, sử dụng get_embeddings() đã cấu hình mxbai-embed-large
-    embeddings = get_embeddings()
+    # Truyền embeddings vào để dùng lại client của RAG engine thay vì tạo mới
+    if embeddings is None:
+        embeddings = get_embeddings()
     return Chroma(
-        persist_directory=config.VECTOR_STORE_PATH,
+        persist_directory=path or get_snapshot_path(),
         embedding_function=embeddings
     )
-    
-def update_vectorstore():
-    global vectorstore
-    vectorstore_path = config.VECTOR_STORE_PATH
-    if os.path.exists(vectorstore_path):
-        shutil.rmtree(vectorstore_path, ignore_errors=True)
-    
-    texts = load_data("data/knowledge.txt")
-    if not texts:
-        raise ValueError("Không có dữ liệu trong file knowledge.txt")
-    
-    # Lấy mô hình embedding đã cấu hình (mxbai-embed-large)
-    embeddings = get_embeddings() 
-    
-    # Xử lý nội dung Documents (Chỉ lấy chuỗi nội dung)
-    if isinstance(texts[0], Document):
-        text_contents = [doc.page_content for doc in texts]
+
+
+def close_vectorstore(vectorstore):
+    """
+    Đóng client Chroma: stop System (HNSW trong RAM, kết nối SQLite) và bỏ nó khỏi cache theo
+    đường dẫn của chromadb. Không đóng thì mỗi lần build/hot-swap lại giữ thêm 1 index cũ.
+    """
+    client = getattr(vectorstore, "_client", None)
+    if client is None:
+        return
+    if hasattr(client, "close"):
+        client.close()  # chromadb có đếm tham chiếu: System chỉ stop khi client cuối cùng đóng
+        return
+    system = SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+    if system is not None:
+        system.stop()
+
+
+# --- LEASE & GARBAGE COLLECTION CHO SNAPSHOT ---
+
+def acquire_lease(snapshot_path: str, owner: str):
+    """Đánh dấu snapshot (kể cả index legacy) đang được dùng (file .leases/<owner>, owner bắt đầu bằng pid)."""
+    lease_dir = os.path.join(snapshot_path, LEASES_DIR)
+    os.makedirs(lease_dir, exist_ok=True)
+    open(os.path.join(lease_dir, owner), "w").close()
+
+
+def release_lease(snapshot_path: str, owner: str):
+    try:
+        os.remove(os.path.join(snapshot_path, LEASES_DIR, owner))
+    except OSError:
+        pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _has_live_lease(snapshot_path: str) -> bool:
+    lease_dir = os.path.join(snapshot_path, LEASES_DIR)
+    if not os.path.isdir(lease_dir):
+        return False
+    for owner in os.listdir(lease_dir):
+        pid = owner.split("-", 1)[0]
+        if pid.isdigit() and _pid_alive(int(pid)):
+            return True
+        release_lease(snapshot_path, owner)  # Lease của process đã chết
+    return False
+
+
+def _is_legacy_entry(name: str) -> bool:
+    """File/thư mục của index legacy nằm thẳng trong VECTOR_STORE_PATH (sqlite, thư mục HNSW theo uuid...)."""
+    if name.startswith("chroma.sqlite3") or name.startswith((MANIFEST_FILE, VECTORS_FILE, DOCS_FILE)):
+        return True
+    try:
+        uuid.UUID(name)
+        return True
+    except ValueError:
+        return False
+
+
+def _remove_legacy_index() -> bool:
+    """Xóa index legacy sau khi đã chuyển sang snapshot (CURRENT đã có và không process nào còn mở nó)."""
+    root = config.VECTOR_STORE_PATH
+    if not os.path.exists(os.path.join(root, CURRENT_FILE)) or _has_live_lease(root):
+        return False
+    removed = False
+    for name in os.listdir(root):
+        if not _is_legacy_entry(name):
+            continue
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+        removed = True
+    if removed:
+        shutil.rmtree(os.path.join(root, LEASES_DIR), ignore_errors=True)  # Chỉ còn lease đã hết hạn
+    return removed
+
+
+def gc_snapshots(keep: int = None) -> list:
+    """
+    Xóa các snapshot cũ không phải CURRENT, ngoài `keep` bản mới nhất và không còn lease sống.
+    Index legacy (trước khi có snapshot) cũng bị xóa khi đã migrate xong.
+    """
+    keep = config.SNAPSHOT_KEEP if keep is None else keep
+    root = _snapshots_root()
+    if not os.path.isdir(root):
+        return []
+    if _remove_legacy_index():
+        removed = [LEGACY_VERSION]
     else:
-        text_contents = texts
-    
-    # Sử dụng hàm from_texts với mô hình EMBEDDING đã cấu hình đúng
-    vectorstore = Chroma.from_texts(text_contents, embeddings, persist_directory=vectorstore_path)
-    print(f"Vector store đã được cập nhật tại {vectorstore_path}")
+        removed = []
+    current = get_kb_version()
+    # Tên snapshot bắt đầu bằng timestamp -> sort theo tên là sort theo thời gian
+    snapshots = sorted((d for d in os.listdir(root) if not d.startswith(".")), reverse=True)
+    for name in snapshots[keep:]:
+        path = os.path.join(root, name)
+        if name == current or _has_live_lease(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+def _load_manifest(vectorstore_path: str) -> dict:
+    try:
+        with open(os.path.join(vectorstore_path, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(vectorstore_path: str, manifest: dict):
+    tmp_path = os.path.join(vectorstore_path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(vectorstore_path, MANIFEST_FILE))
+
+
+def assign_chunk_ids(docs: list, seen: dict = None) -> list:
+    """
+    ID ổn định cho mỗi chunk = hash(source + nội dung); chunk giống hệt nhau trong cùng
+    file được đánh số thứ tự. Sửa 1 dòng chỉ đổi ID của chunk chứa dòng đó.
+    Truyền cùng `seen` qua nhiều batch để đánh số đúng khi ingest dạng stream.
+    """
+    ids = []
+    seen = {} if seen is None else seen
+    for doc in docs:
+        source = doc.metadata.get("source", "")
+        digest = hashlib.sha256(f"{source}\0{doc.page_content}".encode("utf-8")).hexdigest()[:32]
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(digest if seen[digest] == 1 else f"{digest}-{seen[digest]}")
+    return ids
+
+
+def _fingerprint(doc: Document) -> str:
+    payload = json.dumps(doc.metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ChromaVectorSearch:
+    """Tìm theo vector đã embed sẵn trên collection Chroma (giống similarity_search nhưng không tự embed)."""
+
+    def __init__(self, vectorstore: Chroma):
+        self.vectorstore = vectorstore
+
+    def search(self, query_vector, k: int = 5) -> list:
+        return self.vectorstore.similarity_search_by_vector(query_vector, k=k)
+
+
+def update_vectorstore(rebuild: bool = False, source: str = None) -> dict:
+    """
+    Build snapshot mới theo kiểu incremental rồi flip CURRENT sang nó (atomic).
+    Snapshot đang chạy không bao giờ bị sửa/xóa khi build, bot đang phục vụ sẽ tự hot-swap.
+    Ingest dạng stream: discover -> parse (process pool) -> chunk -> embed/upsert theo batch,
+    chỉ những chunk mới/đổi mới bị embed. Trả về số lượng thay đổi, thời gian và throughput.
+    """
+    start = time.perf_counter()
+    source = source or config.KNOWLEDGE_PATH
+    base_version = get_kb_version()
+
+    # 1. Copy snapshot hiện tại sang thư mục build tạm (bỏ qua khi rebuild hoặc chưa có index)
+    os.makedirs(_snapshots_root(), exist_ok=True)
+    # Tên build luôn mới: Chroma cache client theo đường dẫn, dùng lại path đã xóa sẽ lỗi readonly
+    build_path = os.path.join(_snapshots_root(), f".build-{uuid.uuid4().hex}")
+    if base_version != "unknown" and not rebuild:
+        shutil.copytree(
+            get_snapshot_path(base_version), build_path,
+            ignore=shutil.ignore_patterns(
+                SNAPSHOTS_DIR, CURRENT_FILE, CURRENT_FILE + ".tmp", LEASES_DIR, VECTORS_FILE + "*", DOCS_FILE + "*"
+            )
+        )
+    else:
+        os.makedirs(build_path)
+
+    try:
+        manifest = _load_manifest(build_path).get("chunks", {})
+
+        # Lấy mô hình embedding đã cấu hình (mxbai-embed-large, có cache trên đĩa)
+        vectorstore = get_vectorstore(embeddings=get_embeddings(), path=build_path)
+    except Exception:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+
+    try:
+        existing_ids = set(vectorstore.get(include=[])["ids"])
+
+        # 2. Stream chunk theo batch: chỉ giữ id -> fingerprint của toàn corpus trong bộ nhớ
+        current, seen = {}, {}
+        added = updated = 0
+        chunks = iter_chunks(iter_documents(discover_sources(source)))
+        for batch in batched(chunks, config.INGEST_BATCH_SIZE):
+            upsert_ids, upsert_docs = [], []
+            for chunk_id, doc in zip(assign_chunk_ids(batch, seen), batch):
+                fingerprint = _fingerprint(doc)
+                current[chunk_id] = fingerprint
+                if chunk_id in existing_ids and chunk_id in manifest:
+                    if manifest[chunk_id] == fingerprint:
+                        continue
+                    updated += 1
+                else:
+                    added += 1
+                upsert_ids.append(chunk_id)
+                upsert_docs.append(doc)
+            if upsert_ids:
+                # Chroma add = upsert: ghi đè luôn chunk có sẵn nhưng thiếu trong manifest
+                vectorstore.add_documents(upsert_docs, ids=upsert_ids)
+
+        if not current:
+            raise ValueError(f"Không có dữ liệu trong {source}")
+
+        # ID cũ không còn trong corpus (kể cả index cũ tạo bằng from_texts)
+        to_delete = [i for i in existing_ids if i not in current]
+        if to_delete:
+            vectorstore.delete(ids=to_delete)
+    except Exception:
+        close_vectorstore(vectorstore)
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+    # Đóng client build trước khi rename thư mục: process này không giữ index nào ngoài index đang phục vụ
+    close_vectorstore(vectorstore)
+
+    # 3. Publish: rename thư mục build -> snapshot, flip CURRENT, dọn snapshot cũ
+    if added or updated or to_delete:
+        content_hash = hashlib.sha256(
+            "\n".join(f"{i}:{fp}" for i, fp in sorted(current.items())).encode("utf-8")
+        ).hexdigest()[:12]
+        # Timestamp theo ms: 2 lần build trong cùng 1 giây vẫn sort đúng thứ tự
+        version = f"{time.time_ns() // 1_000_000}-{content_hash}"
+        _save_manifest(build_path, {"version": version, "chunks": current})
+        os.rename(build_path, get_snapshot_path(version))
+        _flip_current(version)
+        gc_snapshots()
+    else:
+        shutil.rmtree(build_path, ignore_errors=True)
+        version = base_version
+
+    elapsed = time.perf_counter() - start
+    report = {
+        "added": added,
+        "updated": updated,
+        "deleted": len(to_delete),
+        "unchanged": len(current) - added - updated,
+        "total": len(current),
+        "version": version,
+        "elapsed": elapsed,
+        "chunks_per_sec": len(current) / elapsed if elapsed else 0.0,
+    }
+    print(f"Vector store đã được cập nhật tại {get_snapshot_path(version)} (version {version})")
+    return report
@@ -0,0 +1,14 @@
+# tests/conftest.py (Cho phép import các module của bot khi chạy pytest từ thư mục gốc)
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# DB và cache embedding tạm (trước khi config / utils.database được import): không chạm dữ liệu thật
+_TMP = tempfile.mkdtemp(prefix="bot-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_TMP}/bot.db")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(_TMP, "embedding_cache.sqlite3"))
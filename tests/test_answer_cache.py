@@ -0,0 +1,62 @@
+# tests/test_answer_cache.py
+
+import asyncio
+from types import SimpleNamespace
+
+from rag.answer_cache import SemanticAnswerCache
+
+VECTORS = {
+    "docker là gì?": [1.0, 0.0, 0.0],
+    "docker là gì": [0.99, 0.1, 0.0],
+    "python là gì?": [0.0, 1.0, 0.0],
+}
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return VECTORS[text]
+
+
+def engine(kb_version="v1"):
+    return SimpleNamespace(kb_version=kb_version, embeddings=FakeEmbeddings())
+
+
+def lookup(cache, query, kb_version="v1"):
+    return asyncio.run(cache.alookup(query, engine(kb_version)))
+
+
+def test_similar_question_hits():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=10, ttl=0)
+    miss = lookup(cache, "Docker  là gì?")
+    assert miss.answer is None
+    cache.store(miss, "Docker là nền tảng container.")
+    assert lookup(cache, "docker là gì").answer == "Docker là nền tảng container."
+    assert lookup(cache, "python là gì?").answer is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_new_kb_version_clears_cache():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=10, ttl=0)
+    cache.store(lookup(cache, "docker là gì?"), "cũ")
+    assert lookup(cache, "docker là gì?", "v2").answer is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_answer_from_old_kb_version_is_not_stored():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=10, ttl=0)
+    stale = lookup(cache, "docker là gì?", "v1")
+    lookup(cache, "python là gì?", "v2")
+    cache.store(stale, "cũ")
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_and_ttl():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=1, ttl=0)
+    cache.store(lookup(cache, "docker là gì?"), "docker")
+    cache.store(lookup(cache, "python là gì?"), "python")
+    assert lookup(cache, "docker là gì?").answer is None
+    assert lookup(cache, "python là gì?").answer == "python"
+
+    expiring = SemanticAnswerCache(threshold=0.95, max_entries=10, ttl=1e-9)
+    expiring.store(lookup(expiring, "docker là gì?"), "docker")
+    assert lookup(expiring, "docker là gì?").answer is None
@@ -0,0 +1,79 @@
+# tests/test_api_helper.py
+
+import asyncio
+
+import pytest
+
+from utils.api_helper import MAX_MESSAGE_LENGTH, STREAM_PLACEHOLDER, send_streaming_message
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.deleted = False
+
+    async def edit(self, content):
+        self.content = content
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeChannel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content):
+        message = FakeMessage(self, content)
+        self.messages.append(message)
+        return message
+
+    def visible(self):
+        return [m.content for m in self.messages if not m.deleted]
+
+
+async def stream(chunks, error=None):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        yield chunk
+    if error is not None:
+        raise error
+
+
+def test_streams_into_one_message():
+    channel = FakeChannel()
+    result = asyncio.run(send_streaming_message(channel, stream(["Xin ", "chào"]), edit_interval=0))
+    assert result == "Xin chào"
+    assert channel.visible() == ["Xin chào"]
+
+
+def test_rolls_over_long_answers():
+    channel = FakeChannel()
+    words = ["word "] * (MAX_MESSAGE_LENGTH // 5 + 50)
+    result = asyncio.run(send_streaming_message(channel, stream(words), edit_interval=0))
+    assert result == "".join(words)
+    assert len(channel.messages) == 2
+    assert channel.messages[0].content.endswith("*(tiếp theo)...")
+
+
+def test_empty_stream_says_unknown():
+    channel = FakeChannel()
+    assert asyncio.run(send_streaming_message(channel, stream([]))) == ""
+    assert channel.visible() == ["Tôi không biết."]
+
+
+@pytest.mark.parametrize("prefix", ["", "**Header**\n"])
+def test_error_before_first_token_removes_placeholder(prefix):
+    channel = FakeChannel()
+    with pytest.raises(RuntimeError):
+        asyncio.run(send_streaming_message(channel, stream([], RuntimeError("boom")), prefix=prefix))
+    assert channel.messages[0].content == (prefix or STREAM_PLACEHOLDER)
+    assert channel.visible() == []
+
+
+def test_error_mid_stream_keeps_partial_text():
+    channel = FakeChannel()
+    with pytest.raises(RuntimeError):
+        asyncio.run(send_streaming_message(channel, stream(["Một ", "phần"], RuntimeError("boom")), edit_interval=60))
+    assert channel.visible() == ["Một phần *(bị gián đoạn)*"]
@@ -0,0 +1,153 @@
+# tests/test_chat_history.py
+
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+from utils import database
+from utils.database import ChatHistory, ChatHistoryWriter
+
+
+def run(coro_fn):
+    """Chạy 1 coroutine với DB đã init, đóng pool sau đó (mỗi asyncio.run là 1 event loop mới)."""
+    async def main():
+        await database.init_db()
+        async with database.SessionLocal() as db:
+            await db.execute(delete(ChatHistory))
+            await db.commit()
+        try:
+            return await coro_fn()
+        finally:
+            await database.Engine.dispose()
+    return asyncio.run(main())
+
+
+async def _count() -> int:
+    async with database.SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(ChatHistory))
+
+
+async def _insert(rows):
+    async with database.SessionLocal() as db:
+        await db.execute(database.insert(ChatHistory), rows)
+        await db.commit()
+
+
+def test_init_db_reports_actual_backend(capsys):
+    run(lambda: asyncio.sleep(0))
+    out = capsys.readouterr().out
+    assert "SQLite tables initialized" in out and "PostgreSQL" not in out
+
+
+def test_writer_batches_and_flushes_on_stop():
+    async def main():
+        writer = ChatHistoryWriter(batch_size=10, flush_interval=5, max_queue=100)
+        writer.start()
+        for i in range(25):
+            writer.enqueue(1, f"q{i}", f"a{i}")
+        await writer.stop()  # Không chờ flush_interval: stop ghi nốt phần còn lại
+        return writer.stats(), await _count()
+
+    stats, count = run(main)
+    assert count == 25
+    assert stats["written"] == 25 and stats["batches"] == 3 and stats["dropped"] == 0
+
+
+def test_writer_drops_when_queue_full():
+    async def main():
+        writer = ChatHistoryWriter(batch_size=10, flush_interval=0.01, max_queue=2)
+        writer.start()
+        results = [writer.enqueue(1, "q", "a") for _ in range(3)]
+        await writer.stop()
+        return results, writer.stats()
+
+    results, stats = run(main)
+    assert results == [True, True, False]
+    assert stats["dropped"] == 1 and stats["written"] == 2
+
+
+def test_export_streams_filtered_rows(tmp_path):
+    path = str(tmp_path / "out.jsonl.gz")
+
+    async def main():
+        await _insert([
+            {"user_id": 1, "query": "a", "response": "x", "timestamp": datetime(2024, 1, 5)},
+            {"user_id": 2, "query": "b", "response": "y", "timestamp": datetime(2024, 1, 6)},
+            {"user_id": 1, "query": "c", "response": "z", "timestamp": datetime(2024, 3, 1)},
+        ])
+        return await database.export_chat_history(path, user_id=1, until=datetime(2024, 2, 1))
+
+    assert run(main) == 1
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [(r["query"], r["timestamp"]) for r in rows] == [("a", "2024-01-05T00:00:00")]
+
+
+def test_archive_moves_old_months_to_files(tmp_path):
+    async def main():
+        await _insert([
+            {"user_id": 1, "query": f"q{m}", "response": "a", "timestamp": datetime(2024, m, 10)}
+            for m in (1, 2, 3, 6)
+        ])
+        archived = await database.archive_chat_history(months=3, archive_dir=str(tmp_path),
+                                                       now=datetime(2024, 6, 15))
+        return archived, await _count()
+
+    archived, remaining = run(main)
+    assert [os.path.basename(path) for path, _ in archived] == [
+        "chat_history_2024_01.jsonl.gz", "chat_history_2024_02.jsonl.gz"
+    ]
+    assert [count for _, count in archived] == [1, 1]
+    assert remaining == 2  # Tháng 3 và 6 còn trong hạn giữ lại
+    assert not [name for name in os.listdir(tmp_path) if ".tmp." in name]
+
+
+class FakePgConn:
+    """Ghi lại SQL của _ensure_chat_partitions; partition/default và dòng trong default là giả lập."""
+
+    def __init__(self, existing=(), default_months=()):
+        self.existing = set(existing)
+        self.default_months = set(default_months)
+        self.statements = []
+
+    async def scalar(self, stmt):
+        sql = str(stmt)
+        if "to_regclass" in sql:
+            name = sql.split("'")[1]
+            return name == "chat_history_default" or name in self.existing
+        if "FROM chat_history_default" in sql:
+            return sql.split("'")[1][:7] in self.default_months
+        raise AssertionError(sql)
+
+    async def execute(self, stmt):
+        self.statements.append(str(stmt))
+
+        class Result:
+            rowcount = 3
+        return Result()
+
+
+def test_partitions_created_ahead_and_existing_skipped():
+    conn = FakePgConn(existing={"chat_history_p2024_05"})
+    asyncio.run(database._ensure_chat_partitions(conn, datetime(2024, 5, 20), months_ahead=2,
+                                                 until=datetime(2024, 5, 20)))
+    created = [s.split()[2] for s in conn.statements]
+    assert created == ["chat_history_p2024_06", "chat_history_p2024_07"]
+    assert not any("DETACH" in s for s in conn.statements)
+
+
+def test_partition_for_month_already_in_default_moves_rows(capsys):
+    conn = FakePgConn(default_months={"2024-06"})
+    asyncio.run(database._ensure_chat_partitions(conn, datetime(2024, 6, 1), months_ahead=1,
+                                                 until=datetime(2024, 6, 1)))
+    june, july = conn.statements[:4], conn.statements[4:]
+    assert "DETACH PARTITION chat_history_default" in june[0]
+    assert june[1].startswith("CREATE TABLE chat_history_p2024_06 PARTITION OF")
+    assert "DELETE FROM chat_history_default" in june[2] and "INSERT INTO chat_history_p2024_06" in june[2]
+    assert "ATTACH PARTITION chat_history_default DEFAULT" in june[3]
+    assert len(july) == 1 and july[0].startswith("CREATE TABLE chat_history_p2024_07")
+    assert "3 dòng" in capsys.readouterr().out
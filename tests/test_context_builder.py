@@ -0,0 +1,63 @@
+# tests/test_context_builder.py
+
+from langchain_core.documents import Document
+
+from rag.context_builder import ContextBuilder, count_tokens
+
+SHARED = "Docker đóng gói ứng dụng cùng thư viện vào một image chạy được ở mọi nơi."
+
+
+def docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens("abcd efgh") == 2
+    assert count_tokens("abcde!") == 3
+
+
+def test_empty_input():
+    assert ContextBuilder(budget=100).build(docs("", "   ")) == ""
+
+
+def test_splitter_overlap_is_removed():
+    first = "Kubernetes điều phối container trên nhiều máy. " + SHARED
+    second = SHARED + " Image được lưu trong registry như Docker Hub."
+    context = ContextBuilder(budget=1000, mmr_lambda=1.0).build(docs(first, second))
+    assert context.count(SHARED) == 1
+    assert context == first + "\n\n" + "Image được lưu trong registry như Docker Hub."
+
+
+def test_duplicate_chunks_are_dropped():
+    context = ContextBuilder(budget=1000).build(docs(SHARED, SHARED))
+    assert context == SHARED
+
+
+def test_budget_skips_chunks_that_do_not_fit():
+    long_text = " ".join(["Chunk dài vượt ngân sách token."] * 40)
+    short = "Python là ngôn ngữ lập trình."
+    builder = ContextBuilder(budget=count_tokens(short) + 5, mmr_lambda=1.0)
+    assert builder.build(docs(long_text, short)) == short
+    stats = builder.stats()
+    assert stats["requests"] == 1
+    assert stats["tokens_out"] == count_tokens(short)
+    assert stats["tokens_saved"] == count_tokens(long_text)
+
+
+def test_mmr_prefers_diverse_chunks():
+    similar = "Docker đóng gói ứng dụng và thư viện thành một image chạy được ở mọi nơi."
+    different = "PostgreSQL là hệ quản trị cơ sở dữ liệu quan hệ."
+    builder = ContextBuilder(budget=1000, mmr_lambda=0.3)
+    assert builder.build(docs(SHARED, similar, different)).split("\n\n") == [SHARED, different, similar]
+
+
+def test_reserved_tokens_shrink_the_budget():
+    first = "Python là ngôn ngữ lập trình."
+    second = "PostgreSQL là hệ quản trị cơ sở dữ liệu quan hệ."
+    budget = count_tokens(first) + count_tokens(second)
+    builder = ContextBuilder(budget=budget, mmr_lambda=1.0)
+    assert builder.build(docs(first, second)) == first + "\n\n" + second
+    # Khối CV chiếm chỗ của chunk thứ 2 -> prompt không vượt ngân sách
+    assert builder.build(docs(first, second), reserved=count_tokens(second)) == first
+    assert builder.build(docs(first, second), reserved=budget * 2) == ""
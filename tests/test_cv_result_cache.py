@@ -0,0 +1,90 @@
+# tests/test_cv_result_cache.py
+
+import asyncio
+import sys
+
+import pytest
+from sqlalchemy import delete
+
+if sys.version_info < (3, 12):
+    # rag.analysis_logic dùng cú pháp f-string của Python 3.12
+    pytest.skip("rag.analysis_logic cần Python >= 3.12", allow_module_level=True)
+
+from rag import cv_result_cache
+from rag.cv_result_cache import CVResultCache
+from utils import database
+from utils.database import CVResultCache as CVResultRow
+
+CV = {"personal_info": {"name": "A"}, "skills": ["Python"]}
+
+
+def run(coro_fn):
+    """Chạy coroutine với bảng cv_result_cache rỗng, đóng pool sau đó."""
+    async def main():
+        await database.init_db()
+        async with database.SessionLocal() as db:
+            await db.execute(delete(CVResultRow))
+            await db.commit()
+        try:
+            return await coro_fn()
+        finally:
+            await database.Engine.dispose()
+    return asyncio.run(main())
+
+
+def test_parsed_cv_round_trip():
+    cache = CVResultCache()
+    digest = cache.digest(b"%PDF-1.7 cv")
+
+    async def scenario():
+        before = await cache.get_parsed(digest)
+        await cache.save_parsed(digest, CV)
+        return before, await cache.get_parsed(digest), await cache.get_parsed(cache.digest(b"other"))
+
+    assert run(scenario) == (None, CV, None)
+    assert cache.stats()["parse_hits"] == 1 and cache.stats()["parse_misses"] == 2
+
+
+def test_analysis_is_keyed_by_knowledge_base_version():
+    cache = CVResultCache()
+    digest = cache.digest(b"cv")
+
+    async def scenario():
+        await cache.save_analysis(digest, "kb-1", "Học thêm Docker")
+        return await cache.get_analysis(digest, "kb-1"), await cache.get_analysis(digest, "kb-2")
+
+    assert run(scenario) == ("Học thêm Docker", None)
+
+
+def test_old_versions_are_purged_once(monkeypatch):
+    digest = CVResultCache.digest(b"cv")
+
+    async def scenario():
+        monkeypatch.setattr(cv_result_cache, "PARSER_VERSION", "old")
+        await CVResultCache().save_parsed(digest, CV)
+        monkeypatch.setattr(cv_result_cache, "PARSER_VERSION", "new")
+        cache = CVResultCache()
+        return await cache.get_parsed(digest), cache._purged
+
+    parsed, purged = run(scenario)
+    assert parsed is None
+    assert purged == {"parse": "new"}
+
+
+def test_failed_purge_is_retried(monkeypatch):
+    calls = []
+
+    async def purge(kind, version):
+        calls.append(version)
+        return None if len(calls) == 1 else 0
+
+    monkeypatch.setattr(cv_result_cache, "purge_cv_results", purge)
+    cache = CVResultCache()
+
+    async def scenario():
+        await cache.get_parsed("d")
+        await cache.get_parsed("d")
+        await cache.get_parsed("d")
+
+    run(scenario)
+    assert len(calls) == 2
@@ -0,0 +1,119 @@
+# tests/test_cv_session_cache.py
+
+import asyncio
+import sys
+
+import pytest
+
+if sys.version_info < (3, 12):
+    # rag.analysis_logic dùng cú pháp f-string của Python 3.12
+    pytest.skip("rag.analysis_logic cần Python >= 3.12", allow_module_level=True)
+
+from rag import cv_session_cache
+from rag.cv_session_cache import CVSessionCache
+
+CV = {"personal_info": {"title": "Backend Developer"}, "experience": [{"role": "Dev"}], "skills": ["Python", "Go"]}
+
+
+class FakeDB:
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+        self.fail_reads = False
+        self.fail_writes = False
+
+    async def get_cv_data(self, user_id):
+        self.reads += 1
+        if self.fail_reads:
+            raise ConnectionError("db down")
+        return self.rows.get(user_id)
+
+    async def save_cv_data(self, user_id, cv_data, job_title):
+        if self.fail_writes:
+            return False
+        self.rows[user_id] = cv_data
+        return True
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(cv_session_cache, "get_cv_data", db.get_cv_data)
+    monkeypatch.setattr(cv_session_cache, "save_cv_data", db.save_cv_data)
+    return db
+
+
+def test_save_builds_context_and_serves_hits(db):
+    cache = CVSessionCache(max_entries=10, ttl=60)
+
+    async def run():
+        state = await cache.save(1, CV, "Backend Developer")
+        return state, await cache.get(1)
+
+    state, cached = asyncio.run(run())
+    assert cached is state
+    assert "Backend Developer" in state.context and "Python, Go" in state.context
+    assert state.tokens > 0
+    assert db.reads == 0
+    assert cache.stats()["hits"] == 1
+
+
+def test_user_without_cv_is_cached(db):
+    cache = CVSessionCache(max_entries=10, ttl=60)
+
+    async def run():
+        return await cache.get(1), await cache.get(1)
+
+    assert asyncio.run(run()) == (None, None)
+    assert db.reads == 1
+
+
+def test_read_error_is_not_cached(db):
+    cache = CVSessionCache(max_entries=10, ttl=60)
+    db.rows[1] = CV
+    db.fail_reads = True
+
+    async def run():
+        first = await cache.get(1)
+        db.fail_reads = False
+        return first, await cache.get(1)
+
+    first, second = asyncio.run(run())
+    assert first is None
+    assert second is not None and second.cv_data == CV
+    assert db.reads == 2
+
+
+def test_failed_save_does_not_update_cache(db):
+    cache = CVSessionCache(max_entries=10, ttl=60)
+    old = {**CV, "skills": ["Java"]}
+    db.rows[1] = old
+
+    async def run():
+        await cache.get(1)
+        db.fail_writes = True
+        saved = await cache.save(1, CV, "Backend Developer")
+        return saved, await cache.get(1)
+
+    saved, current = asyncio.run(run())
+    assert saved is None
+    assert current.cv_data == old  # Đọc lại DB, không dùng CV chưa lưu được
+    assert db.reads == 2
+
+
+def test_lru_and_ttl_eviction(db):
+    cache = CVSessionCache(max_entries=2, ttl=60)
+
+    async def run():
+        for user_id in (1, 2, 3):
+            await cache.save(user_id, CV, "Dev")
+        await cache.get(1)
+        expired = CVSessionCache(max_entries=2, ttl=0)
+        await expired.save(4, CV, "Dev")
+        await expired.get(4)
+        return expired
+
+    expired = asyncio.run(run())
+    assert list(cache._entries) == [3, 1]
+    assert db.reads == 2  # User 1 bị đẩy ra khỏi LRU, user 4 hết hạn ngay
+    assert expired.stats()["misses"] == 1
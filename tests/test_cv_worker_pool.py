@@ -0,0 +1,157 @@
+# tests/test_cv_worker_pool.py
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import types
+
+import fitz
+import pytest
+
+from rag import cv_worker
+from rag import cv_worker_pool
+from rag.cv_worker_pool import CVWorkerPool, CVParseTimeout, STAGES
+
+
+def make_cv_pdf(pages: int = 1) -> bytes:
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        y = 60
+        for text, size in [("Nguyen Van A", 20), ("Sales Executive", 12), ("Email: a@example.com", 10),
+                           ("KINH NGHIEM LAM VIEC", 13), ("Cong ty ABC", 10), ("Sales (2020 - 2022)", 10),
+                           ("KY NANG", 13), ("Excel", 10)]:
+            page.insert_text((50, y), text, fontsize=size)
+            y += size * 1.6
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def pool():
+    pool = CVWorkerPool(size=1, max_jobs=2, max_memory_mb=1024, timeout=30)
+    yield pool
+    pool.close()
+
+
+def test_parse_returns_result_and_stage_timings(pool):
+    async def main():
+        return await pool.parse(make_cv_pdf())
+
+    result, timings = asyncio.run(main())
+    assert "error" not in result
+    assert result["personal_info"]["email"] == "a@example.com"
+    assert set(STAGES) <= set(timings)
+
+
+def test_worker_script_imports_only_the_parser():
+    # Như khi chạy "python rag/cv_worker.py": thư mục rag/ là sys.path[0], không đi qua package rag
+    code = (
+        "import sys; sys.path[0] = sys.argv[1]; import cv_worker; import cv_parser; "
+        "print('loaded:' + ','.join(m for m in ('rag', 'config', 'discord', 'langchain_core', 'chromadb') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code, os.path.dirname(cv_worker.__file__)],
+                         capture_output=True, text=True, check=True)
+    # fitz có thể in cảnh báo deprecate ra stdout trước dòng kết quả
+    assert [line for line in out.stdout.splitlines() if line.startswith("loaded:")] == ["loaded:"]
+
+
+def test_worker_reports_errors(pool):
+    result, _ = asyncio.run(pool.parse(b"not a pdf"))
+    assert "Không đọc được file PDF" in result["error"]
+
+
+def test_page_limit_is_enforced_in_worker(pool):
+    pool.limits = dict(pool.limits, max_pages=2)
+    result, _ = asyncio.run(pool.parse(make_cv_pdf(pages=5)))
+    assert "5 trang" in result["error"]
+
+
+def test_queued_requests_are_notified_and_served_in_order(pool):
+    positions = []
+
+    async def on_queued(position):
+        positions.append(position)
+
+    async def main():
+        pdf = make_cv_pdf()
+        return await asyncio.gather(*(pool.parse(pdf, on_queued=on_queued) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert all("error" not in result for result, _ in results)
+    assert positions == [1, 2]
+    assert pool.stats()["jobs"] == 3
+    assert pool.recycled == 1  # max_jobs=2
+
+
+def test_timeout_kills_and_replaces_worker(pool):
+    async def main():
+        pool.timeout = 0.001
+        with pytest.raises(CVParseTimeout):
+            await pool.parse(make_cv_pdf())
+        pool.timeout = 30
+        result, _ = await pool.parse(make_cv_pdf())  # Chờ worker mới được tạo trong nền
+        await pool.aclose()
+        return result
+
+    result = asyncio.run(main())
+    assert "error" not in result
+    assert pool.timeouts == 1 and pool.recycled == 1
+
+
+def test_recycling_does_not_block_the_event_loop(pool, monkeypatch):
+    stop = cv_worker_pool._Worker.stop
+
+    def slow_stop(worker):
+        time.sleep(0.5)  # Process cũ thoát chậm
+        stop(worker)
+
+    monkeypatch.setattr(cv_worker_pool._Worker, "stop", slow_stop)
+    pool.max_jobs = 1
+
+    async def main():
+        pool.start()
+        started = time.perf_counter()
+        await pool.parse(make_cv_pdf())  # Job đầu vẫn trả về ngay, worker cũ dừng trong nền
+        elapsed = time.perf_counter() - started
+        await pool.aclose()
+        return elapsed
+
+    assert asyncio.run(main()) < 0.45
+    assert pool.recycled == 1
+
+
+class FakeConn:
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.sent = []
+
+    def recv(self):
+        if not self.jobs:
+            raise EOFError
+        return self.jobs.pop(0)
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+
+def test_worker_exits_after_memory_error(monkeypatch):
+    def process_cv_data(pdf_content, timings, limits):
+        if pdf_content == b"big":
+            raise MemoryError
+        return {"ok": True}
+
+    monkeypatch.setitem(sys.modules, "cv_parser", types.SimpleNamespace(process_cv_data=process_cv_data))
+    conn = FakeConn([(b"small", {}), (b"big", {}), (b"never", {})])
+    cv_worker.serve(conn)
+
+    assert [message[0] for message in conn.sent][0] == {"ok": True}
+    assert "bộ nhớ" in conn.sent[1][0]["error"]
+    assert [message[3] for message in conn.sent] == [False, True]
+    assert conn.jobs == [(b"never", {})]  # Không nhận job mới sau MemoryError
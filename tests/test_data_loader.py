@@ -0,0 +1,47 @@
+# tests/test_data_loader.py
+
+import logging
+
+import fitz
+import pytest
+
+from rag.data_loader import batched, discover_sources, iter_chunks, iter_documents
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha", encoding="utf-8")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.md").write_text("beta", encoding="utf-8")
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4 not really a pdf")
+    (tmp_path / "broken.docx").write_bytes(b"not a zip")
+    (tmp_path / "ignored.csv").write_text("x", encoding="utf-8")
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 60), "gamma page")
+    doc.new_page()  # Trang trống bị bỏ qua
+    doc.save(str(tmp_path / "c.pdf"))
+    doc.close()
+    return tmp_path
+
+
+def test_discover_sources_is_sorted_and_filtered(corpus):
+    names = [p.replace(str(corpus), "") for p in discover_sources(str(corpus))]
+    assert names == ["/a.txt", "/broken.docx", "/broken.pdf", "/c.pdf", "/sub/b.md"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_unreadable_files_are_skipped(corpus, workers, caplog):
+    caplog.set_level(logging.WARNING, logger="discord_bot")
+    docs = list(iter_documents(discover_sources(str(corpus)), workers=workers))
+    assert sorted(d.page_content.strip() for d in docs) == ["alpha", "beta", "gamma page"]
+    skipped = [r.getMessage() for r in caplog.records if "Bỏ qua file" in r.getMessage()]
+    assert len(skipped) == 2
+    assert any("broken.pdf" in m for m in skipped) and any("broken.docx" in m for m in skipped)
+
+
+def test_chunks_and_batches():
+    from langchain_core.documents import Document
+    text = "\n\n".join(f"paragraph {i} " + "x" * 400 for i in range(5))
+    chunks = list(iter_chunks([Document(page_content=text, metadata={"source": "s"})], chunk_size=1000))
+    assert len(chunks) > 1 and all(c.metadata["source"] == "s" for c in chunks)
+    assert [len(b) for b in batched(range(5), 2)] == [2, 2, 1]
@@ -0,0 +1,135 @@
+# tests/test_embeddings.py
+
+import asyncio
+import threading
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from rag.embeddings import CachedEmbeddings, QueryBatcher
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def _vector(self, text):
+        return [float(len(text)), 0.5, -1.0]
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("model down")
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(0)
+        return self.embed_query(text)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    base = CountingEmbeddings()
+    cached = CachedEmbeddings(base, "fake", str(tmp_path / "cache.sqlite3"))
+    yield cached
+    cached.close()
+
+
+def test_cache_hits_skip_the_model(cache):
+    first = cache.embed_documents(["a", "bb", "a"])
+    assert cache.base.calls == [["a", "bb"]]
+    assert cache.embed_documents(["bb", "a"]) == [first[1], first[0]]
+    assert cache.embed_query("a") == first[0]
+    assert len(cache.base.calls) == 1
+    assert cache.stats() == {"model": "fake", "hits": 4, "misses": 2}
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = CachedEmbeddings(CountingEmbeddings(), "fake", path)
+    vector = first.embed_query("hello")
+    first.close()
+    second = CachedEmbeddings(CountingEmbeddings(), "fake", path)
+    assert second.embed_query("hello") == vector
+    assert second.base.calls == []
+    other_model = CachedEmbeddings(CountingEmbeddings(), "other", path)
+    other_model.embed_query("hello")
+    assert other_model.base.calls == [["hello"]]
+    second.close()
+    other_model.close()
+
+
+def test_async_cache_io_runs_off_the_event_loop(cache):
+    threads = []
+    get_many, put_many = cache._get_many, cache._put_many
+    cache._get_many = lambda hashes: threads.append(threading.get_ident()) or get_many(hashes)
+    cache._put_many = lambda items: threads.append(threading.get_ident()) or put_many(items)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        miss = await cache.aembed_query("q")
+        hit = await cache.aembed_query("q")
+        docs = await cache.aembed_documents(["q", "new"])
+        return loop_thread, miss, hit, docs
+
+    loop_thread, miss, hit, docs = asyncio.run(run())
+    assert miss == hit == docs[0]
+    assert threads and loop_thread not in threads
+    assert cache.base.calls == [["q"], ["new"]]
+
+
+def test_close_closes_every_thread_connection(cache):
+    async def run():
+        await asyncio.gather(*(cache.aembed_query(str(i)) for i in range(4)))
+
+    asyncio.run(run())
+    assert len(cache._conns) >= 2
+    conns = list(cache._conns)
+    cache.close()
+    assert cache._conns == []
+    for conn in conns:
+        with pytest.raises(Exception):
+            conn.execute("SELECT 1")
+
+
+def test_batcher_coalesces_concurrent_queries():
+    base = CountingEmbeddings()
+    batcher = QueryBatcher(base, max_batch=8, max_wait=0.01)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed_query(t) for t in ["a", "bb", "a", "ccc"]))
+
+    results = asyncio.run(run())
+    assert results == [base._vector(t) for t in ["a", "bb", "a", "ccc"]]
+    assert base.calls == [["a", "bb", "ccc"]]
+    assert batcher.stats() == {"batches": 1, "batched_queries": 4, "largest_batch": 4}
+
+
+def test_batcher_flushes_when_full():
+    base = CountingEmbeddings()
+    batcher = QueryBatcher(base, max_batch=2, max_wait=10)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.aembed_query(t) for t in "abcd")), 1)
+
+    asyncio.run(run())
+    assert base.calls == [["a", "b"], ["c", "d"]]
+
+
+def test_batcher_propagates_errors_to_every_waiter():
+    batcher = QueryBatcher(CountingEmbeddings(fail=True), max_batch=8, max_wait=0.01)
+
+    async def run():
+        return await asyncio.gather(batcher.aembed_query("a"), batcher.aembed_query("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,26 @@
+# tests/test_http_clients.py
+
+import asyncio
+
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+
+from utils import http_clients
+
+
+def test_langchain_clients_share_the_bot_transport():
+    kwargs = http_clients.ollama_client_kwargs()
+    llm = ChatOllama(model="m", base_url="http://localhost:11434", **kwargs)
+    embeddings = OllamaEmbeddings(model="e", base_url="http://localhost:11434", **kwargs)
+    sync_transport = http_clients._get_sync_transport()
+    async_transport = http_clients._get_async_transport()
+
+    for model in (llm, embeddings):
+        assert model._client._client._transport is sync_transport
+        assert model._async_client._client._transport is async_transport
+    assert http_clients.get_ollama_sync_client()._client._transport is sync_transport
+    assert http_clients.get_ollama_client()._client._transport is async_transport
+
+    asyncio.run(http_clients.close_http_clients())
+    assert http_clients._sync_transport is None and http_clients._async_transport is None
+    assert http_clients._get_sync_transport() is not sync_transport  # Tạo lại pool mới sau khi đóng
+    asyncio.run(http_clients.close_http_clients())
@@ -0,0 +1,107 @@
+# tests/test_llm_scheduler.py
+
+import asyncio
+
+import pytest
+
+from utils.llm_scheduler import PRIORITY_CHAT, PRIORITY_CV, LLMScheduler, QueueFullError
+
+
+async def hold(scheduler, order, name, user, guild=None, priority=PRIORITY_CHAT, positions=None, release=None):
+    async def on_queued(position):
+        if positions is not None:
+            positions[name] = position
+
+    async with scheduler.slot(user, guild, priority, on_queued=on_queued):
+        order.append(name)
+        if release is not None:
+            await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_free_slot_runs_without_queueing():
+    async def run():
+        scheduler, order, positions = LLMScheduler(2, 3, 0), [], {}
+        await hold(scheduler, order, "a", 1, positions=positions)
+        return order, positions, scheduler.stats()
+
+    order, positions, stats = asyncio.run(run())
+    assert order == ["a"] and positions == {}
+    assert stats["served"] == 1 and stats["running"] == 0 and stats["queued"] == 0
+
+
+def test_queue_is_fair_across_users():
+    async def run():
+        scheduler, order, positions, release = LLMScheduler(1, 5, 0), [], {}, asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(scheduler, order, "busy", 9, release=release))]
+        await settle()
+        for name, user in [("a1", 1), ("a2", 1), ("a3", 1), ("b1", 2)]:
+            tasks.append(asyncio.ensure_future(hold(scheduler, order, name, user, positions=positions)))
+            await settle()
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, positions
+
+    order, positions = asyncio.run(run())
+    # User 2 không phải chờ hết 3 request của user 1
+    assert order == ["busy", "a1", "b1", "a2", "a3"]
+    assert sorted(positions) == ["a1", "a2", "a3", "b1"]  # Ai phải chờ đều được báo vị trí
+
+
+def test_chat_runs_before_cv():
+    async def run():
+        scheduler, order, release = LLMScheduler(1, 5, 0), [], asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(scheduler, order, "busy", 9, release=release))]
+        await settle()
+        tasks.append(asyncio.ensure_future(hold(scheduler, order, "cv", 1, priority=PRIORITY_CV)))
+        await settle()
+        tasks.append(asyncio.ensure_future(hold(scheduler, order, "chat", 2, priority=PRIORITY_CHAT)))
+        await settle()
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["busy", "chat", "cv"]
+
+
+def test_too_many_queued_requests_are_rejected():
+    async def run():
+        scheduler, order, release = LLMScheduler(1, 1, 0), [], asyncio.Event()
+        busy = asyncio.ensure_future(hold(scheduler, order, "busy", 1, release=release))
+        await settle()
+        queued = asyncio.ensure_future(hold(scheduler, order, "queued", 1))
+        await settle()
+        with pytest.raises(QueueFullError):
+            await hold(scheduler, order, "rejected", 1)
+        release.set()
+        await asyncio.gather(busy, queued)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["busy", "queued"]
+    assert stats["rejected"] == 1 and stats["peak_queued"] == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        scheduler, order, release = LLMScheduler(1, 5, 0), [], asyncio.Event()
+        busy = asyncio.ensure_future(hold(scheduler, order, "busy", 1, release=release))
+        await settle()
+        cancelled = asyncio.ensure_future(hold(scheduler, order, "cancelled", 2))
+        later = asyncio.ensure_future(hold(scheduler, order, "later", 3))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        queued = scheduler.queue_depth
+        release.set()
+        await asyncio.gather(busy, later)
+        return order, queued, scheduler.stats()
+
+    order, queued, stats = asyncio.run(run())
+    assert queued == 1
+    assert order == ["busy", "later"]
+    assert stats["running"] == 0 and stats["queued"] == 0
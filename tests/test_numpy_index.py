@@ -0,0 +1,58 @@
+# tests/test_numpy_index.py
+
+import os
+
+import numpy as np
+
+from rag.numpy_index import NumpyVectorIndex, VECTORS_FILE, DOCS_FILE
+
+
+class FakeVectorStore:
+    """Giả lập vectorstore.get() của Chroma."""
+
+    def __init__(self, texts, embeddings):
+        self.texts = texts
+        self.embeddings = embeddings
+
+    def get(self, include=None):
+        return {
+            "documents": self.texts,
+            "metadatas": [{"source": t} for t in self.texts],
+            "embeddings": self.embeddings,
+        }
+
+
+def test_empty_collection_gives_empty_index(tmp_path):
+    for embeddings in (None, [], np.empty((0,), dtype=np.float32)):
+        index = NumpyVectorIndex.from_vectorstore(FakeVectorStore([], embeddings), str(tmp_path))
+        assert len(index) == 0
+        assert index.search([1.0, 0.0], k=3) == []
+    # Chưa biết số chiều -> không ghi .npy vào snapshot
+    assert not os.path.exists(tmp_path / VECTORS_FILE)
+    assert not os.path.exists(tmp_path / DOCS_FILE)
+
+
+def test_search_returns_nearest_first():
+    store = FakeVectorStore(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]])
+    index = NumpyVectorIndex.from_vectorstore(store)
+    assert [d.page_content for d in index.search([1, 0.1], k=2)] == ["a", "c"]
+    assert [d.page_content for d in index.search([0, 1], k=10)] == ["b", "c", "a"]
+
+
+def test_zero_vector_does_not_produce_nan():
+    index = NumpyVectorIndex.from_vectorstore(FakeVectorStore(["zero", "x"], [[0, 0], [1, 0]]))
+    assert not np.isnan(index.vectors).any()
+    assert index.search([1, 0], k=1)[0].page_content == "x"
+
+
+def test_snapshot_files_are_reused(tmp_path):
+    store = FakeVectorStore(["a", "b"], [[3, 4], [0, 2]])
+    NumpyVectorIndex.from_vectorstore(store, str(tmp_path))
+    assert os.path.exists(tmp_path / VECTORS_FILE)
+
+    # Lần 2 đọc từ .npy (mmap), không gọi lại collection
+    store.texts, store.embeddings = None, None
+    index = NumpyVectorIndex.from_vectorstore(store, str(tmp_path))
+    assert isinstance(index.vectors, np.memmap)
+    np.testing.assert_allclose(index.vectors[0], [0.6, 0.8], rtol=1e-6)
+    assert index.documents[1].metadata == {"source": "b"}
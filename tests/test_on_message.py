@@ -0,0 +1,57 @@
+# tests/test_on_message.py
+
+import asyncio
+from types import SimpleNamespace
+
+import config
+from events import on_message as handler
+from rag.answer_cache import SemanticAnswerCache
+
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class FakeBot:
+    def __init__(self):
+        self.user = SimpleNamespace(id=1, mentioned_in=lambda message: True)
+
+    async def process_commands(self, message):
+        pass
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_mention_caches_full_answer_but_sends_truncated(monkeypatch):
+    answer = "x" * 2500
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=10, ttl=0)
+    saved = []
+
+    async def get_rag_response(query, slot=None):
+        return answer
+
+    async def save_chat(user_id, query, response):
+        saved.append(response)
+
+    monkeypatch.setattr(config, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "STREAM_RESPONSES", False)
+    monkeypatch.setattr(handler, "get_answer_cache", lambda: cache)
+    engine = SimpleNamespace(kb_version="v1", embeddings=FakeEmbeddings())
+    monkeypatch.setattr(handler, "get_rag_engine", lambda: engine)
+    monkeypatch.setattr(handler, "get_rag_response", get_rag_response)
+    monkeypatch.setattr(handler, "save_chat", save_chat)
+
+    channel = FakeChannel()
+    message = SimpleNamespace(author=SimpleNamespace(id=42), content="<@1> Docker là gì?", channel=channel, guild=None)
+    asyncio.run(handler.on_message(message, FakeBot()))
+
+    assert channel.sent == ["x" * 1900 + "..."]
+    assert saved == [answer]
+    assert asyncio.run(cache.alookup("Docker là gì?", engine)).answer == answer
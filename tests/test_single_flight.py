@@ -0,0 +1,149 @@
+# tests/test_single_flight.py
+
+import asyncio
+
+import pytest
+
+from rag.single_flight import SingleFlight, flight_key
+from utils.llm_scheduler import QueueFullError
+
+
+def make_factory(calls, chunks=("a", "b", "c"), error=None, gate=None):
+    async def factory():
+        calls.append(1)
+        if gate is not None:
+            await gate.wait()
+        if error is not None:
+            raise error
+        for chunk in chunks:
+            await asyncio.sleep(0)
+            yield chunk
+    return factory
+
+
+async def collect(flight, key, factory):
+    return "".join([chunk async for chunk in flight.astream(key, factory)])
+
+
+def test_flight_key_normalizes_query_but_not_context():
+    assert flight_key("Hello   World", "ctx", "m") == flight_key("hello world", "ctx", "m")
+    assert flight_key("hello", "ctx", "m") != flight_key("hello", "ctx2", "m")
+    assert flight_key("hello", "ctx", "m") != flight_key("hello", "ctx", "m2")
+
+
+def test_concurrent_requests_share_one_generation():
+    async def run():
+        flight, calls, gate = SingleFlight(), [], asyncio.Event()
+        factory = make_factory(calls, gate=gate)
+        tasks = [asyncio.ensure_future(collect(flight, "k", factory)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*tasks), calls, flight.stats()
+
+    results, calls, stats = asyncio.run(run())
+    assert results == ["abc"] * 3
+    assert len(calls) == 1
+    assert stats == {"leaders": 1, "followers": 2, "retries": 0, "in_flight": 0}
+
+
+def test_late_follower_replays_chunks_already_produced():
+    async def run():
+        flight, calls, gate = SingleFlight(), [], asyncio.Event()
+
+        async def factory():
+            calls.append(1)
+            yield "a"
+            await gate.wait()
+            yield "b"
+
+        leader = asyncio.ensure_future(collect(flight, "k", factory))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        follower = asyncio.ensure_future(collect(flight, "k", factory))
+        await asyncio.sleep(0)
+        gate.set()
+        return await leader, await follower, calls
+
+    assert asyncio.run(run()) == ("ab", "ab", [1])
+
+
+def test_generation_error_reaches_every_request():
+    async def run():
+        flight, calls, gate = SingleFlight(), [], asyncio.Event()
+        factory = make_factory(calls, error=ValueError("ollama down"), gate=gate)
+        tasks = [asyncio.ensure_future(collect(flight, "k", factory)) for _ in range(2)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*tasks, return_exceptions=True), calls
+
+    results, calls = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("error", [QueueFullError("full"), asyncio.TimeoutError()])
+def test_leader_admission_error_is_not_inherited(error):
+    async def run():
+        flight, gate = SingleFlight(), asyncio.Event()
+        leader_calls, follower_calls = [], []
+        leader = asyncio.ensure_future(collect(flight, "k", make_factory(leader_calls, error=error, gate=gate)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(collect(flight, "k", make_factory(follower_calls)))
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return results, follower_calls, flight.stats()
+
+    (leader_result, follower_result), follower_calls, stats = asyncio.run(run())
+    assert leader_result is error
+    assert follower_result == "abc"
+    assert len(follower_calls) == 1
+    assert stats["retries"] == 1 and stats["leaders"] == 2
+
+
+def test_cancelled_leader_keeps_generation_for_followers():
+    async def run():
+        flight, calls, gate = SingleFlight(), [], asyncio.Event()
+        factory = make_factory(calls, gate=gate)
+        leader = asyncio.ensure_future(collect(flight, "k", factory))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(collect(flight, "k", factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        return await follower, leader.cancelled(), calls
+
+    assert asyncio.run(run()) == ("abc", True, [1])
+
+
+def test_cancelled_generation_is_retried_by_follower():
+    async def run():
+        flight, gate = SingleFlight(), asyncio.Event()
+        leader_calls, follower_calls = [], []
+        leader = asyncio.ensure_future(collect(flight, "k", make_factory(leader_calls, gate=gate)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(collect(flight, "k", make_factory(follower_calls)))
+        await asyncio.sleep(0)
+        flight._flights["k"].task.cancel()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return results, follower_calls
+
+    (leader_result, follower_result), follower_calls = asyncio.run(run())
+    assert isinstance(leader_result, RuntimeError)
+    assert follower_result == "abc"
+    assert follower_calls == [1]
+
+
+def test_last_listener_cancelling_stops_generation():
+    async def run():
+        flight, calls, gate = SingleFlight(), [], asyncio.Event()
+        leader = asyncio.ensure_future(collect(flight, "k", make_factory(calls, gate=gate)))
+        await asyncio.sleep(0)
+        task = flight._flights["k"].task
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        await asyncio.sleep(0)
+        return task.cancelled(), flight.in_flight
+
+    assert asyncio.run(run()) == (True, 0)
@@ -0,0 +1,75 @@
+# tests/test_skill_matcher.py
+
+import pytest
+
+from rag.skill_matcher import SkillMatcher, load_taxonomy
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return SkillMatcher.from_file("resources/skill_standards.txt")
+
+
+def names(matcher, text):
+    return [name for _, _, name in matcher.find(text)]
+
+
+def test_load_taxonomy_strips_ambiguous_mark():
+    aliases, groups, ambiguous = load_taxonomy("resources/skill_standards.txt")
+    assert "Go" in groups and "~Go" not in groups
+    assert aliases["node"] == "Node.js"
+    assert {"Go", "R", "node", "express", "ts"} <= ambiguous
+    assert "nodejs" not in ambiguous
+
+
+@pytest.mark.parametrize("text", [
+    "Phòng R&D của công ty",
+    "Xây dựng chiến lược Go to market",
+    "Người hướng dẫn: TS. Nguyễn Văn A",
+    "Điều phối express delivery cho khách hàng",
+    "Mỗi node trong cluster chạy một replica",
+    "Always a Go-getter",
+])
+def test_common_words_are_not_skills(matcher, text):
+    assert names(matcher, text) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Node, React", ["Node.js", "React"]),
+    ("Backend (Go, PostgreSQL)", ["Go", "PostgreSQL"]),
+    ("Viết service bằng Go để xử lý đơn hàng", ["Go"]),
+    ("Go", ["Go"]),
+    ("Kỹ năng: R, SQL", ["R", "SQL"]),
+    ("React/Node/Express", ["React", "Node.js", "Express.js"]),
+])
+def test_common_words_in_tech_context(matcher, text, expected):
+    assert names(matcher, text) == expected
+
+
+def test_whole_words_and_longest_match(matcher):
+    assert names(matcher, "HTML") == ["HTML"]
+    assert names(matcher, "JavaScript") == ["JavaScript"]
+    assert names(matcher, "React Native") == ["React Native"]
+    assert names(matcher, "Node.js, Express") == ["Node.js", "Express.js"]
+
+
+def test_short_aliases_need_exact_case(matcher):
+    assert names(matcher, "ai cũng làm được") == []
+    assert names(matcher, "Ứng dụng AI") == ["AI"]
+
+
+def test_symbol_names_keep_trailing_punctuation(matcher):
+    assert names(matcher, "C++, C#.") == ["C++", "C#"]
+
+
+def test_analyze_splits_listed_and_evidence(matcher):
+    cv = {
+        "skills": ["Python", "Go", "Docker"],
+        "experience": [{"description": ["Viết API bằng Python và Go", "Go to market cho sản phẩm mới"]}],
+        "projects": [{"company": "Web bán hàng (Next.js, Node.js)", "role": "", "description": []}],
+    }
+    report = matcher.analyze(cv)
+    assert report.listed == ["Python", "Go", "Docker"]
+    assert report.supported == ["Python", "Go"]
+    assert report.unsupported == ["Docker"]
+    assert report.unlisted == ["Next.js", "Node.js"]
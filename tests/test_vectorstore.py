@@ -0,0 +1,134 @@
+# tests/test_vectorstore.py
+
+import hashlib
+import os
+
+import pytest
+from chromadb.api.shared_system_client import SharedSystemClient
+from langchain_core.embeddings import Embeddings
+
+import config
+from rag import engine as engine_module
+from rag import vectorstore as vs
+
+
+class HashEmbeddings(Embeddings):
+    """Embedding tất định, không cần Ollama."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255 for b in digest[:8]]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    root = tmp_path / "vectorstore"
+    root.mkdir()
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(config, "VECTOR_STORE_PATH", str(root))
+    monkeypatch.setattr(config, "KNOWLEDGE_PATH", str(data))
+    monkeypatch.setattr(config, "INGEST_WORKERS", 1)
+    monkeypatch.setattr(config, "SNAPSHOT_KEEP", 1)
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(vs, "get_embeddings", HashEmbeddings)
+    monkeypatch.setattr(engine_module, "get_embeddings", HashEmbeddings)
+    yield root, data
+    SharedSystemClient.clear_system_cache()
+
+
+def _open_systems(root) -> list:
+    return [key for key in SharedSystemClient._identifier_to_system if key.startswith(str(root))]
+
+
+def test_assign_chunk_ids_is_stable_and_numbers_duplicates():
+    from langchain_core.documents import Document
+    docs = [Document(page_content="a", metadata={"source": "x"})] * 2 + [Document(page_content="b", metadata={"source": "x"})]
+    ids = vs.assign_chunk_ids(docs)
+    assert ids[1] == f"{ids[0]}-2"
+    assert vs.assign_chunk_ids(docs) == ids
+
+
+def test_incremental_update_reports_changes(store):
+    root, data = store
+    (data / "a.txt").write_text("alpha", encoding="utf-8")
+    (data / "b.txt").write_text("beta", encoding="utf-8")
+    first = vs.update_vectorstore()
+    assert (first["added"], first["total"]) == (2, 2)
+
+    (data / "b.txt").write_text("beta 2", encoding="utf-8")
+    os.remove(data / "a.txt")
+    (data / "c.txt").write_text("gamma", encoding="utf-8")
+    second = vs.update_vectorstore()
+    assert (second["added"], second["deleted"], second["unchanged"]) == (2, 2, 0)
+    assert second["version"] != first["version"]
+    assert vs.get_kb_version() == second["version"]
+
+    same = vs.update_vectorstore()
+    assert same["version"] == second["version"] and same["unchanged"] == 2
+
+
+def test_builds_and_hot_swap_do_not_leak_chroma_clients(store):
+    root, data = store
+    (data / "a.txt").write_text("alpha", encoding="utf-8")
+    vs.update_vectorstore()
+    assert _open_systems(root) == []  # Client build đã đóng
+
+    engine = engine_module.RAGEngine().init()
+    first_path = engine._handle.path
+    with engine.acquire() as handle:
+        for i in range(3):
+            (data / "a.txt").write_text(f"alpha {i}", encoding="utf-8")
+            vs.update_vectorstore()
+        assert engine.maybe_reload()
+        # Request đang chạy vẫn giữ snapshot cũ mở, GC không được xóa nó
+        assert handle.vectorstore is not None and os.path.isdir(first_path)
+    assert _open_systems(root) == [engine._handle.path]
+    vs.gc_snapshots()
+    assert not os.path.exists(first_path)
+    assert len(os.listdir(root / vs.SNAPSHOTS_DIR)) == 1
+
+    engine.close()
+    assert _open_systems(root) == []
+
+
+def test_legacy_index_removed_after_migration(store):
+    root, data = store
+    (data / "a.txt").write_text("alpha", encoding="utf-8")
+    legacy = vs.get_vectorstore(embeddings=HashEmbeddings(), path=str(root))
+    legacy.add_texts(["old"], ids=["old"])
+    vs.close_vectorstore(legacy)
+    assert vs.get_kb_version() == vs.LEGACY_VERSION
+
+    engine = engine_module.RAGEngine().init()
+    report = vs.update_vectorstore()
+    assert report["deleted"] == 1  # Chunk cũ của index legacy
+    assert os.path.exists(root / "chroma.sqlite3")  # Bot vẫn đang mở index legacy
+
+    engine.maybe_reload()
+    assert sorted(os.listdir(root)) == [vs.CURRENT_FILE, vs.SNAPSHOTS_DIR]
+    engine.close()
+
+
+def test_skill_taxonomy_is_not_indexed(store, monkeypatch):
+    root, data = store
+    (data / "a.txt").write_text("alpha", encoding="utf-8")
+    taxonomy = data / "skill_standards.txt"
+    taxonomy.write_text("[Ngôn ngữ]\n~Go: golang\n", encoding="utf-8")
+    monkeypatch.setattr(config, "SKILL_TAXONOMY_PATH", str(taxonomy))
+    report = vs.update_vectorstore()
+    assert report["total"] == 1
+    store_ = vs.get_vectorstore(embeddings=HashEmbeddings(), path=vs.get_snapshot_path())
+    sources = {m["source"] for m in store_.get()["metadatas"]}
+    vs.close_vectorstore(store_)
+    assert sources == {str(data / "a.txt")}
+
+
+def test_default_taxonomy_lives_outside_the_knowledge_base():
+    taxonomy = os.path.abspath(config.SKILL_TAXONOMY_PATH)
+    knowledge = os.path.abspath(config.KNOWLEDGE_PATH)
+    assert os.path.isfile(taxonomy)
+    assert os.path.commonpath([taxonomy, knowledge]) != knowledge
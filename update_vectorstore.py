@@ -5,10 +5,18 @@ import sys
 
 if __name__ == "__main__":
     logger = setup_logger()
+    # --rebuild: bỏ qua manifest và index lại toàn bộ chunk
+    rebuild = "--rebuild" in sys.argv[1:]
     try:
         logger.info("Bắt đầu cập nhật vector store...")
-        update_vectorstore()
-        logger.info("Cập nhật vector store thành công!")
+        report = update_vectorstore(rebuild=rebuild)
+        summary = (
+            f"+{report['added']} thêm, ~{report['updated']} cập nhật, -{report['deleted']} xóa, "
+            f"{report['unchanged']} giữ nguyên / {report['total']} chunk "
+            f"trong {report['elapsed']:.2f}s ({report['chunks_per_sec']:.1f} chunk/s, version {report['version']})"
+        )
+        print(summary)
+        logger.info(f"Cập nhật vector store thành công: {summary}")
     except Exception as e:
         logger.error(f"Lỗi khi cập nhật vector store: {str(e)}")
         sys.exit(1)
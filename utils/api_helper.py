@@ -1,22 +1,22 @@
-import ollama
-import asyncio
+import time
+import config
+
+MAX_MESSAGE_LENGTH = 1900  # Discord limit is 2000, leave buffer
+STREAM_PLACEHOLDER = "⏳ Đang suy nghĩ..."
 
 async def test_ollama_connection():
     """
-    Tests the connection to Ollama by pulling a model.
+    Tests the connection to Ollama by listing its models (no pull, no model load).
     """
-    try:
-        await asyncio.to_thread(ollama.pull, "llama3")
-        return True, "Successfully connected to Ollama and pulled the model."
-    except Exception as e:
-        return False, f"Failed to connect to Ollama: {e}"
+    from rag.model_manager import get_model_manager  # lazy import to avoid a utils -> rag import cycle
+    return await get_model_manager().check()
 
 async def send_long_message(ctx, message):
     """
     Sends a long message by splitting it into chunks of 1900 characters.
     Tries to split at word boundaries to avoid cutting words in half.
     """
-    max_length = 1900  # Discord limit is 2000, leave buffer
+    max_length = MAX_MESSAGE_LENGTH
 
     if len(message) <= max_length:
         await ctx.send(message)
@@ -52,4 +52,76 @@ async def send_long_message(ctx, message):
         if i == len(chunks) - 1:
             await ctx.send(chunk)
         else:
-            await ctx.send(chunk + " *(tiếp theo)...")
\ No newline at end of file
+            await ctx.send(chunk + " *(tiếp theo)...")
+
+
+def _split_at_boundary(text, max_length=MAX_MESSAGE_LENGTH):
+    """Cắt text tại xuống dòng (hoặc khoảng trắng) gần nhất trước max_length."""
+    cut = text.rfind('\n', 0, max_length)
+    if cut <= 0:
+        cut = text.rfind(' ', 0, max_length)
+    if cut <= 0:
+        cut = max_length
+    return text[:cut].rstrip(), text[cut:].lstrip()
+
+async def send_streaming_message(target, chunks, prefix="", edit_interval=None):
+    """
+    Streams an async iterator of text chunks into Discord.
+    Posts a placeholder, edits it with the accumulated text at most once per
+    edit_interval seconds, and rolls over to a new message at 1900 characters.
+    Returns the full generated text (without prefix). If the stream raises, the
+    placeholder is deleted (or the partial text is kept) before the error propagates.
+    """
+    if edit_interval is None:
+        edit_interval = config.STREAM_EDIT_INTERVAL
+
+    message = await target.send(prefix or STREAM_PLACEHOLDER)
+    current = prefix
+    parts = []
+    dirty = False
+    last_edit = 0.0  # Token đầu tiên được hiển thị ngay
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            parts.append(chunk)
+            current += chunk
+            dirty = True
+
+            # Vượt giới hạn: chốt tin nhắn hiện tại và mở tin nhắn mới
+            while len(current) > MAX_MESSAGE_LENGTH:
+                head, current = _split_at_boundary(current)
+                await message.edit(content=head + " *(tiếp theo)...")
+                message = await target.send(current[:MAX_MESSAGE_LENGTH] or STREAM_PLACEHOLDER)
+                last_edit = time.monotonic()
+                dirty = len(current) > MAX_MESSAGE_LENGTH
+
+            now = time.monotonic()
+            if dirty and now - last_edit >= edit_interval:
+                await message.edit(content=current)
+                last_edit = now
+                dirty = False
+    except Exception:
+        await _abandon_stream(message, current if current != prefix else "")
+        raise
+
+    if not current.strip():
+        if parts:
+            await message.delete()  # Tin nhắn rollover rỗng, không còn gì để hiển thị
+        else:
+            await message.edit(content="Tôi không biết.")
+    elif dirty:
+        await message.edit(content=current)
+
+    return "".join(parts)
+
+async def _abandon_stream(message, current):
+    """Stream lỗi giữa chừng: xóa placeholder chưa có nội dung, hoặc chốt phần text đã hiện."""
+    try:
+        if current.strip():
+            await message.edit(content=current[:MAX_MESSAGE_LENGTH] + " *(bị gián đoạn)*")
+        else:
+            await message.delete()
+    except Exception:
+        pass  # Không sửa được tin nhắn thì vẫn để caller báo lỗi gốc cho user
@@ -1,27 +1,43 @@
-# utils/database.py (PostgreSQL - SQLAlchemy)
+# utils/database.py (PostgreSQL - SQLAlchemy asyncio)
 
-from sqlalchemy import create_engine, Column, BigInteger, JSON, DateTime, String, Text
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, BigInteger, Integer, JSON, DateTime, String, Text, Index, insert, select, delete, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
 from datetime import datetime
+import asyncio
+import gzip
+import json
+import os
 import config # Cần import file cấu hình của bạn
 
 # --- CẤU HÌNH KẾT NỐI LINH HOẠT ---
 DB_USER = config.DB_USER
 # Sử dụng getattr để tránh lỗi nếu DB_PASSWORD không tồn tại trong config
-DB_PASSWORD = getattr(config, 'DB_PASSWORD', None) 
+DB_PASSWORD = getattr(config, 'DB_PASSWORD', None)
 DB_HOST = config.DB_HOST
 DB_PORT = config.DB_PORT
 DB_NAME = config.DB_NAME
 
 # Xây dựng chuỗi kết nối: Bỏ qua :password nếu DB_PASSWORD là None
 auth_part = f"{DB_USER}:{DB_PASSWORD}" if DB_PASSWORD else DB_USER
-DATABASE_URL = f"postgresql://{auth_part}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL trong .env ghi đè (vd: sqlite+aiosqlite:///./test.db để chạy thử không cần Postgres)
+DATABASE_URL = config.DATABASE_URL or f"postgresql+asyncpg://{auth_part}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-# Khởi tạo Engine và Session
-Engine = create_engine(DATABASE_URL)
+# Khởi tạo Engine và Session (async: truy vấn DB không chặn event loop của bot)
+_engine_kwargs = {"pool_pre_ping": True}  # Kiểm tra kết nối trước khi dùng (Postgres restart, idle timeout)
+if not DATABASE_URL.startswith("sqlite"):
+    _engine_kwargs.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+Engine = create_async_engine(DATABASE_URL, **_engine_kwargs)
 Base = declarative_base()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
+SessionLocal = async_sessionmaker(bind=Engine, expire_on_commit=False)
+
+# BIGINT trên Postgres; SQLite chỉ tự tăng khóa chính kiểu INTEGER
+BigIntegerId = BigInteger().with_variant(Integer, "sqlite")
 
 # --- ĐỊNH NGHĨA MODEL CƠ SỞ DỮ LIỆU ---
 
@@ -29,88 +45,432 @@ class ChatHistory(Base):
     """Lưu trữ lịch sử trò chuyện (thay thế cho bảng SQLite cũ)."""
     __tablename__ = "chat_history"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigIntegerId, primary_key=True, index=True)
     user_id = Column(BigInteger, nullable=False)
     query = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Tra lịch sử / dọn dữ liệu theo user không phải quét toàn bảng
+    __table_args__ = (Index("ix_chat_history_user_ts", "user_id", "timestamp"),)
+
 class CVSession(Base):
     """Lưu trữ dữ liệu CV đã parse cho phiên làm việc hiện tại."""
     __tablename__ = "cv_sessions"
 
     user_id = Column(BigInteger, primary_key=True, index=True)
     cv_data_json = Column(JSON, nullable=False)
-    job_title = Column(String, nullable=True) 
+    job_title = Column(String, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class CVResultCache(Base):
+    """Kết quả parse / phân tích CV theo nội dung file (sha256) và version parser/prompt/model."""
+    __tablename__ = "cv_result_cache"
+
+    key = Column(String(64), primary_key=True)
+    kind = Column(String(16), nullable=False)  # "parse" | "analysis"
+    version = Column(String(64), nullable=False)
+    content = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # --- CÁC HÀM TƯƠNG TÁC DB ---
 
-def init_db():
-    """Tạo các bảng ChatHistory và CVSession nếu chúng chưa tồn tại."""
+async def init_db():
+    """Tạo các bảng ChatHistory, CVSession và CVResultCache nếu chúng chưa tồn tại."""
+    backend = {"postgresql": "PostgreSQL", "sqlite": "SQLite"}.get(Engine.dialect.name, Engine.dialect.name)
     try:
         # Nếu bot được khởi động lại, chỉ tạo các bảng nếu chưa có
-        Base.metadata.create_all(bind=Engine)
-        print("✅ PostgreSQL tables initialized successfully (chat_history, cv_sessions).")
+        async with Engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # chat_history trên Postgres là bảng phân vùng theo tháng (tạo bằng DDL riêng)
+                await _create_partitioned_chat_history(conn)
+            await conn.run_sync(Base.metadata.create_all)
+            # Bảng tạo từ phiên bản cũ chưa có index (user_id, timestamp)
+            await conn.run_sync(_create_user_ts_index)
+        print(f"✅ {backend} tables initialized successfully (chat_history, cv_sessions, cv_result_cache).")
     except Exception as e:
-        print(f"❌ Lỗi khi khởi tạo PostgreSQL DB. Kiểm tra service và cấu hình: {e}")
+        print(f"❌ Lỗi khi khởi tạo {backend} DB. Kiểm tra service và cấu hình: {e}")
+        return
+    # Transaction riêng: tạo partition lỗi không làm mất các bảng/index vừa tạo ở trên
+    try:
+        await ensure_chat_partitions()
+    except Exception as e:
+        print(f"❌ Lỗi khi tạo partition chat_history: {e}")
+
+async def close_db():
+    """Ghi nốt chat history còn trong hàng đợi rồi đóng pool kết nối (gọi khi bot tắt)."""
+    await _chat_writer.stop()
+    await Engine.dispose()
+
+# ----------------- PHÂN VÙNG, LƯU TRỮ VÀ EXPORT CHAT HISTORY -----------------
+# Postgres: chat_history PARTITION BY RANGE (timestamp), mỗi tháng 1 bảng con chat_history_pYYYY_MM
+# (+ chat_history_default hứng dữ liệu lệch tháng). SQLite (chạy thử) giữ bảng thường.
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def _add_months(value: datetime, months: int) -> datetime:
+    years, month = divmod(value.month - 1 + months, 12)
+    return datetime(value.year + years, month + 1, 1)
+
+def _partition_name(month: datetime) -> str:
+    return f"chat_history_p{month:%Y_%m}"
+
+def _create_user_ts_index(sync_conn):
+    for index in ChatHistory.__table__.indexes:
+        if index.name == "ix_chat_history_user_ts":
+            index.create(sync_conn, checkfirst=True)
+
+async def _create_partitioned_chat_history(conn):
+    """Tạo chat_history dạng bảng phân vùng; bảng thường từ phiên bản cũ được chuyển dữ liệu sang."""
+    legacy = False
+    if await conn.scalar(text("SELECT to_regclass('chat_history') IS NOT NULL")):
+        partitioned = await conn.scalar(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'chat_history'::regclass)"
+        ))
+        if partitioned:
+            return
+        await conn.execute(text("ALTER TABLE chat_history RENAME TO chat_history_legacy"))
+        legacy = True
+
+    # Khóa chính của bảng phân vùng phải chứa cột phân vùng
+    await conn.execute(text(
+        "CREATE TABLE chat_history ("
+        " id BIGINT GENERATED BY DEFAULT AS IDENTITY,"
+        " user_id BIGINT NOT NULL,"
+        " query TEXT NOT NULL,"
+        " response TEXT NOT NULL,"
+        " timestamp TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),"
+        " PRIMARY KEY (id, timestamp)"
+        ") PARTITION BY RANGE (timestamp)"
+    ))
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS chat_history_default PARTITION OF chat_history DEFAULT"))
+
+    if legacy:
+        oldest = await conn.scalar(text("SELECT min(timestamp) FROM chat_history_legacy"))
+        if oldest is not None:
+            await _ensure_chat_partitions(conn, oldest, months_ahead=0, until=datetime.utcnow())
+        await conn.execute(text(
+            "INSERT INTO chat_history (id, user_id, query, response, timestamp) "
+            "SELECT id, user_id, query, response, COALESCE(timestamp, now() AT TIME ZONE 'utc') "
+            "FROM chat_history_legacy"
+        ))
+        await conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('chat_history', 'id'), COALESCE(max(id), 0) + 1, false) "
+            "FROM chat_history"
+        ))
+        await conn.execute(text("DROP TABLE chat_history_legacy"))
+        print("✅ Đã chuyển chat_history sang bảng phân vùng theo tháng.")
+
+async def _ensure_chat_partitions(conn, start: datetime, months_ahead: int = None, until: datetime = None):
+    """Tạo partition từ tháng chứa `start` tới tháng chứa `until` (mặc định: bây giờ) + months_ahead tháng."""
+    months_ahead = config.CHAT_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    month = _month_start(start)
+    last = _add_months(_month_start(until or datetime.utcnow()), months_ahead)
+    while month <= last:
+        upper = _add_months(month, 1)
+        if not await conn.scalar(text(f"SELECT to_regclass('{_partition_name(month)}') IS NOT NULL")):
+            await _create_chat_partition(conn, month, upper)
+        month = upper
+
+async def _create_chat_partition(conn, month: datetime, upper: datetime):
+    """
+    Tạo partition cho 1 tháng. Nếu chat_history_default đã hứng dòng của tháng đó (bot chạy lâu, chưa
+    tạo kịp partition) thì Postgres không cho tạo thẳng -> tháo default, tạo partition, chuyển các dòng
+    sang rồi gắn default lại, tất cả trong transaction của `conn`.
+    """
+    partition = _partition_name(month)
+    bounds = f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+    in_month = f"timestamp >= '{month:%Y-%m-%d}' AND timestamp < '{upper:%Y-%m-%d}'"
+    has_default = await conn.scalar(text("SELECT to_regclass('chat_history_default') IS NOT NULL"))
+    if not has_default or not await conn.scalar(text(
+        f"SELECT EXISTS (SELECT 1 FROM chat_history_default WHERE {in_month})"
+    )):
+        await conn.execute(text(f"CREATE TABLE {partition} PARTITION OF chat_history {bounds}"))
+        return
+
+    await conn.execute(text("ALTER TABLE chat_history DETACH PARTITION chat_history_default"))
+    await conn.execute(text(f"CREATE TABLE {partition} PARTITION OF chat_history {bounds}"))
+    moved = await conn.execute(text(
+        f"WITH moved AS (DELETE FROM chat_history_default WHERE {in_month} RETURNING *) "
+        f"INSERT INTO {partition} (id, user_id, query, response, timestamp) "
+        f"SELECT id, user_id, query, response, timestamp FROM moved"
+    ))
+    await conn.execute(text("ALTER TABLE chat_history ATTACH PARTITION chat_history_default DEFAULT"))
+    print(f"✅ Đã chuyển {moved.rowcount} dòng chat history tháng {month:%Y-%m} từ partition default sang {partition}.")
+
+async def ensure_chat_partitions():
+    """Tạo sẵn partition cho các tháng tới (chạy định kỳ cùng job retention)."""
+    async with Engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await _ensure_chat_partitions(conn, datetime.utcnow())
+
+async def iter_chat_history(user_id: int = None, since: datetime = None, until: datetime = None,
+                            batch_size: int = 1000):
+    """Stream chat history qua server-side cursor (không nạp toàn bộ bảng vào RAM)."""
+    table = ChatHistory.__table__
+    stmt = select(table)
+    if user_id is not None:
+        # Có index (user_id, timestamp) nên sắp theo thời gian không tốn sort
+        stmt = stmt.where(table.c.user_id == user_id).order_by(table.c.timestamp)
+    if since is not None:
+        stmt = stmt.where(table.c.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(table.c.timestamp < until)
+    async with Engine.connect() as conn:
+        result = await conn.stream(stmt.execution_options(yield_per=batch_size))
+        async for row in result.mappings():
+            yield dict(row)
+
+async def export_chat_history(path: str, **filters) -> int:
+    """Ghi chat history ra file JSON Lines (nén gzip nếu path kết thúc bằng .gz). Trả về số dòng."""
+    opener = gzip.open if path.endswith(".gz") else open
+    count = 0
+    with opener(path, "wt", encoding="utf-8") as f:
+        async for row in iter_chat_history(**filters):
+            row["timestamp"] = row["timestamp"].isoformat() if row["timestamp"] else None
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+async def archive_chat_history(months: int = None, archive_dir: str = None, now: datetime = None) -> list:
+    """
+    Retention: mỗi tháng cũ hơn `months` tháng được ghi ra archive_dir/chat_history_YYYY_MM.jsonl.gz,
+    sau đó mới detach + drop partition (Postgres) / xóa các dòng đó (SQLite). Trả về [(file, số dòng)].
+    """
+    months = config.CHAT_RETENTION_MONTHS if months is None else months
+    archive_dir = archive_dir or config.CHAT_ARCHIVE_DIR
+    cutoff = _add_months(_month_start(now or datetime.utcnow()), -months)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    async with Engine.connect() as conn:
+        oldest = await conn.scalar(select(func.min(ChatHistory.timestamp)))
+    archived = []
+    month = _month_start(oldest) if oldest is not None else cutoff
+    while month < cutoff:
+        upper = _add_months(month, 1)
+        path = os.path.join(archive_dir, f"chat_history_{month:%Y_%m}.jsonl.gz")
+        if os.path.exists(path):
+            path = path.replace(".jsonl.gz", f"-{int(datetime.utcnow().timestamp())}.jsonl.gz")
+        # Ghi file tạm rồi mới đổi tên: chỉ xóa dữ liệu khi archive đã ghi trọn vẹn
+        tmp_path = path.replace(".jsonl.gz", ".tmp.jsonl.gz")
+        count = await export_chat_history(tmp_path, since=month, until=upper)
+        os.replace(tmp_path, path)
+
+        async with Engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                partition = _partition_name(month)
+                if await conn.scalar(text(f"SELECT to_regclass('{partition}') IS NOT NULL")):
+                    await conn.execute(text(f"ALTER TABLE chat_history DETACH PARTITION {partition}"))
+                    await conn.execute(text(f"DROP TABLE {partition}"))
+            # Dòng còn lại của tháng này (bảng thường, hoặc nằm trong partition default)
+            await conn.execute(delete(ChatHistory).where(
+                ChatHistory.timestamp >= month, ChatHistory.timestamp < upper
+            ))
+        archived.append((path, count))
+        print(f"Đã lưu trữ {count} dòng chat history tháng {month:%Y-%m} vào {path}")
+        month = upper
+    return archived
 
 # ----------------- HÀM QUẢN LÝ CHAT HISTORY -----------------
 
-def save_chat(user_id: int, query: str, response: str):
-    """Lưu lịch sử trò chuyện vào PostgreSQL."""
-    db = SessionLocal()
-    try:
-        new_entry = ChatHistory(
-            user_id=user_id,
-            query=query,
-            response=response
-        )
-        db.add(new_entry)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Lỗi khi lưu Chat History cho User {user_id}: {e}")
-    finally:
-        db.close()
+class ChatHistoryWriter:
+    """
+    Write-behind cho chat_history: bot trả lời xong chỉ đẩy record vào hàng đợi trong RAM,
+    task nền gom lại và bulk insert mỗi CHAT_WRITE_BATCH_SIZE dòng hoặc CHAT_WRITE_INTERVAL_MS.
+    Lỗi DB thì thử lại (có backoff); hàng đợi đầy hoặc hết lượt thử thì record bị bỏ và được đếm.
+    """
 
-# ----------------- HÀM QUẢN LÝ CV SESSION -----------------
+    def __init__(self, batch_size: int = None, flush_interval: float = None, max_queue: int = None,
+                 retries: int = None):
+        self.batch_size = batch_size or config.CHAT_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval or config.CHAT_WRITE_INTERVAL_MS / 1000
+        self.max_queue = max_queue or config.CHAT_WRITE_QUEUE_MAX
+        self.retries = config.CHAT_WRITE_RETRIES if retries is None else retries
+        self.written = 0
+        self.batches = 0
+        self.retried = 0
+        self.dropped = 0
+        self._queue = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Chạy task ghi nền (gọi trong event loop, sau init_db)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def enqueue(self, user_id: int, query: str, response: str) -> bool:
+        row = {"user_id": user_id, "query": query, "response": response, "timestamp": datetime.utcnow()}
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"Hàng đợi Chat History đầy, bỏ record của User {user_id}")
+            return False
+
+    async def stop(self):
+        """Ghi hết record đang chờ rồi dừng task nền."""
+        if not self.running:
+            return
+        await self._queue.put(None)  # Sentinel: mọi record xếp trước nó đều được ghi
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._queue.get()
+            if row is None:
+                return
+            batch, stopping = [row], False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: list):
+        for attempt in range(self.retries + 1):
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(insert(ChatHistory), batch)
+                    await db.commit()
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                if attempt < self.retries:
+                    self.retried += len(batch)
+                    print(f"Lỗi khi ghi {len(batch)} Chat History (thử lại lần {attempt + 1}): {e}")
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                else:
+                    self.dropped += len(batch)
+                    print(f"Bỏ {len(batch)} Chat History sau {self.retries + 1} lần thử: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "batches": self.batches,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+_chat_writer = ChatHistoryWriter()
+
+
+def get_chat_writer() -> ChatHistoryWriter:
+    """Trả về writer chat history dùng chung của process."""
+    return _chat_writer
 
-def save_cv_data(user_id: int, cv_data: dict, job_title: str):
-    """Lưu hoặc cập nhật dữ liệu CV đã parse vào cơ sở dữ liệu."""
-    db = SessionLocal()
-    try:
-        session_entry = db.query(CVSession).filter(CVSession.user_id == user_id).first()
 
-        if session_entry:
-            session_entry.cv_data_json = cv_data
-            session_entry.job_title = job_title
-        else:
-            session_entry = CVSession(
+async def save_chat(user_id: int, query: str, response: str):
+    """Lưu lịch sử trò chuyện vào PostgreSQL (qua writer nền nếu đang chạy, không chờ DB)."""
+    if _chat_writer.running:
+        _chat_writer.enqueue(user_id, query, response)
+        return
+    async with SessionLocal() as db:
+        try:
+            new_entry = ChatHistory(
                 user_id=user_id,
-                cv_data_json=cv_data,
-                job_title=job_title
+                query=query,
+                response=response
             )
-            db.add(session_entry)
-        
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Lỗi khi lưu dữ liệu CV cho User {user_id}: {e}")
-    finally:
-        db.close()
-
-def get_cv_data(user_id: int) -> dict or None:
-    """Truy xuất dữ liệu CV đã parse từ cơ sở dữ liệu."""
-    db = SessionLocal()
-    try:
-        session_entry = db.query(CVSession).filter(CVSession.user_id == user_id).first()
-        if session_entry:
-            # SQLAlchemy/PostgreSQL tự động deserialize JSONB thành dict
-            return session_entry.cv_data_json
-        return None
-    except Exception as e:
-        print(f"Lỗi khi truy xuất dữ liệu CV cho User {user_id}: {e}")
-        return None
-    finally:
-        db.close()
+            db.add(new_entry)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f"Lỗi khi lưu Chat History cho User {user_id}: {e}")
+
+# ----------------- HÀM QUẢN LÝ CV SESSION -----------------
+
+async def save_cv_data(user_id: int, cv_data: dict, job_title: str) -> bool:
+    """Lưu hoặc cập nhật dữ liệu CV đã parse vào cơ sở dữ liệu. Trả về False nếu lưu lỗi."""
+    async with SessionLocal() as db:
+        try:
+            session_entry = await db.get(CVSession, user_id)
+
+            if session_entry:
+                session_entry.cv_data_json = cv_data
+                session_entry.job_title = job_title
+            else:
+                session_entry = CVSession(
+                    user_id=user_id,
+                    cv_data_json=cv_data,
+                    job_title=job_title
+                )
+                db.add(session_entry)
+
+            await db.commit()
+            return True
+        except Exception as e:
+            await db.rollback()
+            print(f"Lỗi khi lưu dữ liệu CV cho User {user_id}: {e}")
+            return False
+
+async def get_cv_data(user_id: int) -> dict or None:
+    """Truy xuất dữ liệu CV đã parse từ cơ sở dữ liệu (None nếu chưa có, lỗi DB thì raise)."""
+    async with SessionLocal() as db:
+        try:
+            session_entry = await db.get(CVSession, user_id)
+            if session_entry:
+                # SQLAlchemy/PostgreSQL tự động deserialize JSONB thành dict
+                return session_entry.cv_data_json
+            return None
+        except Exception as e:
+            print(f"Lỗi khi truy xuất dữ liệu CV cho User {user_id}: {e}")
+            raise
+
+async def get_cv_result(key: str):
+    """Tra kết quả CV đã cache (None nếu chưa có)."""
+    async with SessionLocal() as db:
+        try:
+            entry = await db.get(CVResultCache, key)
+            return entry.content if entry else None
+        except Exception as e:
+            print(f"Lỗi khi đọc cache CV {key[:12]}: {e}")
+            return None
+
+async def save_cv_result(key: str, kind: str, version: str, content):
+    """Lưu (hoặc ghi đè) kết quả CV vào cache."""
+    async with SessionLocal() as db:
+        try:
+            await db.merge(CVResultCache(key=key, kind=kind, version=version, content=content,
+                                         created_at=datetime.utcnow()))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f"Lỗi khi lưu cache CV {key[:12]}: {e}")
+
+async def purge_cv_results(kind: str, current_version: str):
+    """Xóa kết quả cache của version cũ (parser/prompt/model/knowledge base đã đổi). None nếu lỗi."""
+    async with SessionLocal() as db:
+        try:
+            result = await db.execute(delete(CVResultCache).where(
+                CVResultCache.kind == kind, CVResultCache.version != current_version
+            ))
+            await db.commit()
+            return result.rowcount
+        except Exception as e:
+            await db.rollback()
+            print(f"Lỗi khi dọn cache CV ({kind}): {e}")
+            return None
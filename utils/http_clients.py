@@ -0,0 +1,83 @@
+# utils/http_clients.py (HTTP client dùng chung cho toàn bộ bot)
+
+import httpx
+import ollama
+
+import config
+
+# Pool kết nối keep-alive tới Ollama (httpx transport), tạo lần đầu khi cần và đóng trong bot.main():
+#   - ollama.Client / AsyncClient: health check, warm-up
+#   - ChatOllama / OllamaEmbeddings: client riêng của langchain nhưng dùng chung transport (qua client kwargs)
+# (File đính kèm đọc qua Attachment.read() của discord.py, dùng session của chính discord.py)
+_sync_transport = None
+_async_transport = None
+_ollama_client = None
+_ollama_async_client = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_POOL_PER_HOST,
+        max_keepalive_connections=config.HTTP_POOL_PER_HOST,
+        keepalive_expiry=config.HTTP_KEEPALIVE,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    # read timeout dài cho generation, connect timeout ngắn để phát hiện Ollama chết nhanh
+    return httpx.Timeout(config.OLLAMA_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)
+
+
+def _get_sync_transport() -> httpx.HTTPTransport:
+    global _sync_transport
+    if _sync_transport is None:
+        _sync_transport = httpx.HTTPTransport(limits=_limits())
+    return _sync_transport
+
+
+def _get_async_transport() -> httpx.AsyncHTTPTransport:
+    global _async_transport
+    if _async_transport is None:
+        _async_transport = httpx.AsyncHTTPTransport(limits=_limits())
+    return _async_transport
+
+
+def ollama_client_kwargs() -> dict:
+    """kwargs cho ChatOllama/OllamaEmbeddings để client httpx của langchain dùng pool kết nối chung."""
+    return {
+        "client_kwargs": {"timeout": _timeout()},
+        "sync_client_kwargs": {"transport": _get_sync_transport()},
+        "async_client_kwargs": {"transport": _get_async_transport()},
+    }
+
+
+def get_ollama_client() -> ollama.AsyncClient:
+    """Ollama client async dùng chung (health check, warm-up), cùng pool với chat và embedding."""
+    global _ollama_async_client
+    if _ollama_async_client is None:
+        _ollama_async_client = ollama.AsyncClient(
+            host=config.OLLAMA_HOST, timeout=_timeout(), transport=_get_async_transport()
+        )
+    return _ollama_async_client
+
+
+def get_ollama_sync_client() -> ollama.Client:
+    """Ollama client sync dùng chung (các lời gọi chạy trong thread), cùng pool với chat và embedding."""
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = ollama.Client(host=config.OLLAMA_HOST, timeout=_timeout(), transport=_get_sync_transport())
+    return _ollama_client
+
+
+async def close_http_clients():
+    """Đóng mọi pool kết nối (gọi khi bot tắt)."""
+    global _sync_transport, _async_transport, _ollama_client, _ollama_async_client
+    # Client httpx chỉ bọc transport: đóng transport là đóng mọi kết nối của cả client langchain
+    if _async_transport is not None:
+        await _async_transport.aclose()
+        _async_transport = None
+    if _sync_transport is not None:
+        _sync_transport.close()
+        _sync_transport = None
+    _ollama_client = None
+    _ollama_async_client = None
@@ -0,0 +1,169 @@
+# utils/llm_scheduler.py (Hàng đợi dùng chung cho mọi request gọi Ollama)
+
+import asyncio
+import itertools
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+# Số nhỏ = ưu tiên cao: chat ngắn chạy trước phân tích CV nặng
+PRIORITY_CHAT = 0
+PRIORITY_CV = 1
+
+QUEUE_MESSAGE = "⏳ Bot đang bận, bạn đang ở vị trí **#{position}** trong hàng đợi..."
+
+
+class QueueFullError(RuntimeError):
+    """User đã có quá nhiều request đang chờ (message thân thiện, gửi thẳng cho user)."""
+
+
+@dataclass
+class _Job:
+    user_id: int
+    guild_id: int
+    priority: int
+    seq: int
+    enqueued_at: float
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+class LLMScheduler:
+    """
+    Giới hạn số request chạy đồng thời tới Ollama (max_concurrency), phần còn lại xếp hàng.
+    Khi có slot trống, job được chọn theo: priority (có aging để CV không bị bỏ đói),
+    rồi guild đã được cấp ít slot nhất, rồi user đã được cấp ít slot nhất (tính trong đợt bận hiện tại,
+    reset khi hàng đợi rỗng), rồi thứ tự đến -> 1 user spam không chặn được user khác.
+    Mention, !chat và !cv dùng chung MỘT scheduler nên queue depth là số liệu chung.
+    """
+
+    def __init__(self, max_concurrency: int = None, max_queued_per_user: int = None, aging: float = None):
+        self.max_concurrency = config.OLLAMA_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.max_queued_per_user = (
+            config.LLM_MAX_QUEUED_PER_USER if max_queued_per_user is None else max_queued_per_user
+        )
+        self.aging = config.LLM_PRIORITY_AGING if aging is None else aging
+        self._running = 0
+        self._waiting = []
+        self._granted_users = Counter()
+        self._granted_guilds = Counter()
+        self._seq = itertools.count()
+        self.served = 0
+        self.rejected = 0
+        self.peak_queued = 0
+        self._total_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    @asynccontextmanager
+    async def slot(self, user_id, guild_id=None, priority: int = PRIORITY_CHAT, on_queued=None):
+        """
+        Giữ 1 slot Ollama trong suốt khối `async with` (kể cả khi stream).
+        on_queued(position) được await 1 lần nếu request phải xếp hàng.
+        """
+        job = await self._admit(user_id, guild_id, priority, on_queued)
+        try:
+            yield job
+        finally:
+            self._release(job)
+
+    def position(self, job: _Job) -> int:
+        """Vị trí (1-based) của job trong thứ tự sẽ được chạy."""
+        now = time.monotonic()
+        ranked = sorted(self._waiting, key=lambda j: self._rank(j, now))
+        return ranked.index(job) + 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "queued": len(self._waiting),
+            "max_concurrency": self.max_concurrency,
+            "served": self.served,
+            "rejected": self.rejected,
+            "peak_queued": self.peak_queued,
+            "avg_wait": self._total_wait / self.served if self.served else 0.0,
+        }
+
+    async def _admit(self, user_id, guild_id, priority, on_queued) -> _Job:
+        job = _Job(user_id, guild_id, priority, next(self._seq), time.monotonic())
+        if self._running < self.max_concurrency and not self._waiting:
+            self._start(job)
+            return job
+
+        if sum(1 for j in self._waiting if j.user_id == user_id) >= self.max_queued_per_user:
+            self.rejected += 1
+            raise QueueFullError("Bạn đã có quá nhiều yêu cầu đang chờ. Hãy đợi câu trả lời trước rồi thử lại!")
+
+        job.future = asyncio.get_running_loop().create_future()
+        self._waiting.append(job)
+        self.peak_queued = max(self.peak_queued, len(self._waiting))
+        logger.info(f"LLM queue: {len(self._waiting)} đang chờ, {self._running}/{self.max_concurrency} đang chạy")
+        try:
+            if on_queued:
+                await on_queued(self.position(job))
+            await job.future
+        except BaseException:
+            if job in self._waiting:
+                self._waiting.remove(job)
+            elif job.future.done() and not job.future.cancelled():
+                self._release(job)  # Đã được cấp slot nhưng request bị hủy trước khi chạy
+            raise
+        return job
+
+    def _rank(self, job: _Job, now: float):
+        priority = job.priority
+        if self.aging:
+            priority -= (now - job.enqueued_at) / self.aging
+        return (priority, self._granted_guilds[job.guild_id], self._granted_users[job.user_id], job.seq)
+
+    def _start(self, job: _Job):
+        self._running += 1
+        self._granted_users[job.user_id] += 1
+        self._granted_guilds[job.guild_id] += 1
+        self.served += 1
+        self._total_wait += time.monotonic() - job.enqueued_at
+
+    def _release(self, job: _Job):
+        self._running -= 1
+        if self._running == 0 and not self._waiting:
+            # Hết đợt bận: reset bộ đếm để Counter không phình theo số user từng gọi bot
+            self._granted_users.clear()
+            self._granted_guilds.clear()
+        self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self._running < self.max_concurrency and self._waiting:
+            job = min(self._waiting, key=lambda j: self._rank(j, now))
+            self._waiting.remove(job)
+            self._start(job)
+            job.future.set_result(None)
+
+
+def queue_notifier(target):
+    """Tạo callback on_queued báo vị trí hàng đợi cho user (target là ctx hoặc channel)."""
+    async def notify(position: int):
+        try:
+            await target.send(QUEUE_MESSAGE.format(position=position))
+        except Exception as e:
+            # Không gửi được thông báo thì request vẫn tiếp tục chờ bình thường
+            logger.error(f"Không gửi được vị trí hàng đợi: {e}")
+    return notify
+
+
+_scheduler = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Trả về scheduler dùng chung của process (tạo lần đầu khi được gọi)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler